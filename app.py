@@ -10,30 +10,40 @@ Improved Voice RAG System with LangChain + ElevenLabs
 """
 
 import os
-import io
-import base64
-import tempfile
-import pickle
+import sys
+import contextlib
 import hashlib
-from functools import lru_cache
-from typing import List, Dict, Tuple, Optional, Union, AsyncGenerator
+import re
+import time
+from typing import List, Dict, Mapping, Tuple, Optional, Union, AsyncGenerator
 import asyncio
 
-import numpy as np
 import faiss
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from openai import OpenAI, AsyncOpenAI
-from sklearn.metrics.pairwise import cosine_similarity
 from elevenlabs.client import AsyncElevenLabs
 from elevenlabs import VoiceSettings
 
 # LangChain imports
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import HumanMessage, AIMessage, BaseMessage
+from langchain_openai import ChatOpenAI
+from langchain.schema import HumanMessage, AIMessage, BaseMessage, SystemMessage
+
+from batching import MicroBatcher
+from caches import (JSON_CODEC, VECTOR_CODEC, AnswerCache, BoundedCache, PromptAudioCache, SemanticCache,
+                    SharedCache, create_cache_backend)
+from context_packer import count_tokens, pack_context
+from embeddings import create_embedding_provider
+from knowledge_base import KnowledgeBase, file_signature
+from lexical_index import is_decisive
+from observability import configure_logging, log, metrics, record, record_prompt_usage, span, turn
+from prompts import build_prompts
+from session_memory import SUMMARY_ROLE, SessionMemory, SessionStore, fit_history
+from stt import StreamingUtterance, create_stt_backend, parse_sample_rate
+from streaming import split_sentences, synthesize_in_order
+from ws_protocol import PROTOCOL_JSON, negotiate_protocol, receive_message, send_message
 
 load_dotenv()
 
@@ -49,7 +59,11 @@ ELEVEN_API_KEY = os.getenv("ELEVEN_API_KEY", "")
 USE_ELEVENLABS = bool(ELEVEN_API_KEY)
 
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")  # openai | onnx (local CPU model) | hash (offline)
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "")  # onnx: directory with model.onnx + tokenizer.json
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "2"))  # onnx: queries embedded in parallel
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "whisper-1")
 
 # ElevenLabs configuration
 ELEVEN_VOICE_ID_EN = os.getenv("ELEVEN_VOICE_ID_EN", "21m00Tcm4TlvDq8ikWAM")  # Rachel
@@ -67,21 +81,84 @@ TTS_SPEED = float(os.getenv("TTS_SPEED", "1.1"))
 
 TOP_K = int(os.getenv("TOP_K", "5"))
 
+# Knowledge base files (hot-reloaded by POST /admin/reload or the file watcher)
+INDEX_PATH = os.getenv("INDEX_PATH", "data/index.faiss")
+METADATA_PATH = os.getenv("METADATA_PATH", "data/chunks.bin")
+KB_WATCH_SECONDS = float(os.getenv("KB_WATCH_SECONDS", "5"))  # 0 = no file watcher
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))  # IVF cells visited per query (ivf/ivfpq indexes)
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))  # HNSW search beam width (hnsw index)
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"  # map vectors from the file (shared by workers)
+
+# Hybrid retrieval: BM25 (data/lexical.bin, written by ingest) fused with vector search
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # hits per ranking fed into the fusion
+LEXICAL_CONFIDENCE = float(os.getenv("LEXICAL_CONFIDENCE", "0.8"))  # BM25 coverage to skip the embedding; 0 = never
+LEXICAL_MARGIN = float(os.getenv("LEXICAL_MARGIN", "1.5"))  # ...and how far the top hit must lead the second
+# Cross-session micro-batching: concurrent queries share one embeddings request and one FAISS search
+SEARCH_BATCH_WINDOW_MS = float(os.getenv("SEARCH_BATCH_WINDOW_MS", "2"))  # how long the first query waits for company
+SEARCH_BATCH_MAX = int(os.getenv("SEARCH_BATCH_MAX", "32"))  # sent at once with this many waiting; 1 = no batching
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # empty = admin endpoints only from localhost
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")  # debug (per-query details) | info | warning | error | off
+
 # Performance optimization settings
 CACHE_SIZE = int(os.getenv("CACHE_SIZE", "200"))
-CONTEXT_MAX_CHARS = int(os.getenv("CONTEXT_MAX_CHARS", "2500"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "700"))  # retrieved context packed into this budget
+CONTEXT_SUMMARIZER = os.getenv("CONTEXT_SUMMARIZER", "false").lower() == "true"  # opt-in: LLM summary when over budget
 SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
-
-print("📋 Configuration:")
-print(f"  - Embedding Model: {EMBEDDING_MODEL}")
-print(f"  - Chat Model: {CHAT_MODEL}")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))  # 0 = never expire
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # per cache, 0 = unlimited
+
+# Conversation memory
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "1200"))  # verbatim turns in the prompt; older ones summarized
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))  # disconnected sessions kept for resuming
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "300"))  # ...and for how long
+
+# Multi-worker mode: N uvicorn processes sharing the mmapped index and a cache backend
+WORKERS = int(os.getenv("WORKERS", "1"))
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory (per process) | sqlite (shared by workers)
+CACHE_PATH = os.getenv("CACHE_PATH", "data/shared_cache.sqlite3")  # a /dev/shm path keeps it in RAM
+SHARED_CACHE_SIZE = int(os.getenv("SHARED_CACHE_SIZE", "10000"))  # entries per shared cache
+
+# Final-answer cache (response text + audio for repeated stateless questions)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "false").lower() == "true"
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "data/answer_cache.sqlite3")  # empty = memory only
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Pre-synthesized audio for the fixed prompts
+PROMPT_AUDIO_DIR = os.getenv("PROMPT_AUDIO_DIR", "data/prompt_audio")
+
+# Sentence-level streaming (LLM tokens -> TTS per sentence)
+STREAM_MIN_SENTENCE_CHARS = int(os.getenv("STREAM_MIN_SENTENCE_CHARS", "20"))
+STREAM_TTS_CONCURRENCY = int(os.getenv("STREAM_TTS_CONCURRENCY", "3"))
+
+# Speech-to-text backend and the endpointer for streamed microphone audio
+STT_BACKEND = os.getenv("STT_BACKEND", "whisper")  # whisper | static (local stand-in)
+VAD_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "300"))  # 16-bit PCM amplitude
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", "700"))
+MAX_UTTERANCE_SECONDS = float(os.getenv("MAX_UTTERANCE_SECONDS", "15"))
+
+# Fixed prompts (audio rendered once per voice configuration)
+GREETING_MSG = "Olá! Bem-vindo ao Suporte VoiceAI. Como posso ajudá-lo hoje? / Hello! Welcome to VoiceAI Support. How can I help you today?"
+NO_SPEECH_MSG = "Não ouvi nada. Por favor repita a sua pergunta. / I didn't hear anything. Please repeat your question."
+GOODBYE_MSG = "Obrigado por usar o Suporte VoiceAI. Tenha um bom dia! / Thank you for using VoiceAI Support. Have a great day!"
+FIXED_PROMPTS = [(GREETING_MSG, 'pt'), (NO_SPEECH_MSG, 'pt'), (GOODBYE_MSG, 'pt')]
+
+configure_logging(LOG_LEVEL)
+
+log.info("📋 Configuration:")
+log.info(f"  - Embeddings: {EMBEDDING_PROVIDER} {EMBEDDING_MODEL if EMBEDDING_PROVIDER == 'openai' else EMBEDDING_MODEL_PATH}")
+log.info(f"  - Chat Model: {CHAT_MODEL}")
+log.info(f"  - STT: {STT_BACKEND} ({WHISPER_MODEL})")
 if USE_ELEVENLABS:
-    print(f"  - TTS: ElevenLabs {ELEVEN_MODEL} (Rachel voice)")
-    print(f"  - Voice Settings: stability={ELEVEN_STABILITY}, similarity={ELEVEN_SIMILARITY_BOOST}")
+    log.info(f"  - TTS: ElevenLabs {ELEVEN_MODEL} (Rachel voice)")
+    log.info(f"  - Voice Settings: stability={ELEVEN_STABILITY}, similarity={ELEVEN_SIMILARITY_BOOST}")
 else:
-    print(f"  - TTS: OpenAI {TTS_MODEL} ({TTS_VOICE} @ {TTS_SPEED}x)")
-print(f"  - Top K Results: {TOP_K}")
-print(f"  - API Key: {OPENAI_API_KEY[:8]}...{OPENAI_API_KEY[-4:]}")
+    log.info(f"  - TTS: OpenAI {TTS_MODEL} ({TTS_VOICE} @ {TTS_SPEED}x)")
+log.info(f"  - Top K Results: {TOP_K}")
+log.info(f"  - Query batching: {SEARCH_BATCH_WINDOW_MS:g} ms window, up to {SEARCH_BATCH_MAX} queries"
+         if SEARCH_BATCH_MAX > 1 else "  - Query batching: off")
+log.info(f"  - Context: {CONTEXT_MAX_TOKENS} tokens, " + ("LLM summary when over" if CONTEXT_SUMMARIZER else "packed"))
+log.info(f"  - History: {HISTORY_MAX_TOKENS} tokens + rolling summary, sessions resumable for {SESSION_IDLE_SECONDS:.0f}s")
+log.info(f"  - API Key: {OPENAI_API_KEY[:8]}...{OPENAI_API_KEY[-4:]}")
 
 # Initialize clients
 client = OpenAI(api_key=OPENAI_API_KEY)
@@ -89,43 +166,164 @@ async_openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 if USE_ELEVENLABS:
     eleven_client = AsyncElevenLabs(api_key=ELEVEN_API_KEY)
-    print("✅ ElevenLabs client initialized")
+    log.info("✅ ElevenLabs client initialized")
 else:
     eleven_client = None
-    print("⚠️  ElevenLabs not configured - using OpenAI TTS")
+    log.warning("⚠️  ElevenLabs not configured - using OpenAI TTS")
+
+
+def tts_fingerprint(language: str) -> str:
+    """Identifies the voice that would synthesize `language` with the current settings"""
+    if USE_ELEVENLABS:
+        voice_id = ELEVEN_VOICE_ID_EN if language == 'en' else ELEVEN_VOICE_ID_PT
+        return (f"eleven:{voice_id}:{ELEVEN_MODEL}:{ELEVEN_STABILITY}:{ELEVEN_SIMILARITY_BOOST}:"
+                f"{ELEVEN_STYLE}:{ELEVEN_USE_SPEAKER_BOOST}")
+    return f"openai:{TTS_MODEL}:{TTS_VOICE}:{TTS_SPEED}"
 
 
 class LangChainVoiceRAG:
     """Enhanced RAG service with LangChain, caching, and bilingual support"""
 
     def __init__(self):
-        # Load FAISS index
-        self.index = faiss.read_index("data/index.faiss")
-
-        with open("data/metadata.pkl", "rb") as f:
-            self.metadata = pickle.load(f)
+        # Query embeddings: must be the provider that built the index (checked at load)
+        self.embeddings = create_embedding_provider(EMBEDDING_PROVIDER, EMBEDDING_MODEL, EMBEDDING_MODEL_PATH,
+                                                    client, async_openai_client, EMBEDDING_THREADS)
+
+        # Enhanced caching: Response + Semantic (bounded LRU + TTL)
+        self.response_cache = BoundedCache(CACHE_SIZE, CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+        self.semantic_cache = SemanticCache(CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+        self.embedding_cache = BoundedCache(CACHE_SIZE, CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+        # Exact retrieval results and query embeddings shared by all workers (semantic lookups stay local)
+        self.cache_backend = create_cache_backend(CACHE_BACKEND, CACHE_PATH, SHARED_CACHE_SIZE,
+                                                  CACHE_TTL_SECONDS, CACHE_MAX_BYTES)
+        if self.cache_backend is not None:
+            self.response_cache = SharedCache(self.response_cache, self.cache_backend, "search", JSON_CODEC,
+                                              version=lambda: self.kb_version)
+            self.embedding_cache = SharedCache(self.embedding_cache, self.cache_backend, "embedding", VECTOR_CODEC,
+                                               version=self.embeddings.signature)
+        elif WORKERS > 1:
+            log.warning(f"⚠️  WORKERS={WORKERS} with CACHE_BACKEND=memory: every worker warms its own caches")
+        self.answer_cache = AnswerCache(
+            CACHE_SIZE, CACHE_MAX_BYTES, CACHE_TTL_SECONDS, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_PATH or None
+        ) if ANSWER_CACHE_ENABLED else None
+        self.prompt_audio = PromptAudioCache(PROMPT_AUDIO_DIR, self.text_to_speech, tts_fingerprint)
+        self.stt = create_stt_backend(STT_BACKEND, async_openai_client, WHISPER_MODEL)
+        self._pending_embeddings: Dict[str, asyncio.Task] = {}
+        # Queries of concurrent sessions: one embeddings request, one batched index.search
+        self.embed_batcher = MicroBatcher(self._embed_batch, SEARCH_BATCH_WINDOW_MS / 1000, SEARCH_BATCH_MAX)
+        self.search_batcher = MicroBatcher(self._search_batch, SEARCH_BATCH_WINDOW_MS / 1000, SEARCH_BATCH_MAX)
+        self._reload_lock = asyncio.Lock()
 
-        # Enhanced caching: Response + Semantic
-        self.response_cache = {}
-        self.semantic_cache: Dict[str, Tuple[np.ndarray, List[Dict]]] = {}
+        # Load FAISS index
+        self.load_knowledge_base()
 
         # Initialize LangChain components
-        self.embeddings = OpenAIEmbeddings(
-            model=EMBEDDING_MODEL,
-            openai_api_key=OPENAI_API_KEY
-        )
-
         self.llm = ChatOpenAI(
             model=CHAT_MODEL,
             temperature=0.3,  # Slightly higher for more natural responses
             streaming=True,
+            stream_usage=True,  # last chunk reports prompt tokens, and how many hit the prompt cache
             openai_api_key=OPENAI_API_KEY
         )
-
-        print("✅ LangChain RAG initialized:")
-        print(f"  - FAISS index: {self.index.ntotal} vectors")
-        print(f"  - Metadata: {len(self.metadata)} chunks")
-        print("  - Knowledge base ready")
+        # Static instructions first, then history, then this turn's context: a stable cacheable prefix
+        self.chains = {variant: prompt | self.llm for variant, prompt in build_prompts().items()}
+
+        log.info("✅ LangChain RAG initialized:")
+        log.info(f"  - FAISS index: {self.kb.info()['index_type']}, {self.index.ntotal} vectors (version {self.kb_version})")
+        log.info(f"  - Metadata: {len(self.metadata)} chunks")
+        log.info(f"  - BM25: {self.kb.lexical.terms} terms, hybrid search" if self.kb.lexical is not None
+              else "  - BM25: no lexical.bin (re-run ingest_pdfs.py), vector search only")
+        log.info(f"  - Caches: {CACHE_SIZE} entries / {CACHE_MAX_BYTES // (1024 * 1024)} MB each, TTL {CACHE_TTL_SECONDS:.0f}s"
+              + (f", shared via {CACHE_PATH}" if self.cache_backend is not None else ""))
+        log.info("  - Knowledge base ready")
+
+    def load_knowledge_base(self, index_path: str = INDEX_PATH,
+                            metadata_path: str = METADATA_PATH) -> None:
+        """(Re)load the FAISS index and metadata, dropping results cached for the old index"""
+        self.swap_knowledge_base(KnowledgeBase.load(index_path, metadata_path, FAISS_NPROBE, HNSW_EF_SEARCH,
+                                                    INDEX_MMAP, embedding=self.embeddings.signature,
+                                                    dimension=self.embeddings.dimension))
+
+    def swap_knowledge_base(self, kb: KnowledgeBase) -> None:
+        """Serve `kb` from now on; searches already running finish on the snapshot they hold"""
+        self.kb = kb
+        self.invalidate_caches()
+
+    async def areload_knowledge_base(self, index_path: Optional[str] = None,
+                                     metadata_path: Optional[str] = None) -> KnowledgeBase:
+        """Load a new index in a worker thread, then swap it in (the old one stays on failure)"""
+        async with self._reload_lock:
+            kb = await asyncio.to_thread(
+                KnowledgeBase.load, index_path or self.kb.index_path, metadata_path or self.kb.metadata_path,
+                FAISS_NPROBE, HNSW_EF_SEARCH, INDEX_MMAP,
+                embedding=self.embeddings.signature, dimension=self.embeddings.dimension
+            )
+            self.swap_knowledge_base(kb)
+        log.info(f"🔄 Knowledge base {kb.version} loaded: {kb.ntotal} vectors")
+        return kb
+
+    @property
+    def index(self) -> faiss.Index:
+        return self.kb.index
+
+    @property
+    def metadata(self) -> Mapping[int, Dict]:
+        return self.kb.metadata
+
+    @property
+    def kb_version(self) -> str:
+        return self.kb.version
+
+    def invalidate_caches(self) -> None:
+        """Forget retrieval results (query embeddings stay valid across index rebuilds)"""
+        self.response_cache.clear()
+        self.semantic_cache.clear()
+        if self.answer_cache is not None:
+            # Answers depend on the KB, the chat model and the voice (and are matched by query embedding)
+            self.answer_cache.set_version(hashlib.md5(
+                f"{self.kb_version}|{CHAT_MODEL}|{self.embeddings.signature}|{tts_fingerprint('en')}|{tts_fingerprint('pt')}".encode()
+            ).hexdigest()[:12])
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit/miss/eviction counters and sizes of every cache"""
+        stats = {
+            "response": self.response_cache.stats(),
+            "semantic": self.semantic_cache.stats(),
+            "embedding": self.embedding_cache.stats(),
+        }
+        if self.answer_cache is not None:
+            stats["answer"] = self.answer_cache.stats()
+        return stats
+
+    async def alookup_answer(self, query: str, language: str) -> Tuple[Optional[Dict], Optional[List[float]]]:
+        """
+        Cached final answer ({"text", "audio"}) for a stateless question, if any, and
+        the query embedding used to look for similar answers (None if none was needed)
+        """
+        if self.answer_cache is None:
+            return None, None
+
+        query_embedding = None
+        with span("cache_lookup"):
+            answer = await self.answer_cache.aget(query, language)
+        if answer is None:
+            hits, coverage = self.kb.lexical_search(query, HYBRID_CANDIDATES)
+            if is_decisive(hits, coverage, LEXICAL_CONFIDENCE, LEXICAL_MARGIN):
+                return None, None  # retrieval won't embed this query: no request just for the similar-answer lookup
+            # Retrieval embeds the query too, so this shares its (cached or in-flight) request
+            query_embedding = await self._aembed_query_cached(query)
+            with span("cache_lookup"):
+                answer = self.answer_cache.get_similar(query_embedding, language)
+        if answer is not None:
+            log.debug(f"  ⚡ Answer cache hit: {answer['query']}")
+        return answer, query_embedding
+
+    async def store_answer(self, query: str, language: str, query_embedding: Optional[List[float]],
+                           text: str, audio: bytes) -> None:
+        """Remember the final answer of a stateless question (without an embedding: exact matches only)"""
+        if self.answer_cache is None or not text:
+            return
+        await self.answer_cache.aput(query, language, query_embedding, text, audio)
 
     def detect_language(self, text: str) -> str:
         """Strict language detection for English vs Portuguese"""
@@ -166,52 +364,159 @@ class LangChainVoiceRAG:
         text_lower = text.lower()
         return 'negative' if any(word in text_lower for word in negative_words) else 'neutral'
 
-    @lru_cache(maxsize=CACHE_SIZE)
-    def _embed_query_cached(self, query: str):
+    def _embed_query_cached(self, query: str) -> List[float]:
         """Cached embedding for speed"""
-        return self.embeddings.embed_query(query)
+        embedding = self.embedding_cache.get(query)
+        if embedding is None:
+            with span("embed"):
+                embedding = self.embeddings.embed_query(query)
+            self.embedding_cache.set(query, embedding)
+        return embedding
+
+    async def _aembed_query_cached(self, query: str) -> List[float]:
+        """Cached embedding without blocking the event loop (concurrent callers share one request)"""
+        embedding = await self.embedding_cache.aget(query)
+        if embedding is not None:
+            return embedding
+
+        task = self._pending_embeddings.get(query)
+        if task is None:
+            task = asyncio.ensure_future(self._aembed_and_remember(query))
+            self._pending_embeddings[query] = task
+            task.add_done_callback(lambda done: self._pending_embeddings.pop(query, None))
+        # A cancelled caller must not cancel the request other callers are waiting on
+        with span("embed"):
+            return await asyncio.shield(task)
+
+    async def _aembed_and_remember(self, query: str) -> List[float]:
+        """One batched embedding, written to the (possibly shared) cache off the event loop"""
+        embedding = await self.embed_batcher.submit(query)
+        await self.embedding_cache.aset(query, embedding)
+        return embedding
+
+    async def _embed_batch(self, queries: List[str]) -> List[List[float]]:
+        """Queries gathered by embed_batcher, in one embeddings request"""
+        return (await self.embeddings.aembed(queries)).tolist()
+
+    async def _search_batch(self, requests: List[Tuple[KnowledgeBase, List[float], int, List[Tuple[int, float]]]]
+                            ) -> List[List[Dict]]:
+        """Searches gathered by search_batcher: one index.search per KB snapshot (and k)"""
+        groups: Dict[Tuple[KnowledgeBase, int], List[int]] = {}
+        for i, (kb, _, k, _) in enumerate(requests):
+            groups.setdefault((kb, k), []).append(i)
+        results: List[List[Dict]] = [[] for _ in requests]
+        for (kb, k), positions in groups.items():
+            # FAISS releases the GIL: other sessions keep streaming while the batch runs
+            batch = await asyncio.to_thread(kb.hybrid_search_many, [requests[i][1] for i in positions], k,
+                                            [requests[i][3] for i in positions], HYBRID_CANDIDATES)
+            for i, chunks in zip(positions, batch):
+                results[i] = chunks
+        return results
+
+    def _semantic_cache_lookup(self, query_embedding: List[float]) -> Optional[List[Dict]]:
+        """Return results of a previous, similar enough query"""
+        with span("cache_lookup"):
+            hit = self.semantic_cache.lookup(query_embedding)
+        if hit is None:
+            return None
+
+        similarity, cached_results = hit
+        log.debug(f"  ⚡ Semantic cache hit! Similarity: {similarity:.2f}")
+        return cached_results
+
+    def _lexical_search(self, kb: KnowledgeBase, query: str,
+                        k: int) -> Tuple[List[Tuple[int, float]], Optional[List[Dict]]]:
+        """
+        BM25 hits for the query, plus final results when they are decisive on their
+        own: (nearly) every query term in one chunk that clearly leads the rest.
+        Such queries skip the embedding request entirely.
+        """
+        hits, coverage = kb.lexical_search(query, HYBRID_CANDIDATES)
+        if not is_decisive(hits, coverage, LEXICAL_CONFIDENCE, LEXICAL_MARGIN):
+            return hits, None
+
+        results = kb.chunks([(vector_id, None) for vector_id, _ in hits[:k]])
+        log.debug(f"  ⚡ Lexical match (coverage {coverage:.2f}), embedding skipped")
+        return hits, results
+
+    def _search_index(self, kb: KnowledgeBase, cache_key: str, query_embedding: List[float], k: int,
+                      lexical_hits: List[Tuple[int, float]]) -> List[Dict]:
+        """Hybrid FAISS + BM25 search, then cache results both exactly and semantically"""
+        results = kb.hybrid_search(query_embedding, k, lexical_hits, HYBRID_CANDIDATES)
+        self._remember_results(kb, cache_key, query_embedding, results)
+        return results
+
+    def _remember_results(self, kb: KnowledgeBase, cache_key: str, query_embedding: Optional[List[float]],
+                          results: List[Dict]) -> None:
+        """Cache both exact and semantic (lexical matches: exact only) - unless the KB was swapped while we searched"""
+        if kb is self.kb:
+            self.response_cache.set(cache_key, results)
+            if query_embedding is not None:
+                self.semantic_cache.add(cache_key, query_embedding, results)
+
+    async def _aremember_results(self, kb: KnowledgeBase, cache_key: str, query_embedding: Optional[List[float]],
+                                 results: List[Dict]) -> None:
+        """_remember_results with the shared cache written off the event loop"""
+        if kb is self.kb:
+            if query_embedding is not None:
+                self.semantic_cache.add(cache_key, query_embedding, results)
+            await self.response_cache.aset(cache_key, results)
 
     def search_knowledge_base(self, query: str, k: int = TOP_K) -> List[Dict]:
         """Search FAISS with semantic caching"""
         cache_key = hashlib.md5(query.encode()).hexdigest()
 
         # Exact cache hit
-        if cache_key in self.response_cache:
-            return self.response_cache[cache_key]
+        with span("cache_lookup"):
+            cached_results = self.response_cache.get(cache_key)
+        if cached_results is not None:
+            return cached_results
+
+        kb = self.kb  # one snapshot for the whole search, even if a reload swaps it meanwhile
+        with span("search"):
+            lexical_hits, results = self._lexical_search(kb, query, k)
+        if results is not None:
+            self._remember_results(kb, cache_key, None, results)
+            return results
 
         query_embedding = self._embed_query_cached(query)
-        query_vector_array = np.array([query_embedding], dtype='float32')
 
         # Semantic cache: Check for similar queries
-        for cached_key, (cached_emb, cached_results) in self.semantic_cache.items():
-            similarity = cosine_similarity([query_embedding], [cached_emb])[0][0]
-            if similarity > SEMANTIC_CACHE_THRESHOLD:
-                print(f"  ⚡ Semantic cache hit! Similarity: {similarity:.2f}")
-                return cached_results
-
-        # FAISS search
-        distances, indices = self.index.search(query_vector_array, k)
-
-        results = []
-        for idx, dist in zip(indices[0], distances[0]):
-            if idx < len(self.metadata):
-                chunk_data = self.metadata[idx]
-                results.append({
-                    "text": chunk_data["text"],
-                    "source": chunk_data["source"],
-                    "chunk_id": chunk_data["chunk_id"],
-                    "distance": float(dist)
-                })
-
-        # Cache both exact and semantic
-        self.response_cache[cache_key] = results
-        self.semantic_cache[cache_key] = (np.array(query_embedding), results)
-
-        # Limit semantic cache size
-        if len(self.semantic_cache) > CACHE_SIZE:
-            oldest_key = list(self.semantic_cache.keys())[0]
-            del self.semantic_cache[oldest_key]
+        cached_results = self._semantic_cache_lookup(query_embedding)
+        if cached_results is not None:
+            return cached_results
+
+        with span("search"):
+            return self._search_index(kb, cache_key, query_embedding, k, lexical_hits)
 
+    async def asearch_knowledge_base(self, query: str, k: int = TOP_K) -> List[Dict]:
+        """Async variant of search_knowledge_base (non-blocking, micro-batched with other sessions)"""
+        cache_key = hashlib.md5(query.encode()).hexdigest()
+
+        # Exact cache hit
+        with span("cache_lookup"):
+            cached_results = await self.response_cache.aget(cache_key)
+        if cached_results is not None:
+            return cached_results
+
+        kb = self.kb  # one snapshot for the whole search, even if a reload swaps it meanwhile
+        with span("search"):
+            lexical_hits, results = self._lexical_search(kb, query, k)
+        if results is not None:
+            await self._aremember_results(kb, cache_key, None, results)
+            return results
+
+        query_embedding = await self._aembed_query_cached(query)
+
+        # Semantic cache: Check for similar queries
+        cached_results = self._semantic_cache_lookup(query_embedding)
+        if cached_results is not None:
+            return cached_results
+
+        # Batched with the searches of other sessions arriving within SEARCH_BATCH_WINDOW_MS
+        with span("search"):
+            results = await self.search_batcher.submit((kb, query_embedding, k, lexical_hits))
+        await self._aremember_results(kb, cache_key, query_embedding, results)
         return results
 
     def check_profanity(self, text: str) -> Tuple[bool, Optional[str]]:
@@ -222,9 +527,10 @@ class LangChainVoiceRAG:
             "merda", "caralho", "puta", "foda", "burro", "idiota"
         ]
 
+        # Whole words only: "disputas", "assinatura" and "hello" are fine
         text_lower = text.lower()
         for word in profanity_words:
-            if word in text_lower:
+            if re.search(rf"\b{word}(?:s|es|ing|ed)?\b", text_lower):
                 lang = self.detect_language(text)
                 if lang == 'en':
                     return True, "I'm sorry, I cannot respond to questions with inappropriate language. Please rephrase your question respectfully."
@@ -269,134 +575,91 @@ class LangChainVoiceRAG:
 
         return True
 
-    def create_chain_with_memory(self, conversation_history: List[Dict], language: str = 'pt', sentiment: str = 'neutral'):
-        """Create LangChain chain with conversation memory, language, and empathy support"""
-
-        # Empathy injection based on sentiment
-        empathy_en = "\n\nEMPATHY: If user seems frustrated, start with: 'I'm sorry to hear that, let's fix this together.'" if sentiment == 'negative' else ""
-        empathy_pt = "\n\nEMPATIA: Se o utilizador parece frustrado, comece com: 'Lamento ouvir isso, vamos resolver juntos.'" if sentiment == 'negative' else ""
-
-        # Bilingual system prompts with strict language matching
-        if language == 'en':
-            system_template = """You are Maria, a warm and friendly customer service agent for VoiceAI Support in Mozambique.
-
-CRITICAL LANGUAGE RULE:
-🔴 The user is speaking ENGLISH. You MUST respond ONLY in ENGLISH. Never mix Portuguese!
-
-SPEAK LIKE A REAL HUMAN:
-- Talk casually like chatting with a friend over coffee
-- Use contractions: "I'm", "you'll", "that's", "it's"
-- Add personality: "Oh!", "Well...", "Actually...", "You know what?"
-- Vary sentence length - mix short and medium sentences
-- Show enthusiasm: "Great choice!", "I'd love to help!"
-- Be personal: "I see you're interested in...", "For your needs..."
-
-AVAILABLE INFO:
-{context}
-
-STRICT RULES:
-1. ONLY use info from documentation above - don't make anything up
-2. Missing info? Say: "Hmm, I don't have that detail. Best to email apoio@mozaitelecomunicacao.co.mz or visit us at Av. Julius Nyerere, 2500, Maputo."
-3. Keep answers SHORT - max 2-3 sentences
-4. For changes/complaints: "You'll need to contact apoio@mozaitelecomunicacao.co.mz for that"
-5. Remember context from chat history
-
-NATURAL EXAMPLES:
-❌ "The Premium 5G plan costs 1,600 meticais per month."
-✅ "Oh, the Premium 5G? That's 1,600 meticais a month - pretty solid deal!"
-
-❌ "I understand. Let me help you with that."
-✅ "Got it! So you're looking for student plans, right? I'd suggest..."
-""" + empathy_en
-
-        else:  # Portuguese
-            system_template = """Você é a Maria, uma agente simpática e calorosa do Suporte VoiceAI em Moçambique.
-
-REGRA CRÍTICA DE IDIOMA:
-🔴 O utilizador está a falar PORTUGUÊS. Você DEVE responder APENAS em PORTUGUÊS. Nunca misture inglês!
-
-FALE COMO UMA PESSOA REAL:
-- Converse casualmente como se estivesse a tomar café com um amigo
-- Use contrações naturais: "tá", "né", "pra", "tamos"
-- Adicione personalidade: "Ah!", "Pois...", "Na verdade...", "Sabes?"
-- Varie o comprimento - misture frases curtas e médias
-- Mostre entusiasmo: "Boa escolha!", "Adoraria ajudar!"
-- Seja pessoal: "Vejo que está interessado em...", "Para o seu caso..."
-
-INFORMAÇÃO DISPONÍVEL:
-{context}
-
-REGRAS ESTRITAS:
-1. SÓ use informação da documentação acima - não invente nada
-2. Info em falta? Diga: "Hmm, não tenho esse detalhe. Melhor enviar email para apoio@mozaitelecomunicacao.co.mz ou visitar-nos na Av. Julius Nyerere, 2500, Maputo."
-3. Respostas CURTAS - máximo 2-3 frases
-4. Para mudanças/reclamações: "Para isso precisa contactar apoio@mozaitelecomunicacao.co.mz"
-5. Lembre-se do contexto da conversa
-
-EXEMPLOS NATURAIS:
-❌ "O plano Premium 5G custa 1.600 meticais por mês."
-✅ "Ah, o Premium 5G? São 1.600 meticais por mês - ótimo negócio!"
-
-❌ "Entendo. Deixe-me ajudá-lo com isso."
-✅ "Entendi! Então procura planos para estudantes, certo? Sugiro..."
-""" + empathy_pt
-
-        # Create prompt template
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_template),
-            MessagesPlaceholder(variable_name="history"),
-            ("human", "{question}")
-        ])
-
-        # Convert conversation history to LangChain format
+    def answer_chain(self, language: str = 'pt', sentiment: str = 'neutral'):
+        """Precompiled prompt | LLM chain for this language and sentiment (built once at startup)"""
+        return self.chains[('en' if language == 'en' else 'pt', 'negative' if sentiment == 'negative' else 'neutral')]
+
+    def history_messages(self, conversation_history: List[Dict], query: str) -> List[BaseMessage]:
+        """Rolling summary + recent turns within budget, as LangChain messages"""
+        # The question being answered is already in the history; the prompt adds it last
+        if conversation_history and conversation_history[-1] == {"role": "user", "content": query}:
+            conversation_history = conversation_history[:-1]
+
         history_messages: List[BaseMessage] = []
-        for msg in conversation_history[-10:]:  # Last 10 messages for context
+        for msg in fit_history(conversation_history, HISTORY_MAX_TOKENS):
             if msg["role"] == "user":
                 history_messages.append(HumanMessage(content=msg["content"]))
             elif msg["role"] == "assistant":
                 history_messages.append(AIMessage(content=msg["content"]))
+            elif msg["role"] == SUMMARY_ROLE:
+                history_messages.append(SystemMessage(content=f"Conversation so far (summary): {msg['content']}"))
+        return history_messages
 
-        # Create chain
-        chain = (
-            {
-                "context": lambda x: x["context"],
-                "question": lambda x: x["question"],
-                "history": lambda x: history_messages
-            }
-            | prompt
-            | self.llm
-        )
-
-        return chain
-
-    def summarize_context(self, context_chunks: List[Dict], language: str = 'pt') -> str:
-        """Summarize and merge context if too large"""
+    def _join_context(self, context_chunks: List[Dict]) -> str:
+        """Number and join retrieved chunks into one context string"""
         context_parts = []
         for i, chunk in enumerate(context_chunks, 1):
             context_parts.append(f"[Doc {i}]\n{chunk['text']}")
 
-        full_context = "\n\n".join(context_parts)
+        return "\n\n".join(context_parts)
 
-        # If context is too large, summarize with tighter threshold
-        if len(full_context) > CONTEXT_MAX_CHARS:
-            prompt = "Summarize and merge these docs concisely, keeping all key facts:" if language == 'en' else "Resume e combine estes documentos de forma concisa, mantendo todos os factos-chave:"
+    def _summary_messages(self, full_context: str, language: str) -> List[Dict]:
+        """Messages for the context summarization call"""
+        prompt = "Summarize and merge these docs concisely, keeping all key facts:" if language == 'en' else "Resume e combine estes documentos de forma concisa, mantendo todos os factos-chave:"
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": full_context}
+        ]
 
-            summary_response = client.chat.completions.create(
-                model="gpt-4o-mini",
+    async def asummarize_history(self, summary: str, messages: List[Dict]) -> str:
+        """Fold old turns into the session's rolling summary (runs after the answer was sent)"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        with span("history_summary"):
+            response = await async_openai_client.chat.completions.create(
+                model=CHAT_MODEL,
                 messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": full_context}
+                    {"role": "system", "content": "Update the summary of this customer support call with the new "
+                                                  "turns. Keep names, plans, numbers and open requests; be brief. "
+                                                  "Write in the language of the conversation."},
+                    {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
                 ],
                 temperature=0.1,
-                max_tokens=800
+                max_tokens=HISTORY_MAX_TOKENS // 4
             )
-            return summary_response.choices[0].message.content
+        return response.choices[0].message.content
+
+    def build_context(self, query: str, context_chunks: List[Dict], language: str = 'pt') -> str:
+        """Fit the retrieved chunks into CONTEXT_MAX_TOKENS (packed locally, or LLM-summarized if opted in)"""
+        if CONTEXT_SUMMARIZER:
+            full_context = self._join_context(context_chunks)
+            if count_tokens(full_context) > CONTEXT_MAX_TOKENS:
+                summary_response = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._summary_messages(full_context, language),
+                    temperature=0.1,
+                    max_tokens=800
+                )
+                return summary_response.choices[0].message.content
+
+        return pack_context(query, context_chunks, CONTEXT_MAX_TOKENS)
+
+    async def abuild_context(self, query: str, context_chunks: List[Dict], language: str = 'pt') -> str:
+        """Async variant of build_context using AsyncOpenAI"""
+        if CONTEXT_SUMMARIZER:
+            full_context = self._join_context(context_chunks)
+            if count_tokens(full_context) > CONTEXT_MAX_TOKENS:
+                summary_response = await async_openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._summary_messages(full_context, language),
+                    temperature=0.1,
+                    max_tokens=800
+                )
+                return summary_response.choices[0].message.content
 
-        return full_context
+        return pack_context(query, context_chunks, CONTEXT_MAX_TOKENS)
 
-    def generate_response(self, query: str, context_chunks: List[Dict],
-                         conversation_history: List[Dict]) -> str:
-        """Generate response with caching, empathy, and bilingual support"""
+    def _screen_query(self, query: str, context_chunks: List[Dict]) -> Tuple[str, str, Optional[str], bool]:
+        """Pre-LLM checks: returns (language, sentiment, canned_reply, is_relevant)"""
 
         # Detect language and sentiment
         language = self.detect_language(query)
@@ -405,27 +668,66 @@ EXEMPLOS NATURAIS:
         # Check profanity
         has_profanity, profanity_msg = self.check_profanity(query)
         if has_profanity:
-            return profanity_msg
+            return language, sentiment, profanity_msg, False
 
         # Check relevance
         is_relevant = self.check_relevance(query, context_chunks)
 
-        # Build context (with summarization if needed)
-        context = self.summarize_context(context_chunks, language)
+        return language, sentiment, None, is_relevant
+
+    def _log_generation(self, query: str, language: str, sentiment: str, context_chunks: List[Dict],
+                        context: str, is_relevant: bool, conversation_history: List[Dict]) -> None:
+        """Log what goes into the LLM call"""
+        log.debug(f"\n🔍 Query: {query}")
+        log.debug(f"🌐 Language: {language.upper()}")
+        log.debug(f"😊 Sentiment: {sentiment.upper()}")
+        log.debug(f"📚 Retrieved {len(context_chunks)} chunks")
+        log.debug(f"📏 Context size: {count_tokens(context)} tokens ({len(context)} chars)")
+        log.debug(f"🎯 Relevance: {'RELEVANT' if is_relevant else 'NOT RELEVANT'}")
+        log.debug(f"💬 History: {len(conversation_history)} messages")
+
+    def _prepare_generation(self, query: str, context_chunks: List[Dict],
+                            conversation_history: List[Dict]) -> Tuple[str, str, str, Optional[str]]:
+        """Shared pre-LLM steps: returns (language, sentiment, context, canned_reply)"""
+        language, sentiment, canned_reply, is_relevant = self._screen_query(query, context_chunks)
+        if canned_reply is not None:
+            return language, sentiment, "", canned_reply
+
+        # Build context (packed into the token budget)
+        with span("context_build"):
+            context = self.build_context(query, context_chunks, language)
+        self._log_generation(query, language, sentiment, context_chunks, context, is_relevant, conversation_history)
+
+        return language, sentiment, context, None
+
+    async def _aprepare_generation(self, query: str, context_chunks: List[Dict],
+                                   conversation_history: List[Dict]) -> Tuple[str, str, str, Optional[str]]:
+        """Async variant of _prepare_generation"""
+        language, sentiment, canned_reply, is_relevant = self._screen_query(query, context_chunks)
+        if canned_reply is not None:
+            return language, sentiment, "", canned_reply
+
+        with span("context_build"):
+            context = await self.abuild_context(query, context_chunks, language)
+        self._log_generation(query, language, sentiment, context_chunks, context, is_relevant, conversation_history)
+
+        return language, sentiment, context, None
 
-        # Log
-        print(f"\n🔍 Query: {query}")
-        print(f"🌐 Language: {language.upper()}")
-        print(f"😊 Sentiment: {sentiment.upper()}")
-        print(f"📚 Retrieved {len(context_chunks)} chunks")
-        print(f"📏 Context size: {len(context)} chars")
-        print(f"🎯 Relevance: {'RELEVANT' if is_relevant else 'NOT RELEVANT'}")
-        print(f"💬 History: {len(conversation_history)} messages")
+    def generate_response(self, query: str, context_chunks: List[Dict],
+                         conversation_history: List[Dict]) -> str:
+        """Generate response with caching, empathy, and bilingual support"""
+        language, sentiment, context, canned_reply = self._prepare_generation(
+            query, context_chunks, conversation_history
+        )
+        if canned_reply is not None:
+            return canned_reply
 
-        # Create and invoke chain with empathy
-        chain = self.create_chain_with_memory(conversation_history, language, sentiment)
+        # Invoke the precompiled chain for this language/sentiment
+        chain = self.answer_chain(language, sentiment)
 
+        started = time.perf_counter()
         response_stream = chain.stream({
+            "history": self.history_messages(conversation_history, query),
             "context": context,
             "question": query
         })
@@ -433,29 +735,61 @@ EXEMPLOS NATURAIS:
         # Collect full response
         full_response = ""
         for chunk in response_stream:
+            record_prompt_usage(getattr(chunk, 'usage_metadata', None))
             if hasattr(chunk, 'content'):
                 content = chunk.content
                 if isinstance(content, str):
+                    if content and not full_response:
+                        record("llm_first_token", time.perf_counter() - started)
                     full_response += content
+        record("llm_complete", time.perf_counter() - started)
 
-        print(f"✅ Response: {full_response[:100]}...")
+        log.debug(f"✅ Response: {full_response[:100]}...")
         return full_response
 
-    async def transcribe_audio(self, audio_bytes):
-        """Transcribe audio using Whisper (async)"""
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-            tmp_file.write(audio_bytes)
-            tmp_path = tmp_file.name
+    async def astream_response(self, query: str, context_chunks: List[Dict],
+                               conversation_history: List[Dict]) -> AsyncGenerator[str, None]:
+        """Stream the response token by token (feeds the sentence-level TTS pipeline)"""
+        language, sentiment, context, canned_reply = await self._aprepare_generation(
+            query, context_chunks, conversation_history
+        )
+        if canned_reply is not None:
+            yield canned_reply
+            return
+
+        chain = self.answer_chain(language, sentiment)
 
-        try:
-            with open(tmp_path, "rb") as audio_file:
-                transcript = await async_openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-            return transcript.text
-        finally:
-            os.unlink(tmp_path)
+        started, first = time.perf_counter(), True
+        # Closing this generator (barge-in) closes the completion stream right away
+        async with contextlib.aclosing(chain.astream({
+            "history": self.history_messages(conversation_history, query),
+            "context": context,
+            "question": query
+        })) as stream:
+            async for chunk in stream:
+                record_prompt_usage(getattr(chunk, 'usage_metadata', None))
+                content = getattr(chunk, 'content', None)
+                if isinstance(content, str) and content:
+                    if first:
+                        record("llm_first_token", time.perf_counter() - started)
+                        first = False
+                    yield content
+        record("llm_complete", time.perf_counter() - started)
+
+    async def agenerate_response(self, query: str, context_chunks: List[Dict],
+                                 conversation_history: List[Dict]) -> str:
+        """Async variant of generate_response - other sessions keep running while we wait"""
+        full_response = ""
+        async for content in self.astream_response(query, context_chunks, conversation_history):
+            full_response += content
+
+        log.debug(f"✅ Response: {full_response[:100]}...")
+        return full_response
+
+    async def transcribe_audio(self, audio_bytes: bytes, mime_type: Optional[str] = None) -> str:
+        """Transcribe audio with the configured STT backend (Whisper by default)"""
+        with span("transcribe"):
+            return await self.stt.transcribe(audio_bytes, mime_type)
 
     async def text_to_speech_elevenlabs(self, text: str, language: str = 'en') -> bytes:
         """Convert text to speech using ElevenLabs (ultra-realistic voice)"""
@@ -470,19 +804,24 @@ EXEMPLOS NATURAIS:
 
         # Generate audio using async streaming
         audio_chunks = []
-        async for chunk in eleven_client.text_to_speech.stream(
+        started = time.perf_counter()
+        async with contextlib.aclosing(eleven_client.text_to_speech.stream(
             text=text,
             voice_id=voice_id,
             model_id=ELEVEN_MODEL,
             voice_settings=voice_settings
-        ):
-            if chunk:
-                audio_chunks.append(chunk)
+        )) as stream:
+            async for chunk in stream:
+                if chunk:
+                    if not audio_chunks:
+                        record("tts_first_byte", time.perf_counter() - started)
+                    audio_chunks.append(chunk)
 
         return b''.join(audio_chunks)
 
     async def text_to_speech_openai(self, text: str) -> bytes:
         """Convert text to speech using OpenAI (fallback)"""
+        started = time.perf_counter()
         response = await async_openai_client.audio.speech.create(
             model=TTS_MODEL,
             voice=TTS_VOICE,
@@ -490,22 +829,94 @@ EXEMPLOS NATURAIS:
             speed=TTS_SPEED
         )
 
-        audio_data = io.BytesIO()
-        async for chunk in response.iter_bytes(chunk_size=4096):
-            audio_data.write(chunk)
-
-        return audio_data.getvalue()
+        # Non-streaming create: the body has already been read, first byte = whole audio
+        record("tts_first_byte", time.perf_counter() - started)
+        return response.content
 
     async def text_to_speech(self, text: str, language: str = 'en') -> bytes:
         """Convert text to speech - uses ElevenLabs if available, OpenAI as fallback"""
-        if USE_ELEVENLABS:
-            return await self.text_to_speech_elevenlabs(text, language)
-        else:
-            return await self.text_to_speech_openai(text)
+        with span("tts_complete"):
+            if USE_ELEVENLABS:
+                return await self.text_to_speech_elevenlabs(text, language)
+            else:
+                return await self.text_to_speech_openai(text)
 
 
 # Initialize service
 rag_service = LangChainVoiceRAG()
+sessions = SessionStore(SESSION_MAX, SESSION_IDLE_SECONDS)
+
+
+@app.on_event("startup")
+async def warm_prompt_audio():
+    """Render the fixed prompts in the background so the first caller doesn't wait on TTS"""
+    async def warm():
+        try:
+            await rag_service.prompt_audio.warm(FIXED_PROMPTS)
+            log.info(f"✅ Fixed prompt audio ready ({len(FIXED_PROMPTS)} prompts)")
+        except Exception as e:
+            log.warning(f"⚠️  Could not pre-render prompt audio: {e}")
+
+    asyncio.create_task(warm())
+
+
+@app.on_event("startup")
+async def watch_knowledge_base():
+    """Reload the knowledge base when ingest replaces the index files"""
+    if KB_WATCH_SECONDS <= 0:
+        return
+
+    async def watch():
+        last_seen = failed = rag_service.kb.signature
+        while True:
+            await asyncio.sleep(KB_WATCH_SECONDS)
+            kb = rag_service.kb
+            signature = file_signature(*kb.paths)
+            # Reload once the files have stopped changing for a whole interval
+            if signature not in (None, kb.signature, failed) and signature == last_seen:
+                try:
+                    await rag_service.areload_knowledge_base()
+                except Exception as e:
+                    failed = signature  # don't retry until the files change again
+                    log.warning(f"⚠️  Knowledge base reload failed, keeping version {kb.version}: {e}")
+            last_seen = signature
+
+    asyncio.create_task(watch())
+
+
+def require_admin(request: Request) -> None:
+    """Admin endpoints need X-Admin-Token or a Bearer token (or, without ADMIN_TOKEN, a local client)"""
+    if ADMIN_TOKEN:
+        bearer = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if ADMIN_TOKEN not in (request.headers.get("x-admin-token"), bearer):
+            raise HTTPException(status_code=401, detail="Invalid admin token")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost", "testclient"):
+        raise HTTPException(status_code=403, detail="Set ADMIN_TOKEN to use admin endpoints remotely")
+
+
+@app.get("/admin/kb")
+async def knowledge_base_info(request: Request):
+    """Active knowledge base version and size"""
+    require_admin(request)
+    return rag_service.kb.info()
+
+
+@app.post("/admin/reload")
+async def reload_knowledge_base(request: Request):
+    """Load the index + metadata from disk and swap them in without dropping calls"""
+    require_admin(request)
+    try:
+        kb = await rag_service.areload_knowledge_base()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving {rag_service.kb_version}: {e}")
+    return kb.info()
+
+
+@app.get("/metrics")
+async def prometheus_metrics(request: Request):
+    """Stage latency histograms, turns, active sessions and cache hit ratios (Prometheus text format)"""
+    require_admin(request)
+    return PlainTextResponse(metrics.render(rag_service.cache_stats()), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
@@ -526,109 +937,311 @@ async def favicon():
     return FileResponse("static/favicon.svg")
 
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket with conversation memory"""
-    await websocket.accept()
+async def send_streamed_response(websocket: WebSocket, query: str, context_chunks: List[Dict],
+                                 conversation_history: List[Dict], language: str, delivered: List[str],
+                                 protocol: int = PROTOCOL_JSON) -> Tuple[str, bytes]:
+    """
+    Send the answer as ordered per-sentence audio_chunk messages, then response_done.
+    Each sentence lands in `delivered` once sent; cancelling stops the LLM and TTS streams
+    """
+    tokens = rag_service.astream_response(query, context_chunks, conversation_history)
+
+    async def synthesize(sentence: str) -> bytes:
+        return await rag_service.text_to_speech(sentence, language=language)
+
+    audio_chunks = []
+    async with contextlib.aclosing(synthesize_in_order(
+        split_sentences(tokens, STREAM_MIN_SENTENCE_CHARS),
+        synthesize,
+        STREAM_TTS_CONCURRENCY
+    )) as audio_stream:
+        async for seq, sentence, audio_data in audio_stream:
+            await send_message(websocket, {
+                "type": "audio_chunk",
+                "seq": seq,
+                "text": sentence
+            }, audio_data, protocol)
+            delivered.append(sentence)
+            audio_chunks.append(audio_data)
+
+    response = " ".join(delivered)
+    await websocket.send_json({
+        "type": "response_done",
+        "text": response,
+        "chunks": len(delivered)
+    })
+    return response, b"".join(audio_chunks)
+
+
+async def send_cached_answer(websocket: WebSocket, answer: Dict, stream: bool,
+                             protocol: int = PROTOCOL_JSON) -> None:
+    """Replay a cached answer in the format the client asked for"""
+    if stream:
+        await send_message(websocket, {"type": "audio_chunk", "seq": 0, "text": answer["text"]},
+                           answer["audio"], protocol)
+        await websocket.send_json({"type": "response_done", "text": answer["text"], "chunks": 1})
+    else:
+        await send_message(websocket, {"type": "response", "text": answer["text"]}, answer["audio"], protocol)
+
+
+async def answer_turn(websocket: WebSocket, conversation_history: List[Dict], audio_bytes: bytes,
+                      mime_type: Optional[str], stream: bool, protocol: int = PROTOCOL_JSON,
+                      delivered: Optional[List[str]] = None) -> None:
+    """Transcribe one spoken question and answer it (text + voice), timing every stage"""
+    delivered = [] if delivered is None else delivered
+    with turn() as trace:
+        try:
+            outcome = await _answer_turn(websocket, conversation_history, audio_bytes, mime_type, stream,
+                                         protocol, delivered)
+        except asyncio.CancelledError:
+            metrics.count_turn("interrupted")
+            log.info(f"🛑 Turn interrupted after {len(delivered)} sentence(s): {trace.summary()}")
+            raise
+    metrics.count_turn(outcome)
+    log.info(f"⏱️  Turn ({outcome}): {trace.summary()} | total {(time.perf_counter() - trace.started) * 1000:.0f} ms")
+
+
+async def _answer_turn(websocket: WebSocket, conversation_history: List[Dict], audio_bytes: bytes,
+                       mime_type: Optional[str], stream: bool, protocol: int, delivered: List[str]) -> str:
+    """The turn itself; returns its outcome: "answered" | "answer_cache" | "no_speech" """
+    # Transcribe (async, in memory)
+    query = await rag_service.transcribe_audio(audio_bytes, mime_type)
+
+    if not query.strip():
+        await websocket.send_json({"type": "transcription", "text": query})
+        audio_data = await rag_service.prompt_audio.get(NO_SPEECH_MSG, 'pt')
+        await send_message(websocket, {
+            "type": "message",
+            "text": NO_SPEECH_MSG
+        }, audio_data, protocol)
+        return "no_speech"
 
-    conversation_history = []
+    # Speculative retrieval: embed + search while we report back and check the answer cache
+    search_task = asyncio.create_task(rag_service.asearch_knowledge_base(query))
 
+    # First question of the session has no history: its answer can be cached/reused
+    stateless = not conversation_history
     try:
-        # Send bilingual greeting
-        greeting = "Olá! Bem-vindo ao Suporte VoiceAI. Como posso ajudá-lo hoje? / Hello! Welcome to VoiceAI Support. How can I help you today?"
-        audio_data = await rag_service.text_to_speech(greeting, language='pt')
-
         await websocket.send_json({
-            "type": "message",
-            "text": greeting,
-            "audio": base64.b64encode(audio_data).decode()
+            "type": "transcription",
+            "text": query
         })
 
-        # Main conversation loop
-        while True:
-            data = await websocket.receive_json()
+        # Detect language for proper voice
+        detected_lang = rag_service.detect_language(query)
 
-            # Handle interrupt
-            if data["type"] == "interrupt":
-                interrupt_msg = "Entendo. Por favor, faça a sua pergunta novamente. / I understand. Please ask your question again."
-                audio_data = await rag_service.text_to_speech(interrupt_msg, language='pt')
-                await websocket.send_json({
-                    "type": "message",
-                    "text": interrupt_msg,
-                    "audio": base64.b64encode(audio_data).decode()
-                })
-                continue
+        cached_answer, query_embedding = (await rag_service.alookup_answer(query, detected_lang) if stateless
+                                          else (None, None))
+    except BaseException:
+        search_task.cancel()
+        raise
 
-            # Handle audio question
-            elif data["type"] == "audio":
-                audio_bytes = base64.b64decode(data["audio"])
+    # Add to history BEFORE generating response
+    conversation_history.append({"role": "user", "content": query})
 
-                # Transcribe (async now)
-                query = await rag_service.transcribe_audio(audio_bytes)
+    if cached_answer is not None:
+        search_task.cancel()
+        await send_cached_answer(websocket, cached_answer, stream, protocol)
+        delivered.append(cached_answer["text"])
+        conversation_history.append({"role": "assistant", "content": cached_answer["text"]})
+        return "answer_cache"
 
-                await websocket.send_json({
-                    "type": "transcription",
-                    "text": query
-                })
+    try:
+        # Search knowledge base (with caching) - usually already done by now
+        context_chunks = await search_task
 
-                if not query.strip():
-                    msg = "Não ouvi nada. Por favor repita a sua pergunta. / I didn't hear anything. Please repeat your question."
-                    audio_data = await rag_service.text_to_speech(msg, language='pt')
-                    await websocket.send_json({
-                        "type": "message",
-                        "text": msg,
-                        "audio": base64.b64encode(audio_data).decode()
-                    })
-                    continue
+        if stream:
+            # Streaming mode: per-sentence TTS while the LLM is still writing
+            response, audio_data = await send_streamed_response(
+                websocket, query, context_chunks, conversation_history, detected_lang, delivered, protocol
+            )
+        else:
+            # Generate response WITH conversation history
+            response = await rag_service.agenerate_response(
+                query,
+                context_chunks,
+                conversation_history
+            )
 
-                # Detect language for proper voice
-                detected_lang = rag_service.detect_language(query)
+            # Convert to speech with proper language voice (async + parallel)
+            audio_data = await rag_service.text_to_speech(response, language=detected_lang)
+
+            await send_message(websocket, {
+                "type": "response",
+                "text": response
+            }, audio_data, protocol)
+            delivered.append(response)
+    except asyncio.CancelledError:
+        # Barge-in: the history keeps only the part of the answer the caller got
+        if delivered:
+            conversation_history.append({"role": "assistant", "content": " ".join(delivered)})
+        raise
+
+    # Add response to history
+    conversation_history.append({"role": "assistant", "content": response})
+
+    if stateless:
+        await rag_service.store_answer(query, detected_lang, query_embedding, response, audio_data)
+    return "answered"
+
+
+def parse_heard(value) -> Optional[int]:
+    """Sentence count a client reports with an interrupt; anything but a non-negative int is ignored"""
+    return value if isinstance(value, int) and not isinstance(value, bool) and value >= 0 else None
+
+
+async def barge_in(turn_task: Optional[asyncio.Task], conversation_history: List[Dict],
+                   delivered: List[str], heard: Optional[int] = None) -> bool:
+    """
+    Cancel the turn in flight (LLM and TTS streams included) and wait until it's gone.
+    `heard`: sentences of the answer the caller actually heard; the history drops the rest,
+    also when the answer was fully sent but its playback got cut off.
+    Returns whether a turn was still running
+    """
+    if heard is not None and heard < len(delivered):
+        del delivered[heard:]
+        if turn_task is not None and turn_task.done() and conversation_history[-1]["role"] == "assistant":
+            if delivered:
+                conversation_history[-1] = {"role": "assistant", "content": " ".join(delivered)}
+            else:
+                conversation_history.pop()
+
+    if turn_task is None or turn_task.done():
+        return False
+    turn_task.cancel()
+    await asyncio.gather(turn_task, return_exceptions=True)
+    return True
 
-                # Add to history BEFORE generating response
-                conversation_history.append({"role": "user", "content": query})
 
-                # Search knowledge base (with caching)
-                context_chunks = rag_service.search_knowledge_base(query)
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """WebSocket with conversation memory; turns run as tasks so the caller can barge in"""
+    await websocket.accept()
+    protocol = negotiate_protocol(websocket)
+    metrics.active_sessions += 1
+
+    # /ws?session=<id> after a dropped connection picks the conversation up where it was
+    session_id, memory, resumed = sessions.open(
+        websocket.query_params.get("session"),
+        lambda: SessionMemory(HISTORY_MAX_TOKENS, rag_service.asummarize_history)
+    )
+    conversation_history = memory.messages
+    ended = False
+    utterance = None
+    stream_answer = False
+    turn_task: Optional[asyncio.Task] = None
+    delivered: List[str] = []  # sentences of the latest answer sent to the caller
+
+    async def run_turn(audio_bytes: bytes, mime_type: Optional[str], stream: bool, sent: List[str]) -> None:
+        try:
+            await answer_turn(websocket, conversation_history, audio_bytes, mime_type, stream, protocol, sent)
+            memory.compact_soon()  # the answer is out: summarize old turns off the critical path
+        except Exception as e:
+            log.error(f"WebSocket error: {e}")
+            with contextlib.suppress(Exception):
+                await websocket.close()
 
-                # Generate response WITH conversation history
-                response = rag_service.generate_response(
-                    query,
-                    context_chunks,
-                    conversation_history
-                )
+    def start_turn(audio_bytes: bytes, mime_type: Optional[str], stream: bool) -> asyncio.Task:
+        nonlocal delivered
+        delivered = []
+        return asyncio.create_task(run_turn(audio_bytes, mime_type, stream, delivered))
 
-                # Add response to history
-                conversation_history.append({"role": "assistant", "content": response})
+    try:
+        await websocket.send_json({"type": "session", "session": session_id, "resumed": resumed})
+        if resumed:
+            log.info(f"🔁 Session resumed ({len(conversation_history)} messages)")
+        else:
+            # Send bilingual greeting
+            audio_data = await rag_service.prompt_audio.get(GREETING_MSG, 'pt')
 
-                # Convert to speech with proper language voice (async + parallel)
-                audio_data = await rag_service.text_to_speech(response, language=detected_lang)
+            await send_message(websocket, {
+                "type": "message",
+                "text": GREETING_MSG
+            }, audio_data, protocol)
 
-                await websocket.send_json({
-                    "type": "response",
-                    "text": response,
-                    "audio": base64.b64encode(audio_data).decode()
-                })
+        # Main conversation loop - keeps reading while a turn is being answered
+        while True:
+            data = await receive_message(websocket)
+
+            # Handle interrupt: stop generating and synthesizing right away, no spoken apology
+            if data["type"] == "interrupt":
+                await barge_in(turn_task, conversation_history, delivered, parse_heard(data.get("heard")))
+                await websocket.send_json({"type": "interrupted", "heard": len(delivered)})
+                continue
+
+            # Handle audio question (whole recording in one message); a new question barges in
+            elif data["type"] == "audio":
+                await barge_in(turn_task, conversation_history, delivered, parse_heard(data.get("heard")))
+                turn_task = start_turn(data["audio_bytes"], data.get("mime"), bool(data.get("stream")))
+
+            # Streaming ingest: PCM frames while the caller speaks, endpointed here
+            elif data["type"] == "audio_stream_start":
+                await barge_in(turn_task, conversation_history, delivered, parse_heard(data.get("heard")))
+                utterance = None
+                try:
+                    sample_rate = parse_sample_rate(data.get("sample_rate", 16000))
+                except ValueError as e:
+                    # Frames of this stream are dropped; the connection stays usable
+                    await websocket.send_json({"type": "error", "text": str(e)})
+                    continue
+                utterance = StreamingUtterance(
+                    sample_rate=sample_rate,
+                    max_seconds=MAX_UTTERANCE_SECONDS,
+                    min_rms=VAD_MIN_RMS,
+                    end_silence_ms=VAD_END_SILENCE_MS
+                )
+                stream_answer = bool(data.get("stream"))
+
+            elif data["type"] in ("audio_frame", "audio_stream_end"):
+                if utterance is None:
+                    continue  # late frames of an utterance we already answered
+                if data["type"] == "audio_frame" and not utterance.feed(data["audio_bytes"]):
+                    continue
+
+                # End of speech: tell the client to stop sending and answer right away
+                await websocket.send_json({"type": "speech_end"})
+                finished, utterance = utterance, None
+                if finished.heard_speech:
+                    turn_task = start_turn(finished.wav_bytes(), "audio/wav", stream_answer)
+                else:
+                    audio_data = await rag_service.prompt_audio.get(NO_SPEECH_MSG, 'pt')
+                    await send_message(websocket, {
+                        "type": "message",
+                        "text": NO_SPEECH_MSG
+                    }, audio_data, protocol)
 
             # Handle end session
             elif data["type"] == "end":
-                goodbye_msg = "Obrigado por usar o Suporte VoiceAI. Tenha um bom dia! / Thank you for using VoiceAI Support. Have a great day!"
-                audio_data = await rag_service.text_to_speech(goodbye_msg, language='pt')
-                await websocket.send_json({
+                await barge_in(turn_task, conversation_history, delivered)
+                audio_data = await rag_service.prompt_audio.get(GOODBYE_MSG, 'pt')
+                await send_message(websocket, {
                     "type": "goodbye",
-                    "text": goodbye_msg,
-                    "audio": base64.b64encode(audio_data).decode()
-                })
+                    "text": GOODBYE_MSG
+                }, audio_data, protocol)
+                ended = True
                 break
 
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        log.error(f"WebSocket error: {e}")
         try:
             if websocket.client_state.name == "CONNECTED":
                 await websocket.close()
         except Exception:
             pass
+    finally:
+        # Caller hung up mid-answer: stop paying for tokens and audio nobody will hear
+        await barge_in(turn_task, conversation_history, delivered)
+        if not ended:
+            sessions.park(session_id, memory)
+        metrics.active_sessions -= 1
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if WORKERS > 1:
+        # Hand over to the uvicorn CLI so each worker imports app.py exactly once (workers spawned
+        # from here would re-run this script as well); the index is mmapped, caches go through CACHE_BACKEND
+        os.execvp(sys.executable, [sys.executable, "-m", "uvicorn", "app:app", "--host", "0.0.0.0",
+                                   "--port", "8000", "--workers", str(WORKERS)])
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
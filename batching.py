@@ -0,0 +1,79 @@
+"""
+Micro-batching of concurrent requests across voice sessions
+Under load many sessions embed and search at nearly the same moment, each paying a
+full API round-trip and a single-row FAISS search. MicroBatcher holds the first
+request for a few milliseconds (or until max_batch have arrived), runs the whole
+group in one call (one embeddings request, one batched index.search) and hands
+every waiting coroutine its own result.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    submit(item) -> result of run_batch([..., item, ...]) at the item's position.
+    A batch is sent `window` seconds after its first item, or as soon as it has
+    max_batch items (max_batch=1: no batching). run_batch must return one result
+    per item, in order; if it raises, every caller in the batch gets the error.
+    """
+
+    def __init__(self, run_batch: Callable[[List[T]], Awaitable[List[R]]], window: float, max_batch: int):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.items = 0
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up meanwhile (barge-in) don't need their item computed
+        batch = [(item, future) for item, future in self._pending if not future.done()]
+        self._pending = []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch of {len(batch)} requests returned {len(results)} results")
+        except asyncio.CancelledError:  # event loop shutting down
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch": self.items / self.batches if self.batches else 0.0}
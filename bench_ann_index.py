@@ -0,0 +1,93 @@
+"""
+Benchmark: recall@TOP_K vs latency vs memory for each FAISS index type
+Synthetic clustered unit vectors (like embeddings of related chunks); ground
+truth from exact search. Queries run one at a time, as the server does.
+
+    python bench_ann_index.py                          # 100k vectors
+    python bench_ann_index.py --sizes 100000,1000000 --kinds flat,ivf,ivfpq
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from vector_index import INDEX_TYPES, configure_search, create_index, train_and_add
+
+TOP_K = 5  # as in app.py
+SWEEPS = {
+    "flat": [None],
+    "ivf": [1, 4, 16, 64],
+    "ivfpq": [1, 4, 16, 64],
+    "hnsw": [16, 32, 64, 128],
+}
+
+
+def make_vectors(n: int, dimension: int, n_queries: int, seed: int = 0):
+    """n unit vectors around n/100 topics; queries are new vectors from the same topics"""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(1, n // 100), dimension)).astype(np.float32)
+
+    def sample(count: int) -> np.ndarray:
+        points = topics[rng.integers(len(topics), size=count)]
+        points += rng.normal(scale=1.0, size=points.shape).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    return sample(n), sample(n_queries)
+
+
+def ground_truth(vectors: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    return exact.search(queries, TOP_K)[1]
+
+
+def measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray):
+    """recall@TOP_K and p50/p99 single-query latency (ms)"""
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], TOP_K)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(found[0]) & set(expected))
+    return hits / truth.size, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100000", help="comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=256, help="vector dimension (1536 for text-embedding-3-small)")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--kinds", default=",".join(INDEX_TYPES))
+    args = parser.parse_args()
+
+    for n in map(int, args.sizes.split(",")):
+        print(f"\n{n:,} vectors x {args.dim} dims, {args.queries} queries, recall@{TOP_K}\n")
+        vectors, queries = make_vectors(n, args.dim, args.queries)
+        truth = ground_truth(vectors, queries)
+        print(f"  {'index':<8} {'build':>8} {'memory':>9}   {'setting':<12} {'recall':>6} {'p50':>8} {'p99':>8}")
+
+        for kind in args.kinds.split(","):
+            start = time.perf_counter()
+            index, built_as = create_index(kind, args.dim, n)
+            train_and_add(index, vectors, np.arange(n))
+            build = time.perf_counter() - start
+            memory = faiss.serialize_index(index).nbytes / 2**20
+
+            for setting in SWEEPS[built_as]:
+                if built_as == "hnsw":
+                    configure_search(index, ef_search=setting)
+                    label = f"efSearch={setting}"
+                elif setting is not None:
+                    configure_search(index, nprobe=setting)
+                    label = f"nprobe={setting}"
+                else:
+                    label = "exact"
+                recall, p50, p99 = measure(index, queries, truth)
+                print(f"  {built_as:<8} {build:7.1f}s {memory:7.0f}MB   {label:<12} "
+                      f"{recall:6.3f} {p50:6.2f}ms {p99:6.2f}ms")
+            del index
+
+
+if __name__ == "__main__":
+    main()
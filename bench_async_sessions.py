@@ -0,0 +1,60 @@
+"""
+Load benchmark: concurrent voice sessions, blocking vs async RAG path
+Runs against the local fake OpenAI API so no keys or credits are needed.
+
+    python bench_async_sessions.py
+"""
+import asyncio
+import os
+import time
+
+from fake_openai import start_fake_openai
+
+LATENCY = float(os.getenv("BENCH_LATENCY", "0.2"))
+CONCURRENCY_LEVELS = [1, 4, 16, 32]
+
+# Point every OpenAI client at the fake server before app.py builds them
+base_url = start_fake_openai(latency=LATENCY)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ["OPENAI_API_BASE"] = base_url
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-00000000")
+
+from app import rag_service  # noqa: E402
+
+
+async def blocking_session(query: str) -> str:
+    """What websocket_endpoint used to do: sync calls inside a coroutine"""
+    context = rag_service.search_knowledge_base(query)
+    return rag_service.generate_response(query, context, [])
+
+
+async def async_session(query: str) -> str:
+    """The async end-to-end path"""
+    context = await rag_service.asearch_knowledge_base(query)
+    return await rag_service.agenerate_response(query, context, [])
+
+
+async def run_level(session, concurrency: int, run_id: str) -> float:
+    """Run `concurrency` sessions at once with uncached queries; return wall time"""
+    queries = [f"What are the student plans? ({run_id} #{i})" for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(session(q) for q in queries))
+    return time.perf_counter() - start
+
+
+async def main():
+    print(f"\n⏱️  Fake OpenAI latency: {LATENCY * 1000:.0f} ms per request\n")
+    rows = []
+    for concurrency in CONCURRENCY_LEVELS:
+        blocking = await run_level(blocking_session, concurrency, f"blocking-{concurrency}")
+        concurrent = await run_level(async_session, concurrency, f"async-{concurrency}")
+        rows.append((concurrency, blocking, concurrent))
+
+    print(f"\n{'sessions':>8} | {'blocking (s)':>12} | {'async (s)':>9} | {'speedup':>7}")
+    print("-" * 46)
+    for concurrency, blocking, concurrent in rows:
+        print(f"{concurrency:>8} | {blocking:>12.2f} | {concurrent:>9.2f} | {blocking / concurrent:>6.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
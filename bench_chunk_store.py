@@ -0,0 +1,96 @@
+"""
+Benchmark: loading chunk metadata in a worker, metadata.pkl (old) vs mmap chunk store (new)
+Each variant runs in a fresh process, like a uvicorn worker starting up, then
+serves 1000 searches' worth of TOP_K lookups (cold pages: first touch faults them
+in). Private memory (RssAnon) is paid by every worker; mapped file pages (RssFile)
+are shared page cache.
+
+    python bench_chunk_store.py [chunks]
+"""
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from chunk_store import ChunkStore, write_chunk_store
+
+CHUNKS = 100_000
+TOP_K = 5
+SEARCHES = 1000
+WORDS = ("plano tarifa dados cobertura rede fatura suporte estudante internet chamadas "
+         "roaming saldo recarga loja aplicação mensal pacote velocidade router fibra").split()
+
+
+def memory_mb():
+    """(private, file-backed) resident memory of this process in MB"""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon", "RssFile")):
+                name, value, _ = line.split()
+                fields[name.rstrip(":")] = int(value) / 1024
+    return fields.get("RssAnon", 0), fields.get("RssFile", 0)
+
+
+def worker(kind: str, path: str, n: int) -> None:
+    """Child process: load, serve lookups, print timings and memory"""
+    private_before, shared_before = memory_mb()
+    start = time.perf_counter()
+    if kind == "pickle":
+        with open(path, "rb") as f:
+            metadata = pickle.load(f)
+    else:
+        metadata = ChunkStore(path)
+    load = time.perf_counter() - start
+
+    hits = np.random.default_rng(1).integers(n, size=(SEARCHES, TOP_K))
+    start = time.perf_counter()
+    for row in hits:
+        results = [metadata.get(int(vector_id))["text"] for vector_id in row]
+    lookup = (time.perf_counter() - start) / SEARCHES
+    assert len(results) == TOP_K
+
+    private, shared = memory_mb()
+    print(f"{load * 1000:.1f} {lookup * 1e6:.1f} {private - private_before:.1f} {shared - shared_before:.1f}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else CHUNKS
+    rng = np.random.default_rng(0)
+    metadata = {
+        vector_id: {"source": f"documento_{vector_id % 300}.pdf", "chunk_id": vector_id // 300,
+                    "text": " ".join(rng.choice(WORDS, 220))}  # ~400 tokens, like CHUNK_SIZE
+        for vector_id in range(n)
+    }
+
+    directory = tempfile.mkdtemp(prefix="chunk-store-")
+    pickle_path, store_path = os.path.join(directory, "metadata.pkl"), os.path.join(directory, "chunks.bin")
+    with open(pickle_path, "wb") as f:
+        pickle.dump(metadata, f)
+    write_chunk_store(store_path, metadata)
+    del metadata
+
+    print(f"\n{n:,} chunks: metadata.pkl {os.path.getsize(pickle_path) / 2**20:.0f} MB, "
+          f"chunks.bin {os.path.getsize(store_path) / 2**20:.0f} MB\n")
+    print(f"  {'':<16} {'startup':>10} {'lookup/search':>14} {'private RSS':>12} {'shared (mmap)':>14}")
+    for kind, path in (("pickle", pickle_path), ("chunk store", store_path)):
+        output = subprocess.run([sys.executable, __file__, "--worker", kind, path, str(n)],
+                                capture_output=True, text=True, check=True).stdout
+        load, lookup, private, shared = map(float, output.split())
+        shared_label = f"{shared:.0f} MB" if kind != "pickle" else "-"
+        print(f"  {kind:<16} {load:8.1f}ms {lookup:11.1f}µs {private:9.0f} MB {shared_label:>14}")
+
+    for path in (pickle_path, store_path):
+        os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        worker(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
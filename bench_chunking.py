@@ -0,0 +1,122 @@
+"""
+Benchmark: fixed-size token windows (the old ingest) vs the structure-aware chunker
+1. Retrieval: chunks both ways from pdfs/support_guide.txt, BM25-indexed, then the
+   questions in context_eval.jsonl retrieve their top-TOP_K chunks. Reports how
+   many tokens reach the prompt, whether the expected facts are in them, and the
+   chunks (and tokens) needed to reach every fact.
+2. Extraction: a generated PAGES-page PDF, old (whole-text concatenation, then
+   windows) vs streamed pages: time and peak Python memory.
+
+    python bench_chunking.py [pages]
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from chunker import chunk_document, count_tokens, encoder
+from lexical_index import LexicalIndex, fold, write_lexical_index
+
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 50
+TOP_K = 5
+PAGES = 500
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def fixed_chunks(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+    """The old chunk_text: windows of chunk_size tokens, cut anywhere"""
+    tokens = encoder.encode(text)
+    return [encoder.decode(tokens[start:start + chunk_size]) for start in range(0, len(tokens), chunk_size - overlap)]
+
+
+def fixed_pdf_chunks(path: str):
+    """The old extract_text_from_pdf + chunk_text"""
+    doc = fitz.open(path)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    doc.close()
+    return fixed_chunks(text)
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"[\W_]+", "", fold(text))
+
+
+def retrieval(label: str, texts, questions, directory: str) -> None:
+    path = os.path.join(directory, f"{label}.bin")
+    write_lexical_index(path, {i: {"text": text} for i, text in enumerate(texts)})
+    index = LexicalIndex(path)
+
+    prompt_tokens, found, expected, needed_chunks, needed_tokens = [], 0, 0, [], []
+    for question in questions:
+        hits, _ = index.search(question["question"], TOP_K)
+        chunks = [normalize(texts[vector_id]) for vector_id, _ in hits]
+        prompt_tokens.append(sum(count_tokens(texts[vector_id]) for vector_id, _ in hits))
+        facts = [normalize(fact) for fact in question["facts"]]
+        expected += len(facts)
+        found += sum(any(fact in chunk for chunk in chunks) for fact in facts)
+        # Fewest top-ranked chunks holding every fact
+        for rank in range(1, len(chunks) + 1):
+            if all(any(fact in chunk for chunk in chunks[:rank]) for fact in facts):
+                needed_chunks.append(rank)
+                needed_tokens.append(sum(count_tokens(texts[vector_id]) for vector_id, _ in hits[:rank]))
+                break
+
+    print(f"  {label:<10} {len(texts):>7} {np.mean([count_tokens(t) for t in texts]):>13.0f} "
+          f"{np.mean(prompt_tokens):>13.0f} {found / expected:>15.0%} "
+          f"{np.mean(needed_chunks):>15.1f} {np.mean(needed_tokens):>15.0f}")
+
+
+def generate_pdf(path: str, pages: int) -> None:
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        lines = [f"SECÇÃO {number} – PLANO {number}", ""]
+        lines += [f"O plano {number}.{i} custa {number * 10 + i} MZN e inclui {i} GB de dados." for i in range(40)]
+        page.insert_text((40, 40), "\n".join(lines), fontsize=8)
+    doc.save(path)
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else PAGES
+    guide = os.path.join(HERE, "pdfs", "support_guide.txt")
+    with open(os.path.join(HERE, "context_eval.jsonl")) as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+    directory = tempfile.mkdtemp(prefix="bench-chunking-")
+
+    with open(guide, encoding="utf-8") as f:
+        fixed = fixed_chunks(f.read())
+    structured = [chunk["text"] for chunk in chunk_document(guide, CHUNK_SIZE, CHUNK_OVERLAP)]
+    print(f"\n{len(questions)} questions over {os.path.basename(guide)}, {CHUNK_SIZE}/{CHUNK_OVERLAP}-token chunks, "
+          f"top-{TOP_K} BM25\n")
+    print(f"  {'chunker':<10} {'chunks':>7} {'tokens/chunk':>13} {'prompt tokens':>13} {'facts retrieved':>15} "
+          f"{'chunks to facts':>15} {'tokens to facts':>15}")
+    retrieval("fixed", fixed, questions, directory)
+    retrieval("structure", structured, questions, directory)
+
+    pdf = os.path.join(directory, "generated.pdf")
+    generate_pdf(pdf, pages)
+    print(f"\nExtraction + chunking of a {pages}-page PDF ({os.path.getsize(pdf) / 2**20:.1f} MB)\n")
+    for label, run in (("fixed", fixed_pdf_chunks),
+                       ("structure", lambda path: chunk_document(path, CHUNK_SIZE, CHUNK_OVERLAP))):
+        start = time.perf_counter()
+        chunks = run(pdf)
+        elapsed = time.perf_counter() - start
+        del chunks
+        tracemalloc.start()  # separate run: tracing slows allocation down
+        chunks = run(pdf)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label:<10} {len(chunks):>6} chunks in {elapsed:.2f}s, peak {peak / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: context packing vs LLM summarization before the answer
+Replays the questions in context_eval.jsonl against the knowledge base in data/.
+Each question retrieves its chunks with BM25 (deterministic, no embedding calls),
+then both strategies build the context and stream the answer:
+- summarize: the old path, an extra gpt-4o-mini call when over budget
+- pack: context_packer.pack_context, no extra call
+Reports time to first answer token, context size, and how many of the expected
+facts the retrieved chunks contained that survive into the context (and, with
+--live, into the answer).
+
+    python bench_context_packing.py           # fake API (LATENCY per request)
+    python bench_context_packing.py --live    # real OpenAI API (uses OPENAI_API_KEY, costs credits)
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from fake_openai import create_app, start_fake_openai
+from lexical_index import fold
+
+LIVE = "--live" in sys.argv
+LATENCY = 0.3
+TOKEN_DELAY = 0.02  # ~50 tokens/s, like gpt-4o-mini
+SUMMARY_TOKENS = 300
+TOP_K = 5
+
+if not LIVE:
+    fake = create_app(latency=LATENCY, token_delay=TOKEN_DELAY)
+    fake.state.completion_tokens = SUMMARY_TOKENS
+    base_url = start_fake_openai(fake=fake)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ["OPENAI_API_KEY"] = "sk-bench-00000000"
+os.environ["KB_WATCH_SECONDS"] = "0"
+
+import app  # noqa: E402
+from context_packer import count_tokens  # noqa: E402
+
+
+def normalize(text: str) -> str:
+    """Letters and digits only, so "1,500 MZN" matches "1500 MZN" and "1 500 MZN" """
+    return re.sub(r"[\W_]+", "", fold(text))
+
+
+def facts_found(facts, text: str):
+    return [fact for fact in facts if normalize(fact) in normalize(text)]
+
+
+async def run(strategy: str, questions):
+    app.CONTEXT_SUMMARIZER = strategy == "summarize"
+    service = app.rag_service
+    ttft, tokens, kept, available, answered = [], [], 0, 0, 0
+    # The fake API's summary is a canned text: its facts and size only mean something live
+    measured = LIVE or strategy == "pack"
+    for question in questions:
+        hits, _ = service.kb.lexical_search(question["question"], TOP_K)
+        chunks = service.kb.chunks([(vector_id, None) for vector_id, _ in hits])
+        retrieved = facts_found(question["facts"], " ".join(chunk["text"] for chunk in chunks))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            context = ""
+            if measured:
+                _, _, context, _ = await service._aprepare_generation(question["question"], chunks, [])
+            answer, first, start = "", None, time.perf_counter()
+            async for token in service.astream_response(question["question"], chunks, []):
+                first = first or time.perf_counter()
+                answer += token
+        ttft.append(first - start)
+        tokens.append(count_tokens(context))
+        available += len(retrieved)
+        kept += len(facts_found(retrieved, context))
+        answered += len(facts_found(retrieved, answer))
+
+    context_columns = (f"{np.mean(tokens):>14.0f} {kept / available:>16.0%}" if measured
+                       else f"{'-':>14} {'-':>16}")
+    answer_column = f"{answered / available:>10.0%}" if LIVE else f"{'-':>10}"
+    print(f"  {strategy:<10} {np.percentile(ttft, 50) * 1000:>9.0f}ms {np.percentile(ttft, 95) * 1000:>9.0f}ms "
+          f"{context_columns} {answer_column}")
+
+
+async def main():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "context_eval.jsonl")) as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    source = "OpenAI API" if LIVE else (f"fake API, {LATENCY * 1000:.0f} ms/request, "
+                                        f"{SUMMARY_TOKENS}-token summaries at {1 / TOKEN_DELAY:.0f} tokens/s")
+    print(f"\n{len(questions)} questions, top-{TOP_K} BM25 chunks, budget {app.CONTEXT_MAX_TOKENS} tokens ({source})\n")
+    print(f"  {'strategy':<10} {'TTFT p50':>11} {'p95':>11} {'context tokens':>14} {'facts in context':>16} "
+          f"{'in answer':>10}")
+    for strategy in ("summarize", "pack"):
+        await run(strategy, questions)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
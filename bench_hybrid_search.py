@@ -0,0 +1,111 @@
+"""
+Benchmark: vector-only vs hybrid (vector + BM25, RRF) retrieval
+Synthetic corpus: CHUNKS plan descriptions in TOPICS topics, each naming one plan
+code ("KB-01234"). Embeddings know a chunk's topic but blur plan codes together,
+like real embeddings do with short identifiers, so:
+- "exact" questions name a plan code; their embedding only points at the topic
+- "paraphrase" questions carry no code; their embedding is close to the chunk
+Reports recall@TOP_K, lexical search latency and how many questions the
+confident-lexical path answers without an embedding request.
+
+    python bench_hybrid_search.py [chunks]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from chunk_store import write_chunk_store
+from knowledge_base import KnowledgeBase
+from lexical_index import is_decisive, write_lexical_index
+from vector_index import create_index, train_and_add
+
+CHUNKS = 20_000
+TOPICS = 200
+DIMENSION = 256
+QUERIES = 500
+TOP_K = 5
+CANDIDATES = 20
+LEXICAL_CONFIDENCE = 0.8
+LEXICAL_MARGIN = 1.5
+TOPIC_WORDS = ("dados chamadas roaming fibra router recarga saldo fatura cobertura estudante "
+               "empresarial familia internacional noturno semanal mensal ilimitado sms").split()
+
+
+def build(directory: str, n: int, rng: np.random.Generator):
+    """Index, chunk store and BM25 index over n synthetic chunks; returns chunk vectors and topics"""
+    centroids = rng.normal(size=(TOPICS, DIMENSION)).astype(np.float32)
+    topics = rng.integers(TOPICS, size=n)
+    vectors = centroids[topics] + 0.6 * rng.normal(size=(n, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    metadata = {}
+    for i in range(n):
+        words = " ".join(rng.choice(TOPIC_WORDS, 30))
+        metadata[i] = {"source": f"planos_{topics[i]}.pdf", "chunk_id": i,
+                       "text": f"O plano {plan_code(i)} custa {100 + i % 900} MT e inclui {words}."}
+
+    index, _ = create_index("flat", DIMENSION, n)
+    train_and_add(index, vectors, np.arange(n))
+    paths = os.path.join(directory, "index.faiss"), os.path.join(directory, "chunks.bin")
+    faiss.write_index(index, paths[0])
+    write_chunk_store(paths[1], metadata)
+    start = time.perf_counter()
+    write_lexical_index(os.path.join(directory, "lexical.bin"), metadata)
+    print(f"  BM25 index built in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(os.path.join(directory, 'lexical.bin')) / 2**20:.1f} MB)")
+    return paths, vectors, centroids, topics
+
+
+def plan_code(i: int) -> str:
+    return f"{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}-{i:05d}"
+
+
+def evaluate(kb: KnowledgeBase, questions, label: str) -> None:
+    vector_hits = hybrid_hits = decisive = 0
+    lexical_times = []
+    for target, text, embedding in questions:
+        start = time.perf_counter()
+        lexical, coverage = kb.lexical_search(text, CANDIDATES)
+        lexical_times.append(time.perf_counter() - start)
+
+        vector_hits += target in [r["chunk_id"] for r in kb.search(embedding, TOP_K)]
+        if is_decisive(lexical, coverage, LEXICAL_CONFIDENCE, LEXICAL_MARGIN):
+            decisive += 1
+            results = kb.chunks([(vector_id, None) for vector_id, _ in lexical[:TOP_K]])
+        else:
+            results = kb.hybrid_search(embedding, TOP_K, lexical, CANDIDATES)
+        hybrid_hits += target in [r["chunk_id"] for r in results]
+
+    n = len(questions)
+    print(f"  {label:<11} {vector_hits / n:>13.2f} {hybrid_hits / n:>13.2f} "
+          f"{np.percentile(lexical_times, 50) * 1000:>10.2f}ms {decisive / n:>17.0%}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else CHUNKS
+    rng = np.random.default_rng(0)
+    directory = tempfile.mkdtemp(prefix="bench-hybrid-")
+    print(f"\n{n:,} chunks x {DIMENSION} dims in {TOPICS} topics, {QUERIES} questions per set")
+    paths, vectors, centroids, topics = build(directory, n, rng)
+    kb = KnowledgeBase.load(*paths)
+
+    targets = rng.choice(n, QUERIES, replace=False)
+    exact, paraphrase = [], []
+    for target in targets:
+        topic_only = centroids[topics[target]] + 0.6 * rng.normal(size=DIMENSION)
+        exact.append((int(target), f"Quanto custa o plano {plan_code(target)}?", topic_only.tolist()))
+        near = vectors[target] + 0.02 * rng.normal(size=DIMENSION)
+        paraphrase.append((int(target), "Que plano tem mais dados para estudantes?", near.tolist()))
+
+    print(f"\n  {'questions':<11} {'vector R@' + str(TOP_K):>13} {'hybrid R@' + str(TOP_K):>13} "
+          f"{'BM25 p50':>12} {'embedding skipped':>17}")
+    evaluate(kb, exact, "exact")
+    evaluate(kb, paraphrase, "paraphrase")
+
+
+if __name__ == "__main__":
+    main()
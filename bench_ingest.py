@@ -0,0 +1,100 @@
+"""
+Benchmark: embedding a 10k-chunk corpus, one request (old) vs batched/parallel/resumable (new)
+Runs against the local fake OpenAI API. Each embeddings call costs
+REQUEST_LATENCY + INPUT_LATENCY per chunk, roughly like the real endpoint.
+
+    python bench_ingest.py
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from fake_openai import create_app, start_fake_openai
+
+CHUNKS = 10_000
+REQUEST_LATENCY = 0.2
+INPUT_LATENCY = 0.002    # s per chunk (~200k tokens/s per request)
+API_MAX_INPUTS = 2048    # the real API rejects bigger requests
+
+fake = create_app(latency=REQUEST_LATENCY, input_latency=INPUT_LATENCY, dimension=256)
+base_url = start_fake_openai(fake=fake)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-00000000")
+os.environ["EMBED_BACKOFF_SECONDS"] = "0.05"
+
+import ingest_pdfs  # noqa: E402
+from openai import BadRequestError, OpenAI  # noqa: E402
+
+WORDS = ("plano tarifa dados cobertura rede fatura suporte estudante internet chamadas "
+         "roaming saldo recarga loja aplicação mensal pacote velocidade router fibra").split()
+
+
+def make_corpus(n: int):
+    rng = np.random.default_rng(0)
+    return [f"Documento {i}: " + " ".join(rng.choice(WORDS, 250)) for i in range(n)]
+
+
+def old_get_embeddings(texts):
+    """The previous implementation: every chunk in a single request"""
+    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"], max_retries=0)
+    response = client.embeddings.create(model=ingest_pdfs.EMBEDDING_MODEL, input=texts)
+    return [item.embedding for item in response.data]
+
+
+def timed(label, fn, *args):
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+        print(f"  {label:<48} {time.perf_counter() - start:6.2f} s")
+        return result
+    except Exception as e:
+        print(f"  {label:<48} FAILED after {time.perf_counter() - start:.2f} s ({type(e).__name__})")
+        return None
+
+
+def main():
+    corpus = make_corpus(CHUNKS)
+    checkpoint = tempfile.mkdtemp(prefix="embed-checkpoint-")
+    print(f"\n{CHUNKS} chunks, {REQUEST_LATENCY * 1000:.0f} ms + {INPUT_LATENCY * 1000:.1f} ms/chunk per request\n")
+
+    # 1. Old code against the real API limit
+    fake.state.max_inputs = API_MAX_INPUTS
+    try:
+        old_get_embeddings(corpus)
+    except BadRequestError as e:
+        print(f"  old, API input limit ({API_MAX_INPUTS})                   rejected: {e.status_code}")
+
+    # 2. Old code with the limit lifted vs new batched stage
+    fake.state.max_inputs = 0
+    old = timed("old, one request (limit lifted)", old_get_embeddings, corpus)
+    fake.state.max_inputs = API_MAX_INPUTS
+    shutil.rmtree(checkpoint)
+    new = timed(f"new, {ingest_pdfs.EMBED_BATCH_TOKENS // 1000}k-token batches, {ingest_pdfs.EMBED_CONCURRENCY} in parallel",
+                ingest_pdfs.get_embeddings, corpus, checkpoint)
+    assert np.allclose(np.array(old, dtype=np.float32), new)
+
+    # 3. Rate limiting: every 3rd call gets a 429 with Retry-After
+    shutil.rmtree(checkpoint)
+    fake.state.rate_limit_every = 3
+    timed("new, every 3rd request rate limited (429)", ingest_pdfs.get_embeddings, corpus, checkpoint)
+    fake.state.rate_limit_every = 0
+
+    # 4. Crash part-way, then resume from the checkpoint
+    shutil.rmtree(checkpoint)
+    fake.state.embedding_calls = 0
+    fake.state.fail_after = 14
+    ingest_pdfs.EMBED_MAX_RETRIES = 1
+    timed("new, API down after 14 batches", ingest_pdfs.get_embeddings, corpus, checkpoint)
+    fake.state.fail_after = 0
+    saved = len([f for f in os.listdir(checkpoint) if f.endswith(".npy")])
+    resumed = timed(f"new, rerun resuming {saved} checkpointed batches", ingest_pdfs.get_embeddings,
+                    corpus, checkpoint)
+    assert np.allclose(resumed, new)
+    shutil.rmtree(checkpoint)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: serial ingest (old) vs the extraction pool + embedding pipeline
+Synthetic corpus: DOCUMENTS generated PDFs of PAGES pages each. Runs against the
+local fake OpenAI API, each embeddings call costing REQUEST_LATENCY +
+INPUT_LATENCY per chunk like in bench_ingest.py.
+- serial: every document extracted and chunked in this process, then embedded
+- pipeline: build_index with INGEST_WORKERS processes; batches are embedded
+  while later documents are still being chunked
+
+    python bench_parallel_ingest.py [documents]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from fake_openai import create_app, start_fake_openai
+
+DOCUMENTS = 60
+PAGES = 30
+REQUEST_LATENCY = 0.2
+INPUT_LATENCY = 0.002
+WORKERS = (1, 2, 4)
+
+fake = create_app(latency=REQUEST_LATENCY, input_latency=INPUT_LATENCY, dimension=256)
+base_url = start_fake_openai(fake=fake)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-00000000")
+
+import fitz  # noqa: E402  PyMuPDF
+
+import ingest_pdfs  # noqa: E402
+from chunker import chunk_document  # noqa: E402
+
+
+def generate_corpus(directory: str, documents: int) -> None:
+    for number in range(documents):
+        doc = fitz.open()
+        for page_number in range(1, PAGES + 1):
+            lines = [f"PRODUTO {number} – SECÇÃO {page_number}", ""]
+            lines += [f"O equipamento {number}.{page_number}.{i} suporta {i} GB, custa {100 + i} MZN e tem "
+                      f"garantia de {1 + i % 3} anos." for i in range(45)]
+            doc.new_page().insert_text((30, 30), "\n".join(lines), fontsize=7)
+        doc.save(os.path.join(directory, f"produto_{number:03d}.pdf"))
+        doc.close()
+
+
+def serial(directory: str) -> int:
+    """The old build_index: extract and chunk every file, then embed everything"""
+    texts = []
+    for filename in sorted(os.listdir(directory)):
+        texts.extend(chunk["text"] for chunk in chunk_document(os.path.join(directory, filename),
+                                                               ingest_pdfs.CHUNK_SIZE, ingest_pdfs.CHUNK_OVERLAP))
+    with contextlib.redirect_stdout(io.StringIO()):
+        ingest_pdfs.get_embeddings(texts, None)
+    return len(texts)
+
+
+def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else DOCUMENTS
+    corpus = tempfile.mkdtemp(prefix="bench-parallel-ingest-")
+    generate_corpus(corpus, documents)
+    size = sum(os.path.getsize(os.path.join(corpus, f)) for f in os.listdir(corpus))
+    print(f"\n{documents} PDFs x {PAGES} pages ({size / 2**20:.1f} MB), {os.cpu_count()} CPUs, "
+          f"{REQUEST_LATENCY * 1000:.0f} ms + {INPUT_LATENCY * 1000:.1f} ms/chunk per embeddings request\n")
+
+    results = []
+    start = time.perf_counter()
+    extraction = sum(len(chunk_document(os.path.join(corpus, f), ingest_pdfs.CHUNK_SIZE, ingest_pdfs.CHUNK_OVERLAP))
+                     for f in sorted(os.listdir(corpus)))
+    results.append(("extraction only (1 process)", time.perf_counter() - start, extraction))
+    start = time.perf_counter()
+    chunks = serial(corpus)
+    results.append(("serial: extract all, then embed", time.perf_counter() - start, chunks))
+
+    for workers in WORKERS:
+        ingest_pdfs.INGEST_WORKERS = workers
+        output = tempfile.mkdtemp(prefix="bench-parallel-ingest-data-")
+        ingest_pdfs.EMBED_CHECKPOINT_DIR = os.path.join(output, "checkpoint")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest_pdfs.build_index(corpus, output, full=True)
+        results.append((f"pipeline, {workers} worker process{'es' if workers > 1 else ''}",
+                         time.perf_counter() - start, chunks))
+        shutil.rmtree(output)
+    shutil.rmtree(corpus)
+
+    print(f"  {'ingest':<34} {'time':>8} {'docs/s':>8} {'chunks/s':>9}")
+    for label, elapsed, n in results:
+        print(f"  {label:<34} {elapsed:>7.2f}s {documents / elapsed:>8.1f} {n / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: prompt layout vs the provider's prompt cache
+Replays SESSIONS conversations of TURNS questions from context_eval.jsonl (BM25
+chunks, no embedding calls) against the fake OpenAI API, which serves repeated
+prompt prefixes from a simulated cache (OpenAI's rules: prefixes of >= 1024
+tokens, in 128-token steps) and charges PREFILL_LATENCY per uncached prompt token.
+- legacy: the old layout, context in the middle of the system prompt and the
+  empathy hint after it; prompt template rebuilt every turn
+- stable: prompts.py, static instructions -> history -> context -> question;
+  templates precompiled at startup
+Reports cached prompt tokens, time to first token, and template build time per turn.
+
+    python bench_prompt_cache.py [sessions]
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from fake_openai import create_app, start_fake_openai
+
+SESSIONS = 4
+TURNS = 20
+LATENCY = 0.3
+PREFILL_LATENCY = 0.0002  # s per uncached prompt token (~5k tokens/s)
+TOKEN_DELAY = 0.02
+TOP_K = 5
+
+fake = create_app(latency=LATENCY, token_delay=TOKEN_DELAY, prefill_latency=PREFILL_LATENCY)
+base_url = start_fake_openai(fake=fake)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ["OPENAI_API_BASE"] = base_url
+os.environ["OPENAI_API_KEY"] = "sk-bench-00000000"
+os.environ["KB_WATCH_SECONDS"] = "0"
+os.environ["LOG_LEVEL"] = "warning"
+
+import app  # noqa: E402
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder  # noqa: E402
+from observability import turn  # noqa: E402
+from prompts import CONTEXT_HEADER, EMPATHY, PERSONA, RULES  # noqa: E402
+from session_memory import SessionMemory  # noqa: E402
+
+
+def legacy_prompt(language: str, sentiment: str) -> ChatPromptTemplate:
+    """The layout before prompts.py: one system message with the context inside"""
+    system = f"{PERSONA[language]}\n{CONTEXT_HEADER[language]}\n{{context}}\n\n{RULES[language]}"
+    if sentiment == "negative":
+        system += f"\n\n{EMPATHY[language]}"
+    return ChatPromptTemplate.from_messages([
+        ("system", system),
+        MessagesPlaceholder(variable_name="history"),
+        ("human", "{question}")
+    ])
+
+
+class LegacyChains(dict):
+    """Builds the chain on every lookup, like the old create_chain_with_memory"""
+
+    def __getitem__(self, variant):
+        return legacy_prompt(*variant) | app.rag_service.llm
+
+
+async def run(layout: str, questions, sessions: int):
+    service = app.rag_service
+    stable_chains = service.chains
+    if layout == "legacy":
+        service.chains = LegacyChains()
+    fake.state.prompts = []  # cold provider cache
+
+    ttft, prompt_tokens, cached_tokens, build = [], [], [], []
+    late_cached = late_prompt = 0
+    for session in range(sessions):
+        memory = SessionMemory(app.HISTORY_MAX_TOKENS, service.asummarize_history)
+        for number in range(TURNS):
+            question = questions[(session * 3 + number) % len(questions)]["question"]
+            hits, _ = service.kb.lexical_search(question, TOP_K)
+            chunks = service.kb.chunks([(vector_id, None) for vector_id, _ in hits])
+            memory.messages.append({"role": "user", "content": question})
+
+            start = time.perf_counter()
+            service.answer_chain(service.detect_language(question), service.detect_sentiment(question))
+            build.append(time.perf_counter() - start)
+
+            with contextlib.redirect_stdout(io.StringIO()), turn() as trace:
+                answer, first, start = "", None, time.perf_counter()
+                async for token in service.astream_response(question, chunks, memory.messages):
+                    first = first or time.perf_counter()
+                    answer += token
+            ttft.append(first - start)
+            prompt_tokens.append(trace.prompt_tokens)
+            cached_tokens.append(trace.cached_tokens)
+            if number >= TURNS // 2:
+                late_prompt += trace.prompt_tokens
+                late_cached += trace.cached_tokens
+
+            memory.messages.append({"role": "assistant", "content": answer})
+            memory.compact_soon()
+            if memory._compaction is not None:
+                await memory._compaction  # the caller is listening to the answer meanwhile
+    service.chains = stable_chains
+
+    print(f"  {layout:<8} {np.mean(prompt_tokens):>14.0f} {sum(cached_tokens) / sum(prompt_tokens):>8.0%} "
+          f"{late_cached / late_prompt:>15.0%} {np.percentile(ttft, 50) * 1000:>9.0f}ms "
+          f"{np.percentile(ttft, 95) * 1000:>7.0f}ms {np.mean(build) * 1e6:>11.0f}µs")
+
+
+async def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else SESSIONS
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "context_eval.jsonl")) as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    print(f"\n{sessions} sessions x {TURNS} turns, top-{TOP_K} BM25 chunks, history {app.HISTORY_MAX_TOKENS} tokens, "
+          f"fake API {LATENCY * 1000:.0f} ms + {PREFILL_LATENCY * 1e6:.0f} µs/uncached prompt token\n")
+    print(f"  {'layout':<8} {'prompt tokens':>14} {'cached':>8} {'cached (2nd half)':>15} {'TTFT p50':>11} "
+          f"{'p95':>9} {'template':>13}")
+    for layout in ("legacy", "stable"):
+        await run(layout, questions, sessions)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark: cross-session micro-batching of query embeddings and FAISS searches
+SESSIONS concurrent sessions each ask ROUNDS uncached questions back to back
+through asearch_knowledge_base (embedding + vector search, no BM25 shortcut) over a
+synthetic flat index of CHUNKS vectors, against the fake OpenAI API.
+- off: SEARCH_BATCH_MAX=1, one embeddings request and one single-row search per query
+- 2 ms / 10 ms: SEARCH_BATCH_WINDOW_MS, up to SEARCH_BATCH_MAX queries per batch
+Reports throughput, latency percentiles, embeddings requests and mean batch size.
+
+    python bench_search_batching.py [chunks]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+from fake_openai import create_app, start_fake_openai
+
+CHUNKS = 20_000
+DIMENSION = 1536
+ROUNDS = 8
+LATENCY = 0.15  # s per embeddings request
+INPUT_LATENCY = 0.0005  # s per embedded input
+CONCURRENCY_LEVELS = [1, 8, 32, 64]
+MODES = [("off", 0.0, 1), ("2 ms", 0.002, 32), ("10 ms", 0.010, 64)]
+
+fake = create_app(latency=LATENCY, input_latency=INPUT_LATENCY, dimension=DIMENSION)
+base_url = start_fake_openai(fake=fake)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ["OPENAI_API_BASE"] = base_url
+os.environ["OPENAI_API_KEY"] = "sk-bench-00000000"
+os.environ["KB_WATCH_SECONDS"] = "0"
+os.environ["LOG_LEVEL"] = "warning"
+
+import app  # noqa: E402
+from knowledge_base import KnowledgeBase  # noqa: E402
+from vector_index import create_index, train_and_add  # noqa: E402
+
+
+def synthetic_kb(n: int) -> KnowledgeBase:
+    vectors = np.random.default_rng(0).standard_normal((n, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index, _ = create_index("flat", DIMENSION, n)
+    train_and_add(index, vectors, np.arange(n))
+    metadata = {i: {"source": f"doc{i % 50}.pdf", "chunk_id": i, "text": f"Chunk {i}"} for i in range(n)}
+    return KnowledgeBase(index, metadata, "bench")
+
+
+async def run(service, sessions: int, mode: str, window: float, max_batch: int):
+    for batcher in (service.embed_batcher, service.search_batcher):
+        batcher.window, batcher.max_batch, batcher.batches, batcher.items = window, max_batch, 0, 0
+    service.invalidate_caches()
+    requests = fake.state.embedding_calls
+    latencies = []
+
+    async def session(number: int):
+        for question in range(ROUNDS):
+            start = time.perf_counter()
+            await service.asearch_knowledge_base(f"Plano {mode} {sessions}/{number}/{question}?")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(number) for number in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(f"  {sessions:>8} {mode:>6} {len(latencies) / elapsed:>8.1f} {p50:>8.0f}ms {p95:>6.0f}ms {p99:>6.0f}ms "
+          f"{fake.state.embedding_calls - requests:>9} {service.embed_batcher.stats()['mean_batch']:>7.1f} "
+          f"{service.search_batcher.stats()['mean_batch']:>11.1f}")
+
+
+async def main():
+    chunks = int(sys.argv[1]) if len(sys.argv) > 1 else CHUNKS
+    service = app.rag_service
+    service.swap_knowledge_base(synthetic_kb(chunks))
+    print(f"\nflat index, {chunks} x {DIMENSION} vectors; fake embeddings API {LATENCY * 1000:.0f} ms "
+          f"+ {INPUT_LATENCY * 1000:.1f} ms/input; {ROUNDS} uncached questions per session\n")
+    print(f"  {'sessions':>8} {'batch':>6} {'q/s':>8} {'p50':>10} {'p95':>8} {'p99':>8} "
+          f"{'API reqs':>9} {'emb/req':>7} {'rows/search':>11}")
+    for sessions in CONCURRENCY_LEVELS:
+        for mode, window, max_batch in MODES:
+            await run(service, sessions, mode, window, max_batch)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Microbenchmark: semantic cache lookup cost (per-entry loop vs one matrix product)
+
+    python bench_semantic_cache.py
+"""
+import time
+
+import numpy as np
+
+from caches import SemanticCache
+
+DIMENSION = 1536  # text-embedding-3-small
+SIZES = [200, 2_000, 20_000]
+THRESHOLD = 0.85
+
+try:
+    from sklearn.metrics.pairwise import cosine_similarity
+except ImportError:  # sklearn is not a dependency any more - emulate the old per-entry call
+    def cosine_similarity(a, b):
+        a, b = np.asarray(a), np.asarray(b)
+        return (a @ b.T) / (np.linalg.norm(a, axis=1)[:, None] * np.linalg.norm(b, axis=1)[None, :])
+
+
+def old_lookup(entries, query):
+    """The previous implementation: one cosine_similarity call per cached query"""
+    for _, (cached_emb, cached_results) in entries.items():
+        if cosine_similarity([query], [cached_emb])[0][0] > THRESHOLD:
+            return cached_results
+    return None
+
+
+def time_per_call(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'entries':>8} | {'loop (ms)':>10} | {'matrix (ms)':>11} | {'speedup':>8}")
+    print("-" * 48)
+
+    for size in SIZES:
+        vectors = rng.standard_normal((size, DIMENSION)).astype(np.float32)
+        # A miss is the expensive case: every entry has to be compared
+        query = rng.standard_normal(DIMENSION).astype(np.float32)
+
+        entries = {f"q{i}": (vectors[i], []) for i in range(size)}
+        cache = SemanticCache(size, THRESHOLD)
+        for i in range(size):
+            cache.add(f"q{i}", vectors[i], [])
+
+        loop_repeats = max(1, 2_000 // size)
+        loop = time_per_call(lambda: old_lookup(entries, query), loop_repeats)
+        matrix = time_per_call(lambda: cache.lookup(query), 50)
+
+        print(f"{size:>8} | {loop * 1000:>10.2f} | {matrix * 1000:>11.3f} | {loop / matrix:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
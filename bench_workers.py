@@ -0,0 +1,170 @@
+"""
+Benchmark: voice-turn throughput with 1, 2, 4 and 8 uvicorn workers
+Each run starts `uvicorn app:app --workers N` against the local fake OpenAI API
+(STT, embeddings, chat and TTS) and a synthetic 50k-chunk knowledge base, then
+keeps CLIENTS websocket sessions asking questions from a pool of QUESTIONS for
+DURATION seconds. Compares per-process caches (memory) with the shared SQLite
+backend, and reports the workers' private memory (the mmapped index is shared;
+a last run loads it into every worker instead). Scaling needs as many cores as
+workers.
+
+    python bench_workers.py [workers...]
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import faiss
+import httpx
+import numpy as np
+import websockets
+
+from chunk_store import write_chunk_store
+from fake_openai import create_app, start_fake_openai
+from stt import pcm_to_wav
+from vector_index import create_index, train_and_add
+
+WORKER_COUNTS = [1, 2, 4, 8]
+CHUNKS = 50_000
+DIMENSION = 1536
+CLIENTS = 32
+QUESTIONS = 100
+TURNS_PER_SESSION = 4
+DURATION = 20.0
+LATENCY = 0.05
+
+
+def build_knowledge_base(directory: str):
+    """Flat index over random unit vectors (the fake API's query embeddings are random too)"""
+    vectors = np.random.default_rng(0).normal(size=(CHUNKS, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index, _ = create_index("flat", DIMENSION, CHUNKS)
+    train_and_add(index, vectors, np.arange(CHUNKS))
+    index_path, store_path = os.path.join(directory, "index.faiss"), os.path.join(directory, "chunks.bin")
+    faiss.write_index(index, index_path)
+    write_chunk_store(store_path, {i: {"source": f"doc_{i % 50}.pdf", "chunk_id": i, "text": f"Plano {i}: " + "dados " * 60}
+                                   for i in range(CHUNKS)})
+    return index_path, store_path
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def private_memory_mb(server: int) -> float:
+    """Sum of RssAnon over the uvicorn workers (the server process itself when there is one worker)"""
+    def parent_of(pid: str) -> int:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return int(f.read().rsplit(")", 1)[1].split()[1])
+        except FileNotFoundError:
+            return 0
+
+    def rss_anon(pid) -> int:
+        with open(f"/proc/{pid}/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("RssAnon"))
+
+    workers = [pid for pid in os.listdir("/proc") if pid.isdigit() and parent_of(pid) == server]
+    return sum(rss_anon(pid) for pid in workers or [server]) / 1024
+
+
+async def receive_reply(ws):
+    """Next JSON message; its audio (if any) follows as a binary frame"""
+    message = json.loads(await ws.recv())
+    if "audio_bytes" in message:
+        await ws.recv()
+    return message
+
+
+async def client(port: int, deadline: float, latencies: list, rng: random.Random):
+    while time.perf_counter() < deadline:
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws?protocol=2", max_size=None) as ws:
+            while (await receive_reply(ws))["type"] != "message":
+                pass  # session id, then the greeting
+            for _ in range(TURNS_PER_SESSION):
+                if time.perf_counter() >= deadline:
+                    break
+                question = f"Quanto custa o plano numero {rng.randrange(QUESTIONS)}?".encode()
+                audio = pcm_to_wav(question + b"\0" * (len(question) % 2), 16000)
+                start = time.perf_counter()
+                await ws.send(json.dumps({"type": "audio", "mime": "audio/wav", "audio_bytes": len(audio)}))
+                await ws.send(audio)
+                while (await receive_reply(ws))["type"] != "response":
+                    pass
+                latencies.append(time.perf_counter() - start)
+
+
+async def run_load(port: int):
+    latencies = []
+    deadline = time.perf_counter() + DURATION
+    await asyncio.gather(*(client(port, deadline, latencies, random.Random(i)) for i in range(CLIENTS)))
+    return latencies
+
+
+def wait_until_up(port: int, workers: int, process: subprocess.Popen) -> None:
+    """Wait for the first worker to answer, then give the others time to load"""
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/admin/kb", timeout=1).status_code == 200:
+                break
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    time.sleep(2.0 * workers)  # let the remaining workers finish importing
+
+
+def main():
+    worker_counts = [int(arg) for arg in sys.argv[1:]] or WORKER_COUNTS
+    directory = tempfile.mkdtemp(prefix="bench-workers-")
+    index_path, store_path = build_knowledge_base(directory)
+
+    fake = create_app(latency=LATENCY, token_delay=0.002, dimension=DIMENSION)
+    fake.state.echo_transcripts = True
+    base_url = start_fake_openai(fake=fake)
+
+    print(f"\n{os.cpu_count()} CPU(s), {CHUNKS // 1000}k chunks x {DIMENSION} dims (flat), {CLIENTS} sessions, "
+          f"{QUESTIONS} distinct questions, {LATENCY * 1000:.0f} ms API latency, {DURATION:.0f} s per run\n")
+    print(f"  {'cache':<7} {'workers':>7} {'turns/s':>8} {'p50':>8} {'p95':>8} {'embed calls':>12} {'private RSS':>12}")
+
+    runs = [(backend, workers, True) for backend in ("memory", "sqlite") for workers in worker_counts]
+    runs.append(("sqlite", max(worker_counts), False))
+    for backend, workers, mmap in runs:
+        port = free_port()
+        cache_path = os.path.join(directory, f"cache-{backend}-{workers}-{mmap}.sqlite3")
+        env = {**os.environ, "OPENAI_BASE_URL": base_url, "OPENAI_API_BASE": base_url,
+               "OPENAI_API_KEY": "sk-bench-00000000", "ELEVEN_API_KEY": "", "STT_BACKEND": "whisper",
+               "INDEX_PATH": index_path, "METADATA_PATH": store_path, "INDEX_MMAP": str(mmap).lower(),
+               "CACHE_BACKEND": backend, "CACHE_PATH": cache_path, "KB_WATCH_SECONDS": "0",
+               "PROMPT_AUDIO_DIR": os.path.join(directory, "prompt_audio"), "WORKERS": str(workers)}
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--workers", str(workers),
+             "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_up(port, workers, process)
+            fake.state.embedding_calls = 0
+            latencies = asyncio.run(run_load(port))
+            memory = private_memory_mb(process.pid)
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(f"  {backend:<7} {workers:>7} {len(latencies) / DURATION:>8.1f} {p50:>6.0f}ms {p95:>6.0f}ms "
+              f"{fake.state.embedding_calls:>12} {memory:>9.0f} MB" + ("" if mmap else "  (INDEX_MMAP=false)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: /ws payload size and server CPU per turn, protocol v1 (base64 JSON) vs v2 (binary frames)
+Uses the real ws_protocol helpers against an in-memory socket.
+
+    python bench_ws_protocol.py
+"""
+import asyncio
+import base64
+import json
+import os
+import time
+
+from ws_protocol import PROTOCOL_BINARY, PROTOCOL_JSON, receive_message, send_message
+
+TURNS = 200
+QUESTION_BYTES = 5 * 4_000        # ~5 s of webm/opus at 32 kbps
+SENTENCE_AUDIO_BYTES = 48_000     # ~3 s of MP3 at 128 kbps per streamed sentence
+SENTENCES_PER_ANSWER = 3
+
+
+class MemorySocket:
+    """Minimal WebSocket stand-in that records what goes over the wire"""
+
+    def __init__(self, incoming):
+        self.incoming = list(incoming)
+        self.bytes_out = 0
+
+    async def send_json(self, message):
+        # Starlette serializes exactly like this
+        self.bytes_out += len(json.dumps(message, separators=(",", ":")).encode())
+
+    async def send_bytes(self, data):
+        self.bytes_out += len(data)
+
+    async def receive(self):
+        return self.incoming.pop(0)
+
+
+def client_frames(protocol: int, audio: bytes):
+    """What the browser sends for one question"""
+    if protocol == PROTOCOL_BINARY:
+        header = json.dumps({"type": "audio", "stream": True, "audio_bytes": len(audio)})
+        return [{"type": "websocket.receive", "text": header},
+                {"type": "websocket.receive", "bytes": audio}]
+    payload = json.dumps({"type": "audio", "stream": True, "audio": base64.b64encode(audio).decode()})
+    return [{"type": "websocket.receive", "text": payload}]
+
+
+def frame_size(frame) -> int:
+    return len(frame["text"].encode()) if "text" in frame else len(frame["bytes"])
+
+
+async def run_turns(protocol: int):
+    question = os.urandom(QUESTION_BYTES)
+    sentences = [os.urandom(SENTENCE_AUDIO_BYTES) for _ in range(SENTENCES_PER_ANSWER)]
+    # Client-side encoding is not server CPU: build the frames once
+    frames = client_frames(protocol, question)
+    bytes_in = sum(frame_size(f) for f in frames)
+    bytes_out = 0
+
+    cpu_start = time.process_time()
+    for _ in range(TURNS):
+        socket = MemorySocket(frames)
+
+        data = await receive_message(socket)
+        assert len(data["audio_bytes"]) == QUESTION_BYTES
+        for seq, audio in enumerate(sentences):
+            await send_message(socket, {"type": "audio_chunk", "seq": seq, "text": "Uma frase."}, audio, protocol)
+        await socket.send_json({"type": "response_done", "text": "Uma frase." * 3, "chunks": 3})
+        bytes_out += socket.bytes_out
+    cpu = time.process_time() - cpu_start
+
+    return bytes_in, bytes_out / TURNS, cpu / TURNS
+
+
+async def main():
+    print(f"Per turn: {QUESTION_BYTES // 1000} KB question, {SENTENCES_PER_ANSWER} x "
+          f"{SENTENCE_AUDIO_BYTES // 1000} KB answer audio\n")
+    print(f"{'protocol':>16} | {'upload (KB)':>11} | {'download (KB)':>13} | {'server CPU (ms)':>15}")
+    print("-" * 66)
+    results = {}
+    for name, protocol in (("v1 base64 JSON", PROTOCOL_JSON), ("v2 binary", PROTOCOL_BINARY)):
+        results[protocol] = await run_turns(protocol)
+        up, down, cpu = results[protocol]
+        print(f"{name:>16} | {up / 1000:>11.1f} | {down / 1000:>13.1f} | {cpu * 1000:>15.3f}")
+
+    v1, v2 = results[PROTOCOL_JSON], results[PROTOCOL_BINARY]
+    print(f"\nBytes saved per turn: {((v1[0] + v1[1]) - (v2[0] + v2[1])) / 1000:.1f} KB "
+          f"({1 - (v2[0] + v2[1]) / (v1[0] + v1[1]):.0%}), CPU {v1[2] / v2[2]:.1f}x lower")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,612 @@
+"""
+Caching components for the RAG service
+- BoundedCache: LRU + TTL with entry-count and byte caps, hit/miss/eviction counters
+- SemanticCache: nearest-query lookup with one matrix-vector product
+- AnswerCache: final answer text + audio, optionally persisted in SQLite
+- PromptAudioCache: pre-synthesized audio for the fixed prompts
+- SQLiteCacheBackend + SharedCache: caches shared by every worker process on a host;
+  async code uses aget()/aset(), which keep the SQLite calls off the event loop
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate payload size in bytes (texts, audio, vectors and containers of them)"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8", errors="ignore"))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    """
+    LRU cache with optional TTL, capped by entry count and total bytes.
+    ttl=0 disables expiry, max_bytes=0 disables the byte cap.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0, ttl: float = 0,
+                 sizeof: Callable[[Any], int] = estimate_size,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        self._clock = clock
+        # key -> (value, expires_at, size)
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and not self._expired(entry)
+
+    def _expired(self, entry: Tuple[Any, float, int]) -> bool:
+        return self.ttl > 0 and entry[1] <= self._clock()
+
+    def _remove(self, key: Hashable) -> None:
+        value, _, size = self._data.pop(key)
+        self.bytes -= size
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (and mark it recently used), or default"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if self._expired(entry):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or replace a value, evicting least recently used entries over the caps"""
+        if key in self._data:
+            self._remove(key)
+
+        size = self._sizeof(value)
+        if self.max_bytes and size > self.max_bytes:
+            return  # would evict everything and still not fit
+
+        self._data[key] = (value, self._clock() + self.ttl, size)
+        self.bytes += size
+
+        while len(self._data) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+            self.evict_oldest()
+
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        """get() for async callers (same interface as SharedCache, nothing to wait for here)"""
+        return self.get(key, default)
+
+    async def aset(self, key: Hashable, value: Any) -> None:
+        self.set(key, value)
+
+    def evict_oldest(self) -> None:
+        """Evict the least recently used entry"""
+        self._remove(next(iter(self._data)))
+        self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry without counting it as an eviction"""
+        if key not in self._data:
+            return default
+        value = self._data[key][0]
+        self._remove(key)
+        return value
+
+    def clear(self) -> None:
+        """Invalidate everything (e.g. after the FAISS index is rebuilt)"""
+        for key in list(self._data):
+            self._remove(key)
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for logging/metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SemanticCache:
+    """
+    Semantic cache backed by a pre-normalized contiguous float32 matrix.
+    A lookup is a single matrix-vector product; entries live in a
+    BoundedCache, so eviction is LRU/TTL and just frees a matrix row (O(1)).
+    """
+
+    def __init__(self, capacity: int, threshold: float, max_bytes: int = 0, ttl: float = 0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self._clock = clock
+        self._matrix: Optional[np.ndarray] = None  # allocated on first add (dimension unknown until then)
+        self._keys: List[Optional[Hashable]] = [None] * capacity
+        self._expires = np.full(capacity, np.inf)  # per row, so expired rows are masked before the argmax
+        self._free_slots = list(range(capacity - 1, -1, -1))
+        self._used = 0  # rows [0, _used) have ever been written
+        # key -> (slot, value)
+        self._entries = BoundedCache(capacity, max_bytes, ttl, sizeof=self._entry_size,
+                                     on_evict=self._release_slot, clock=clock)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry_size(self, entry: Tuple[int, Any]) -> int:
+        row_bytes = self._matrix.shape[1] * 4 if self._matrix is not None else 0
+        return row_bytes + estimate_size(entry[1])
+
+    def _release_slot(self, key: Hashable, entry: Tuple[int, Any]) -> None:
+        slot = entry[0]
+        self._keys[slot] = None
+        self._matrix[slot] = 0.0  # a zero row never scores above threshold
+        self._free_slots.append(slot)
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, embedding) -> Optional[Tuple[float, Any]]:
+        """Return (similarity, value) of the closest cached query above threshold"""
+        query = self._normalize(embedding)
+        if self._matrix is None or not self._entries or query is None or query.shape[0] != self._matrix.shape[1]:
+            self._entries.misses += 1
+            return None
+
+        # Cosine similarity against every cached query at once; expired rows can't win
+        scores = self._matrix[:self._used] @ query
+        scores[self._expires[:self._used] <= self._clock()] = -1.0
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        key = self._keys[best]
+        if similarity <= self.threshold or key is None:
+            self._entries.misses += 1
+            return None
+
+        entry = self._entries.get(key)  # refreshes LRU position, honours TTL
+        if entry is None:
+            return None
+        return similarity, entry[1]
+
+    def add(self, key: Hashable, embedding, value: Any) -> None:
+        """Store a query embedding and its value, evicting the least recently used entry when full"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        if self._matrix is None:
+            self._matrix = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+
+        self._entries.pop(key)
+        if not self._free_slots:
+            # Make room first so the new entry has a row to live in
+            self._entries.evict_oldest()
+
+        slot = self._free_slots.pop()
+        self._used = max(self._used, slot + 1)
+        self._matrix[slot] = vector
+        self._keys[slot] = key
+        self._expires[slot] = self._clock() + self.ttl if self.ttl > 0 else np.inf
+        self._entries.set(key, (slot, value))
+        if key not in self._entries:  # larger than max_bytes on its own
+            self._release_slot(key, (slot, value))
+
+    def clear(self) -> None:
+        """Drop every entry (e.g. after the FAISS index changes)"""
+        self._entries.clear()
+        self._used = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for logging/metrics"""
+        return self._entries.stats()
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a question for exact-match caching"""
+    cleaned = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(cleaned.split())
+
+
+class AnswerCache:
+    """
+    Final-answer cache: response text + synthesized audio for stateless questions.
+    Exact hits use the normalized query, near-duplicates use a per-language
+    SemanticCache. With a path, entries are also written to SQLite so they
+    survive restarts; `version` (KB + model + voice) scopes what is reused.
+    Rows of other versions are kept until the TTL purges them (another process
+    sharing the file may still be on that version). aget()/aput() keep the
+    SQLite I/O (audio BLOBs included) off the event loop.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0, ttl: float = 0,
+                 threshold: float = 0.95, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.threshold = threshold
+        self.version = ""
+        self._exact = BoundedCache(max_entries, max_bytes, ttl)
+        self._similar: Dict[str, SemanticCache] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()  # one connection, used from worker threads
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT, version TEXT, language TEXT, query TEXT,"
+                " text TEXT, audio BLOB, embedding BLOB, created_at REAL, PRIMARY KEY (key, version))"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    @staticmethod
+    def _key(query: str, language: str) -> str:
+        return f"{language}:{normalize_query(query)}"
+
+    def _semantic(self, language: str) -> SemanticCache:
+        if language not in self._similar:
+            self._similar[language] = SemanticCache(self.max_entries, self.threshold, self.max_bytes, self.ttl)
+        return self._similar[language]
+
+    def _remember(self, key: str, language: str, embedding: Optional[np.ndarray], answer: Dict) -> None:
+        self._exact.set(key, answer)
+        if embedding is not None:
+            self._semantic(language).add(key, embedding, answer)
+
+    def set_version(self, version: str) -> None:
+        """Switch to a new KB/model/voice version: drop memory, reload matching rows from disk"""
+        self.version = version
+        self._exact.clear()
+        for cache in self._similar.values():
+            cache.clear()
+        if self._db is None:
+            return
+
+        with self._lock:
+            if self.ttl:
+                self._db.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl,))
+                self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, language, query, text, audio, embedding FROM answers"
+                " WHERE version = ? ORDER BY created_at DESC LIMIT ?",
+                (version, self.max_entries)
+            ).fetchall()
+        for key, language, query, text, audio, embedding in reversed(rows):
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+            self._remember(key, language, vector, {"query": query, "text": text, "audio": audio})
+
+    def get(self, query: str, language: str) -> Optional[Dict]:
+        """Exact (normalized) match; also finds answers stored by other workers since our last load"""
+        key = self._key(query, language)
+        answer = self._exact.get(key)
+        if answer is not None or self._db is None:
+            return answer
+        return self._loaded(key, language, self.version, self._select(key, self.version))
+
+    async def aget(self, query: str, language: str) -> Optional[Dict]:
+        """get() with the SQLite read in a worker thread"""
+        key = self._key(query, language)
+        answer = self._exact.get(key)
+        if answer is not None or self._db is None:
+            return answer
+        version = self.version
+        return self._loaded(key, language, version, await asyncio.to_thread(self._select, key, version))
+
+    def _select(self, key: str, version: str) -> Optional[Tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT query, text, audio, embedding, created_at FROM answers WHERE key = ? AND version = ?",
+                (key, version)
+            ).fetchone()
+
+    def _loaded(self, key: str, language: str, version: str, row: Optional[Tuple]) -> Optional[Dict]:
+        """Answer of a stored row, now also in memory (unless it expired or the version changed meanwhile)"""
+        if row is None or version != self.version or (self.ttl and row[4] < time.time() - self.ttl):
+            return None
+        stored_query, text, audio, embedding, _ = row
+        answer = {"query": stored_query, "text": text, "audio": audio}
+        self._remember(key, language, np.frombuffer(embedding, dtype=np.float32) if embedding else None, answer)
+        return answer
+
+    def get_similar(self, embedding, language: str) -> Optional[Dict]:
+        """Nearest cached question in the same language, above threshold"""
+        hit = self._semantic(language).lookup(embedding)
+        return hit[1] if hit else None
+
+    def put(self, query: str, language: str, embedding, text: str, audio: bytes) -> None:
+        """Store an answer in memory and, if configured, on disk"""
+        row = self._put_in_memory(query, language, embedding, text, audio)
+        if self._db is not None:
+            self._insert(row)
+
+    async def aput(self, query: str, language: str, embedding, text: str, audio: bytes) -> None:
+        """put() with the SQLite write in a worker thread"""
+        row = self._put_in_memory(query, language, embedding, text, audio)
+        if self._db is not None:
+            await asyncio.to_thread(self._insert, row)
+
+    def _put_in_memory(self, query: str, language: str, embedding, text: str, audio: bytes) -> Tuple:
+        """Remember the answer; returns its row for the disk store"""
+        key = self._key(query, language)
+        vector = np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+        self._remember(key, language, vector, {"query": query, "text": text, "audio": audio})
+        return (key, self.version, language, query, text, audio,
+                vector.tobytes() if vector is not None else None, time.time())
+
+    def _insert(self, row: Tuple) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+            self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for logging/metrics (exact lookups)"""
+        return self._exact.stats()
+
+
+class PromptAudioCache:
+    """
+    Audio for fixed prompts (greeting, goodbye, ...), synthesized once per voice
+    configuration and served from memory. Files are named after a hash of the
+    voice fingerprint and text, so changing the voice settings re-renders them.
+    """
+
+    def __init__(self, directory: str,
+                 synthesize: Callable[[str, str], Awaitable[bytes]],
+                 fingerprint: Callable[[str], str]):
+        self.directory = directory
+        self._synthesize = synthesize
+        self._fingerprint = fingerprint
+        self._audio: Dict[str, "asyncio.Task[bytes]"] = {}
+
+    def _key(self, text: str, language: str) -> str:
+        return hashlib.md5(f"{self._fingerprint(language)}|{language}|{text}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    async def _load_or_render(self, key: str, text: str, language: str) -> bytes:
+        path = self._path(key)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+
+        audio = await self._synthesize(text, language)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+        return audio
+
+    async def get(self, text: str, language: str) -> bytes:
+        """Audio for a prompt; concurrent first calls share one synthesis"""
+        key = self._key(text, language)
+        task = self._audio.get(key)
+        if task is None or (task.done() and task.exception() is not None):
+            task = asyncio.ensure_future(self._load_or_render(key, text, language))
+            self._audio[key] = task
+        return await asyncio.shield(task)
+
+    async def warm(self, prompts: List[Tuple[str, str]]) -> None:
+        """Render every (text, language) prompt now and delete audio left over from old voices"""
+        await asyncio.gather(*(self.get(text, language) for text, language in prompts))
+
+        current = {f"{self._key(text, language)}.mp3" for text, language in prompts}
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".mp3") and filename not in current:
+                os.remove(os.path.join(self.directory, filename))
+
+
+class SQLiteCacheBackend:
+    """
+    Cache storage shared by every worker process on the host: one SQLite file in
+    WAL mode (on /dev/shm it never touches the disk). Values are bytes, grouped by
+    namespace and version; each namespace keeps its newest `max_entries`.
+    """
+
+    TRIM_EVERY = 64  # writes between trims
+
+    def __init__(self, path: str, max_entries: int, ttl: float = 0, max_value_bytes: int = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_value_bytes = max_value_bytes
+        self._writes = 0
+        self._lock = threading.Lock()  # one connection, used from the event loop's worker threads
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")  # a cache: losing the tail on a crash is fine
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT, version TEXT, key TEXT, value BLOB, created_at REAL,"
+            " PRIMARY KEY (namespace, version, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_age ON cache (namespace, created_at)")
+
+    def get(self, namespace: str, version: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND version = ? AND key = ?",
+                (namespace, version, key)
+            ).fetchone()
+        if row is None or (self.ttl and row[1] <= time.time() - self.ttl):
+            return None
+        return row[0]
+
+    def set(self, namespace: str, version: str, key: str, value: bytes) -> None:
+        if self.max_value_bytes and len(value) > self.max_value_bytes:
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                             (namespace, version, key, value, time.time()))
+            self._writes += 1
+            trim = self._writes % self.TRIM_EVERY == 0
+        if trim:
+            self.trim(namespace)
+
+    def trim(self, namespace: str) -> None:
+        """Drop expired entries and everything past the newest max_entries"""
+        with self._lock:
+            if self.ttl:
+                self._db.execute("DELETE FROM cache WHERE namespace = ? AND created_at <= ?",
+                                 (namespace, time.time() - self.ttl))
+            self._db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND created_at <= ("
+                " SELECT created_at FROM cache WHERE namespace = ?"
+                " ORDER BY created_at DESC LIMIT 1 OFFSET ?)",
+                (namespace, namespace, self.max_entries)
+            )
+
+    def purge(self, namespace: str, keep_version: str) -> None:
+        """Delete a namespace's entries from other versions (e.g. the previous index)"""
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE namespace = ? AND version != ?", (namespace, keep_version))
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+
+def create_cache_backend(name: str, path: str, max_entries: int, ttl: float = 0,
+                         max_value_bytes: int = 0) -> Optional[SQLiteCacheBackend]:
+    """CACHE_BACKEND: "memory" (per process, no backend) or "sqlite" (shared by all workers)"""
+    if name == "memory":
+        return None
+    if name == "sqlite":
+        return SQLiteCacheBackend(path, max_entries, ttl, max_value_bytes)
+    raise ValueError(f"Unknown CACHE_BACKEND {name!r} (expected memory or sqlite)")
+
+
+# (encode, decode) pairs for values that cross process boundaries
+JSON_CODEC: Tuple[Callable[[Any], bytes], Callable[[bytes], Any]] = (
+    lambda value: json.dumps(value, ensure_ascii=False).encode("utf-8"),
+    lambda data: json.loads(data),
+)
+VECTOR_CODEC: Tuple[Callable[[Any], bytes], Callable[[bytes], Any]] = (
+    lambda value: np.asarray(value, dtype=np.float32).tobytes(),
+    lambda data: np.frombuffer(data, dtype=np.float32).tolist(),
+)
+
+
+class SharedCache:
+    """
+    Two-level cache with the BoundedCache interface: this worker's BoundedCache
+    in front of a backend shared by all workers. `version` (a string or a
+    callable returning one, e.g. the KB version) scopes shared entries, so a
+    worker that hasn't reloaded yet can't feed stale results to one that has.
+    """
+
+    def __init__(self, local: BoundedCache, backend: SQLiteCacheBackend, namespace: str,
+                 codec: Tuple[Callable[[Any], bytes], Callable[[bytes], Any]],
+                 version: Union[str, Callable[[], str]] = ""):
+        self.local = local
+        self.backend = backend
+        self.namespace = namespace
+        self._encode, self._decode = codec
+        self._version = version
+        self.shared_hits = 0
+
+    @property
+    def version(self) -> str:
+        return self._version() if callable(self._version) else self._version
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return key if isinstance(key, str) else repr(key)
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.local or self.backend.get(self.namespace, self.version, self._key(key)) is not None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        return self._shared(key, self.backend.get(self.namespace, self.version, self._key(key)), default)
+
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        """get() with the SQLite lookup in a worker thread (local hits never leave the loop)"""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        data = await asyncio.to_thread(self.backend.get, self.namespace, self.version, self._key(key))
+        return self._shared(key, data, default)
+
+    def _shared(self, key: Hashable, data: Optional[bytes], default: Any) -> Any:
+        if data is None:
+            return default
+        # Another worker computed it: keep a local copy
+        value = self._decode(data)
+        self.local.set(key, value)
+        self.local.hits += 1
+        self.local.misses -= 1
+        self.shared_hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.local.set(key, value)
+        self.backend.set(self.namespace, self.version, self._key(key), self._encode(value))
+
+    async def aset(self, key: Hashable, value: Any) -> None:
+        """set() with the SQLite write in a worker thread (the local copy is there right away)"""
+        self.local.set(key, value)
+        await asyncio.to_thread(self.backend.set, self.namespace, self.version, self._key(key), self._encode(value))
+
+    def clear(self) -> None:
+        """Drop local entries and shared ones from other versions"""
+        self.local.clear()
+        self.backend.purge(self.namespace, self.version)
+
+    def stats(self) -> Dict[str, float]:
+        return {**self.local.stats(), "shared_hits": self.shared_hits,
+                "shared_entries": self.backend.count(self.namespace)}
@@ -0,0 +1,146 @@
+"""
+Memory-mapped columnar chunk store (replaces metadata.pkl)
+- One file: JSON header + vector IDs, chunk IDs, source IDs, pages, section IDs,
+  text offsets, UTF-8 text blob (stores written before pages/sections read as
+  page 0, section "")
+- Opened with mmap: nothing is parsed up front, uvicorn workers share the page cache
+- Lookups by vector ID decode only the chunks asked for (the k search hits)
+
+    python chunk_store.py data/metadata.pkl data/chunks.bin   # convert an old build
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Union
+
+import numpy as np
+
+MAGIC = b"VRCHUNK1"
+ALIGN = 8
+
+# name -> dtype, in file order (offsets has one extra entry: the end of the blob)
+COLUMNS = (("ids", "<i8"), ("chunk_ids", "<i4"), ("source_ids", "<i4"), ("pages", "<i4"), ("section_ids", "<i4"),
+           ("offsets", "<i8"))
+
+
+def write_chunk_store(path: str, metadata: Union[Dict[int, Dict], List[Dict]]) -> None:
+    """Write {vector ID: {"source", "chunk_id", "text", "page", "section"}} (or a positional list) to `path`"""
+    if isinstance(metadata, list):
+        metadata = dict(enumerate(metadata))
+    ids = np.array(sorted(metadata), dtype="<i8")
+    chunks = [metadata[int(vector_id)] for vector_id in ids]
+
+    sources: Dict[str, int] = {}
+    source_ids = np.array([sources.setdefault(c["source"], len(sources)) for c in chunks], dtype="<i4")
+    chunk_ids = np.array([c["chunk_id"] for c in chunks], dtype="<i4")
+    pages = np.array([c.get("page", 0) for c in chunks], dtype="<i4")
+    sections: Dict[str, int] = {}
+    section_ids = np.array([sections.setdefault(c.get("section", ""), len(sections)) for c in chunks], dtype="<i4")
+    texts = [c["text"].encode("utf-8") for c in chunks]
+    offsets = np.zeros(len(texts) + 1, dtype="<i8")
+    np.cumsum([len(t) for t in texts], out=offsets[1:])
+    arrays = {"ids": ids, "chunk_ids": chunk_ids, "source_ids": source_ids, "pages": pages,
+              "section_ids": section_ids, "offsets": offsets}
+
+    # Column positions are relative to the end of the header
+    layout, position = {}, 0
+    for name, _ in COLUMNS:
+        layout[name] = position
+        position += -(-arrays[name].nbytes // ALIGN) * ALIGN
+    layout["text"] = position
+    header = json.dumps({"count": len(ids), "sources": list(sources), "sections": list(sections),
+                         "layout": layout}).encode()
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGN)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, _ in COLUMNS:
+            data = arrays[name].tobytes()
+            f.write(data + b"\0" * (-len(data) % ALIGN))
+        for text in texts:
+            f.write(text)
+
+
+class ChunkStore(Mapping):
+    """Read-only {vector ID: chunk dict} view over a mapped chunk store file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a chunk store (old metadata.pkl? run: "
+                                 f"python chunk_store.py <metadata.pkl> {path})")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header_length, = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._map[start:start + header_length])
+        start += header_length
+
+        count = header["count"]
+        self.sources: List[str] = header["sources"]
+        self.sections: List[str] = header["sections"] if "section_ids" in header["layout"] else [""]
+        for name, dtype in COLUMNS:
+            length = count + 1 if name == "offsets" else count
+            if name in header["layout"]:
+                column = np.frombuffer(self._map, dtype, length, start + header["layout"][name])
+            else:
+                column = np.zeros(length, dtype)  # written before the column existed
+            setattr(self, f"_{name}", column)
+        self._text_start = start + header["layout"]["text"]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Vector IDs, ascending"""
+        return self._ids
+
+    def _row(self, vector_id: int) -> int:
+        row = int(np.searchsorted(self._ids, vector_id))
+        if row == len(self._ids) or self._ids[row] != vector_id:
+            raise KeyError(vector_id)
+        return row
+
+    def __getitem__(self, vector_id: int) -> Dict:
+        row = self._row(int(vector_id))
+        start, end = self._text_start + self._offsets[row], self._text_start + self._offsets[row + 1]
+        return {
+            "source": self.sources[self._source_ids[row]],
+            "chunk_id": int(self._chunk_ids[row]),
+            "text": self._map[start:end].decode("utf-8"),
+            "page": int(self._pages[row]),
+            "section": self.sections[self._section_ids[row]],
+        }
+
+    def __contains__(self, vector_id) -> bool:
+        try:
+            self._row(int(vector_id))
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        return (int(vector_id) for vector_id in self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def convert_pickle(pickle_path: str, store_path: str) -> int:
+    """One-off migration of a metadata.pkl written by an older ingest (trusted local file)"""
+    import pickle
+
+    with open(pickle_path, "rb") as f:
+        metadata = pickle.load(f)
+    write_chunk_store(store_path + ".tmp", metadata)
+    os.replace(store_path + ".tmp", store_path)
+    return len(metadata)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python chunk_store.py <metadata.pkl> <chunks.bin>")
+    print(f"✓ {convert_pickle(sys.argv[1], sys.argv[2])} chunks written to {sys.argv[2]}")
@@ -0,0 +1,150 @@
+"""
+Structure-aware chunking for ingest
+- Documents are read as a stream of lines with their page: PDFs one page at a
+  time, text files by their "PÁGINA n" / "PAGE n" headings
+- Lines become headings and paragraphs; a chunk never spans two sections and
+  starts with its section heading, so it is about one thing
+- Paragraphs are packed whole up to the chunk size; a longer one is split on
+  sentences, then words. Only chunks cut out of one section overlap, by their
+  last paragraphs/sentences
+- One tiktoken encoder for the whole process
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import tiktoken
+
+encoder = tiktoken.get_encoding("cl100k_base")
+
+PAGE_HEADING = re.compile(r"^(?:PÁGINA|PAGINA|PAGE|PÁG\.?)\s+(\d+)\b", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+MAX_HEADING_CHARS = 100
+
+
+def count_tokens(text: str) -> int:
+    return len(encoder.encode_ordinary(text))
+
+
+def is_heading(line: str) -> bool:
+    """Markdown heading, a page marker, or a short line in capitals without a final period"""
+    if line.startswith("#") or PAGE_HEADING.match(line):
+        return True
+    if len(line) > MAX_HEADING_CHARS or line.endswith((".", ":", ";", ",")):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 4 and sum(c.isupper() for c in letters) >= 0.7 * len(letters)
+
+
+def iter_pdf_lines(path: str) -> Iterator[Tuple[int, str]]:
+    """(page number, line) of a PDF, one page in memory at a time"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        for number, page in enumerate(doc, 1):
+            for line in page.get_text().splitlines():
+                yield number, line
+            yield number, ""  # a page break ends the paragraph
+
+
+def iter_text_lines(path: str) -> Iterator[Tuple[int, str]]:
+    """(page number, line) of a text file; pages come from its page headings (0 before the first)"""
+    page = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = PAGE_HEADING.match(line.strip())
+            if match:
+                page = int(match.group(1))
+            yield page, line.rstrip("\n")
+
+
+def iter_blocks(lines: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, int, str]]:
+    """("heading" | "paragraph", page, text); paragraphs end at blank lines and headings"""
+    paragraph: List[str] = []
+    paragraph_page = 0
+    for page, line in lines:
+        line = line.strip()
+        if line and not is_heading(line):
+            if not paragraph:
+                paragraph_page = page
+            paragraph.append(line)
+            continue
+        if paragraph:
+            yield "paragraph", paragraph_page, " ".join(paragraph)
+            paragraph = []
+        if line:
+            yield "heading", page, line.lstrip("#").strip()
+    if paragraph:
+        yield "paragraph", paragraph_page, " ".join(paragraph)
+
+
+def split_long(text: str, max_tokens: int) -> List[Tuple[str, int]]:
+    """
+    (sentence, tokens) of a paragraph too long for one chunk. An over-long
+    sentence is cut between words (a word longer than a chunk, on tokens).
+    """
+    pieces = []
+    for sentence in SENTENCE_END.split(text):
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append((sentence, tokens))
+            continue
+        words: List[str] = []
+        for word in sentence.split(" "):
+            if words and count_tokens(" ".join(words + [word])) > max_tokens:
+                pieces.append((" ".join(words), count_tokens(" ".join(words))))
+                words = []
+            tokens = encoder.encode_ordinary(word)
+            if len(tokens) > max_tokens:
+                pieces.extend((encoder.decode(tokens[i:i + max_tokens]), len(tokens[i:i + max_tokens]))
+                              for i in range(0, len(tokens), max_tokens))
+            else:
+                words.append(word)
+        if words:
+            pieces.append((" ".join(words), count_tokens(" ".join(words))))
+    return pieces
+
+
+def chunk_blocks(blocks: Iterable[Tuple[str, int, str]], chunk_size: int, overlap: int) -> Iterator[Dict]:
+    """{"text", "page", "section", "tokens"} chunks of at most ~chunk_size tokens, heading included"""
+    section, heading_tokens = "", 0
+    parts: List[Tuple[str, int, int]] = []  # (text, tokens, page) of the chunk being filled
+    carried = 0  # leading parts repeated from the previous chunk of the section
+
+    def chunk() -> Dict:
+        body = "\n".join(text for text, _, _ in parts)
+        text = f"{section}\n{body}" if section else body
+        return {"text": text, "page": parts[0][2], "section": section, "tokens": count_tokens(text)}
+
+    for kind, page, text in blocks:
+        if kind == "heading":
+            if len(parts) > carried:
+                yield chunk()
+            parts, carried = [], 0
+            section, heading_tokens = text, count_tokens(text) + 1
+            continue
+
+        budget = max(1, chunk_size - heading_tokens)
+        tokens = count_tokens(text)
+        pieces = [(text, tokens)] if tokens <= budget else split_long(text, budget)
+        for piece, piece_tokens in pieces:
+            if sum(t for _, t, _ in parts) + piece_tokens > budget:
+                if len(parts) > carried:
+                    yield chunk()
+                # Overlap: the next chunk starts with the last parts, up to `overlap` tokens
+                tail, tail_tokens = [], 0
+                for part in reversed(parts):
+                    if tail_tokens + part[1] > min(overlap, budget - piece_tokens):
+                        break
+                    tail.insert(0, part)
+                    tail_tokens += part[1]
+                parts, carried = tail, len(tail)
+            parts.append((piece, piece_tokens, page))
+    if len(parts) > carried:
+        yield chunk()
+
+
+def chunk_document(path: str, chunk_size: int, overlap: int) -> List[Dict]:
+    """Chunks of a PDF or text file, in document order"""
+    lines = iter_pdf_lines(path) if path.endswith(".pdf") else iter_text_lines(path)
+    return list(chunk_blocks(iter_blocks(lines), chunk_size, overlap))
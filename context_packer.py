@@ -0,0 +1,111 @@
+"""
+Deterministic context packing for the answer prompt (no extra LLM call)
+- Token budget counted with chunker.count_tokens (special tokens are plain text)
+- Consecutive chunks of a section share CHUNK_OVERLAP tokens: the repeated
+  text is dropped, as are sentences repeated across chunks
+- Over budget, the sentences sharing the rarest words with the question are
+  kept first (top-ranked chunks break ties); they are emitted in document order
+"""
+
+import math
+import re
+from typing import Dict, List, Set, Tuple
+
+from chunker import count_tokens
+from lexical_index import fold, tokenize
+
+MIN_OVERLAP_CHARS = 20  # shorter shared text is coincidence, not a CHUNK_OVERLAP window
+RANK_WEIGHT = 0.5  # score bonus of the first chunk's sentences, decaying with rank
+STEM_CHARS = 5  # words match on their first 5 letters ("esgoto" ~ "esgotar", "plans" ~ "planos")
+
+# Sentence end: punctuation followed by whitespace (keeps "1.500" and "9,99" whole), or a line break
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def strip_overlap(previous: str, text: str) -> str:
+    """`text` without the prefix it shares with the end of `previous`"""
+    probe = text[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return text
+    position = previous.find(probe)
+    while position != -1:
+        if text.startswith(previous[position:]):
+            return text[len(previous) - position:]
+        position = previous.find(probe, position + 1)
+    return text
+
+
+def deduplicate(chunks: List[Dict]) -> List[str]:
+    """Chunk texts (in the given order) without the overlap of a chunk and its predecessor in the document"""
+    by_position = {(chunk["source"], chunk["chunk_id"]): chunk["text"] for chunk in chunks}
+    texts = []
+    for chunk in chunks:
+        previous = by_position.get((chunk["source"], chunk["chunk_id"] - 1))
+        texts.append(strip_overlap(previous, chunk["text"]) if previous else chunk["text"])
+    return texts
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_END.split(text) if sentence.strip()]
+
+
+def stems(text: str) -> Set[str]:
+    """Search terms cut to STEM_CHARS: a crude, language-agnostic stemmer"""
+    return {term[:STEM_CHARS] for term in tokenize(text)}
+
+
+def pack_context(query: str, chunks: List[Dict], max_tokens: int) -> str:
+    """
+    Join retrieved chunks as "[Doc i]" sections within max_tokens. Everything
+    fits: the deduplicated chunks verbatim. Otherwise the best-scoring sentences.
+    """
+    sections, seen = [], set()
+    for rank, text in enumerate(deduplicate(chunks)):
+        sentences = []
+        for sentence in split_sentences(text):
+            key = " ".join(fold(sentence).split())
+            if key not in seen:
+                seen.add(key)
+                sentences.append(sentence)
+        if sentences:
+            sections.append((rank, sentences))
+
+    def render(kept: List[Tuple[int, List[str]]]) -> str:
+        return "\n\n".join(f"[Doc {i}]\n" + "\n".join(sentences) for i, (_, sentences) in enumerate(kept, 1))
+
+    context = render(sections)
+    if count_tokens(context) <= max_tokens:
+        return context
+
+    # Rarer shared words weigh more (IDF over the candidate sentences)
+    candidates = [(rank, position, sentence, stems(sentence))
+                  for rank, sentences in sections for position, sentence in enumerate(sentences)]
+    query_terms = stems(query)
+    document_frequency = {term: sum(term in terms for *_, terms in candidates) for term in query_terms}
+    weights = {term: math.log(1 + len(candidates) / df) for term, df in document_frequency.items() if df}
+
+    def score(candidate) -> float:
+        rank, _, _, terms = candidate
+        return sum(weights.get(term, 0.0) for term in terms & query_terms) + RANK_WEIGHT / (rank + 1)
+
+    # Greedy by score; "[Doc i]" headers and line breaks cost ~5 tokens per section
+    budget = max_tokens - 5 * len(sections)
+    kept = []
+    for rank, position, sentence, _ in sorted(candidates, key=lambda c: (-score(c), c[0], c[1])):
+        cost = count_tokens(sentence) + 1
+        if cost <= budget:
+            kept.append((rank, position))
+            budget -= cost
+
+    def render_kept() -> str:
+        chosen = set(kept)
+        packed = [(rank, [sentence for position, sentence in enumerate(sentences) if (rank, position) in chosen])
+                  for rank, sentences in sections]
+        return render([section for section in packed if section[1]])
+
+    # Tokens can merge differently once joined: drop the weakest sentences until it really fits
+    context = render_kept()
+    while kept and count_tokens(context) > max_tokens:
+        kept.pop()
+        context = render_kept()
+    return context
@@ -0,0 +1,185 @@
+"""
+Embedding providers, shared by ingest_pdfs.py (chunks) and app.py (queries)
+- openai: the embeddings API; every cache-missing query pays a network round-trip
+- onnx: a local sentence-embedding model on CPU (model.onnx + tokenizer.json in
+  EMBEDDING_MODEL_PATH, e.g. a quantized multilingual MiniLM export). Batches run
+  on a thread pool, so the event loop keeps serving while a query is embedded
+- hash: deterministic hashed bag of words, no model and no network (tests, offline runs)
+Vectors of different providers aren't comparable: each provider has a signature
+that ingest records in the manifest, and the server refuses an index built with
+another one (see KnowledgeBase.load).
+"""
+
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from lexical_index import tokenize
+
+PROVIDERS = ("openai", "onnx", "hash")
+
+# Output size of the OpenAI embedding models (text-embedding-3-* at their default size)
+OPENAI_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+HASH_DIMENSION = 256
+ONNX_MAX_TOKENS = 256  # longer texts are truncated (MiniLM-style models are trained on 256)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place (all-zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1.0)
+    return vectors
+
+
+def embedding_signature(name: str, model: str = "", model_path: str = "") -> str:
+    """What vectors depend on (provider, model, model file), without loading the model"""
+    if name == "onnx":
+        with open(os.path.join(model_path, "model.onnx"), "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()[:12]
+        return f"onnx:{os.path.basename(os.path.normpath(model_path))}:{digest}"
+    if name == "hash":
+        return f"hash:{HASH_DIMENSION}"
+    return model  # openai: just the model name, what manifests recorded before there were other providers
+
+
+class EmbeddingProvider:
+    """Turns texts into float32 rows; subclasses implement embed() and/or aembed()"""
+
+    name = ""
+    signature = ""  # provider + model: vectors with different signatures don't mix
+    dimension: Optional[int] = None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.embed, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed([text]))[0].tolist()
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OpenAIEmbedder(EmbeddingProvider):
+    """OpenAI embeddings API (sync client for blocking callers, async client for the event loop)"""
+
+    name = "openai"
+
+    def __init__(self, model: str, client=None, async_client=None):
+        self.model = model
+        self.client = client
+        self.async_client = async_client
+        self.signature = embedding_signature(self.name, model)
+        self.dimension = OPENAI_DIMENSIONS.get(model)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        response = await self.async_client.embeddings.create(model=self.model, input=texts)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    async def aclose(self) -> None:
+        if self.async_client is not None:
+            await self.async_client.close()
+
+
+class OnnxEmbedder(EmbeddingProvider):
+    """
+    Local transformer encoder exported to ONNX: mean pooling over the attention
+    mask, L2-normalized. Inference releases the GIL, so `threads` batches run in parallel.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, threads: int = 2, batch_size: int = 32):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("EMBEDDING_PROVIDER=onnx needs: pip install onnxruntime tokenizers") from e
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1  # parallelism comes from the batches in the pool
+        self.session = onnxruntime.InferenceSession(os.path.join(model_path, "model.onnx"), options,
+                                                    providers=["CPUExecutionProvider"])
+        self.inputs = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_path, "tokenizer.json"))
+        self.tokenizer.enable_padding()
+        self.tokenizer.enable_truncation(ONNX_MAX_TOKENS)
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="embed")
+        self.signature = embedding_signature(self.name, model_path=model_path)
+        self.dimension = self.embed(["dimension"]).shape[1]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64), "attention_mask": mask,
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)}
+        output = self.session.run(None, {name: value for name, value in feed.items() if name in self.inputs})[0]
+        if output.ndim == 3:  # token embeddings: average the real (unpadded) tokens
+            weights = mask[:, :, None].astype(np.float32)
+            output = (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return normalize(output.astype(np.float32))
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(loop.run_in_executor(self.pool, self.embed, batch) for batch in batches))
+        return np.concatenate(results) if results else np.zeros((0, self.dimension), dtype=np.float32)
+
+    async def aclose(self) -> None:
+        self.pool.shutdown(wait=False)
+
+
+class HashEmbedder(EmbeddingProvider):
+    """
+    Hashed bag of words and word pairs (same tokens as BM25, accents folded), signed
+    and L2-normalized. No semantics, but deterministic, instant and offline: texts
+    sharing words are close, which is enough to exercise retrieval end to end.
+    """
+
+    name = "hash"
+
+    def __init__(self):
+        self.dimension = HASH_DIMENSION
+        self.signature = embedding_signature(self.name)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                bucket = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                vectors[row, bucket % self.dimension] += 1.0 if bucket >> 63 else -1.0
+        return normalize(vectors)
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        return self.embed(texts)  # microseconds per text: not worth a thread hop
+
+
+def create_embedding_provider(name: str, model: str = "text-embedding-3-small", model_path: str = "",
+                              client=None, async_client=None, threads: int = 2) -> EmbeddingProvider:
+    """Embedding provider selected by EMBEDDING_PROVIDER ("openai", "onnx" or "hash")"""
+    if name == "openai":
+        return OpenAIEmbedder(model, client, async_client)
+    if name == "onnx":
+        if not model_path:
+            raise ValueError("EMBEDDING_PROVIDER=onnx needs EMBEDDING_MODEL_PATH (directory with model.onnx "
+                             "and tokenizer.json)")
+        return OnnxEmbedder(model_path, threads)
+    if name == "hash":
+        return HashEmbedder()
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER {name!r} (expected {', '.join(PROVIDERS)})")
@@ -0,0 +1,210 @@
+"""
+Local stand-in for the OpenAI API, used by the benchmarks
+- /v1/embeddings: deterministic hash-seeded unit vectors, with optional
+  per-request input limits, rate limiting (429) and injected failures (500)
+- /v1/chat/completions: canned answer, streamed token by token; prompts go through
+  a simulated prefix cache (OpenAI's rules: >= 1024 tokens, 128-token steps)
+- /v1/audio/transcriptions: fixed transcript (records what was uploaded)
+- /v1/audio/speech: fake MP3 bytes, sized like real speech for the text
+- Configurable latency to mimic the round-trip from Mozambique
+"""
+
+import base64
+import hashlib
+import json
+import socket
+import threading
+import time
+import asyncio
+from typing import List, Union
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+CANNED_ANSWER = ("Oh, great question! For students we recommend the Basic 4G plan. "
+                 "It costs 500 meticais a month and includes 10 GB of data. "
+                 "You can subscribe in the app or at any of our shops.")
+
+
+# Prompt caching as OpenAI does it: prefixes of at least 1024 tokens, matched in 128-token steps
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_STEP = 128
+PROMPT_CACHE_SIZE = 256
+
+
+def prompt_tokens(text: str) -> int:
+    return len(text) // 4  # ~4 characters per token is close enough for a stand-in
+
+
+def cached_prefix_tokens(prompt: str, seen: List[str]) -> int:
+    """Tokens of the longest prefix shared with a recent prompt, as the cache would serve them"""
+    best = 0
+    for other in seen:
+        low, high = best, min(len(prompt), len(other))  # binary search on slice compares (runs in C)
+        if prompt[:low] != other[:low]:
+            continue
+        while low < high:
+            middle = (low + high + 1) // 2
+            if prompt[:middle] == other[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        best = low
+    tokens = prompt_tokens(prompt[:best])
+    if tokens < PROMPT_CACHE_MIN_TOKENS:
+        return 0
+    return PROMPT_CACHE_MIN_TOKENS + (tokens - PROMPT_CACHE_MIN_TOKENS) // PROMPT_CACHE_STEP * PROMPT_CACHE_STEP
+
+
+def fake_embedding(text: Union[str, List[int]], dimension: int) -> np.ndarray:
+    """Deterministic unit vector for a piece of text (or token list)"""
+    seed_source = text if isinstance(text, str) else ",".join(map(str, text))
+    seed = int(hashlib.md5(seed_source.encode()).hexdigest()[:8], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def create_app(latency: float = 0.2, token_delay: float = 0.01, dimension: int = 1536,
+               input_latency: float = 0.0, max_inputs: int = 0, rate_limit_every: int = 0,
+               prefill_latency: float = 0.0) -> FastAPI:
+    """
+    Build the fake API; latency is added before every response (plus
+    input_latency per embedded input). max_inputs mimics the API's
+    per-request limit, rate_limit_every=N answers every Nth embeddings call
+    with a 429 (all three can be changed later on fake.state). Set
+    fake.state.fail_after=N to fail every call after the Nth, and
+    fake.state.echo_transcripts=True to transcribe a WAV whose samples are
+    UTF-8 text as that text (lets a load test vary the questions), and
+    fake.state.completion_tokens=N to make non-streamed completions take
+    N * token_delay (e.g. a summary) instead of the canned answer's length.
+    prefill_latency is added per prompt token not served from the prompt cache.
+    """
+    fake = FastAPI()
+    fake.state.requests = 0
+    fake.state.embedding_calls = 0
+    fake.state.fail_after = 0
+    fake.state.max_inputs = max_inputs
+    fake.state.rate_limit_every = rate_limit_every
+    fake.state.echo_transcripts = False
+    fake.state.completion_tokens = 0
+    fake.state.prompts: List[str] = []
+
+    @fake.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        fake.state.requests += 1
+        fake.state.embedding_calls += 1
+
+        inputs = body["input"]
+        # Single string or single token list -> wrap
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        if fake.state.fail_after and fake.state.embedding_calls > fake.state.fail_after:
+            return JSONResponse({"error": {"message": "Injected failure", "type": "server_error"}},
+                                status_code=500)
+        if fake.state.rate_limit_every and fake.state.embedding_calls % fake.state.rate_limit_every == 0:
+            return JSONResponse({"error": {"message": "Rate limit reached", "type": "requests"}},
+                                status_code=429, headers={"retry-after": "0.05"})
+        if fake.state.max_inputs and len(inputs) > fake.state.max_inputs:
+            return JSONResponse({"error": {"message": f"Too many inputs ({len(inputs)} > {fake.state.max_inputs})",
+                                           "type": "invalid_request_error"}}, status_code=400)
+
+        await asyncio.sleep(latency + input_latency * len(inputs))
+
+        data = []
+        for i, item in enumerate(inputs):
+            vector = fake_embedding(item, dimension)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+        })
+
+    @fake.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fake.state.requests += 1
+        model = body.get("model", "fake")
+        prompt = "".join(f"<{m['role']}>{m['content']}" for m in body.get("messages", []))
+        prompt_size = prompt_tokens(prompt)
+        cached = cached_prefix_tokens(prompt, fake.state.prompts)
+        fake.state.prompts = (fake.state.prompts + [prompt])[-PROMPT_CACHE_SIZE:]
+        usage = {"prompt_tokens": prompt_size, "completion_tokens": len(CANNED_ANSWER.split(" ")),
+                 "total_tokens": prompt_size + len(CANNED_ANSWER.split(" ")),
+                 "prompt_tokens_details": {"cached_tokens": cached}}
+        await asyncio.sleep(latency + prefill_latency * (prompt_size - cached))
+
+        if not body.get("stream"):
+            # A non-streamed completion arrives once every token has been generated
+            await asyncio.sleep(token_delay * (fake.state.completion_tokens or len(CANNED_ANSWER.split(" "))))
+            return JSONResponse({
+                "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": CANNED_ANSWER}}],
+                "usage": usage
+            })
+
+        async def events():
+            for word in CANNED_ANSWER.split(" "):
+                chunk = {
+                    "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_delay)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                chunk = {"id": "fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @fake.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        fake.state.requests += 1
+        upload = form["file"]
+        content = await upload.read()
+        fake.state.last_upload = (upload.filename, upload.content_type, len(content))
+        await asyncio.sleep(latency)
+        if fake.state.echo_transcripts:
+            return JSONResponse({"text": content[44:].decode("utf-8", errors="ignore").rstrip("\0")})
+        return JSONResponse({"text": "What are the student plans?"})
+
+    @fake.post("/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        fake.state.requests += 1
+        await asyncio.sleep(latency)
+        # ~1 KB of 64 kbps MP3 per 8 characters of text
+        return Response(b"ID3" + b"\xff" * (128 * len(body.get("input", ""))), media_type="audio/mpeg")
+
+    return fake
+
+
+def start_fake_openai(latency: float = 0.2, token_delay: float = 0.01, dimension: int = 1536,
+                      fake: FastAPI = None) -> str:
+    """Run the fake API (or a prebuilt `fake` app) in a background thread and return its base URL"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(fake or create_app(latency, token_delay, dimension),
+                            host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    return f"http://127.0.0.1:{port}/v1"
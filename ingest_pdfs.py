@@ -2,129 +2,487 @@
 """Ingest PDFs and create FAISS index"""
 
 import os
-import pickle
+import sys
+import json
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import random
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
-import fitz  # PyMuPDF
-import tiktoken
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 import faiss
 from dotenv import load_dotenv
 
+from chunk_store import ChunkStore, convert_pickle, write_chunk_store
+from chunker import chunk_document, encoder
+from embeddings import PROVIDERS, EmbeddingProvider, create_embedding_provider, embedding_signature
+from lexical_index import write_lexical_index
+from vector_index import (INDEX_TYPES, create_index, index_kind, is_lossless, reconstruct_vectors,
+                          supports_removal, train_and_add)
+
 load_dotenv()
 
+# Embedding provider (see embeddings.py): openai | onnx (local model) | hash (offline, tests)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "")  # onnx: directory with model.onnx + tokenizer.json
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", str(os.cpu_count() or 1)))  # onnx: batches run in parallel
+if EMBEDDING_PROVIDER not in PROVIDERS:
+    raise ValueError(f"EMBEDDING_PROVIDER must be one of {', '.join(PROVIDERS)}")
+
 # Verify API key
 api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
+if not api_key and EMBEDDING_PROVIDER == "openai":
     raise ValueError("OPENAI_API_KEY not found in .env file. Please set it.")
 
-client = OpenAI(api_key=api_key)
 
 # Configuration - Match app.py settings
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "400"))  # tokens
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+CHUNKER_VERSION = "structure-1"  # bump when chunker.py changes how documents are cut
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")  # Faster, smaller
 
+# Embedding stage: token-aware batches, bounded concurrency, resumable
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "100000"))  # per request (API limit: 300k)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "512"))  # inputs per request (API limit: 2048)
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "8"))
+EMBED_BACKOFF_SECONDS = float(os.getenv("EMBED_BACKOFF_SECONDS", "1.0"))
+EMBED_CHECKPOINT_DIR = os.getenv("EMBED_CHECKPOINT_DIR", "data/embedding_checkpoint")
+EMBED_QUEUE = int(os.getenv("EMBED_QUEUE", "8"))  # batches waiting for a request slot before extraction pauses
+
+# Extraction stage: PDFs are parsed and chunked in worker processes while earlier chunks are embedded
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))  # 0 = in this process
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+# Index type (see vector_index.py): flat | ivf | hnsw | ivfpq
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = 4*sqrt(vectors)
+PQ_M = int(os.getenv("PQ_M", "0"))  # 0 = dimension/16 bytes per vector
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+if INDEX_TYPE not in INDEX_TYPES:
+    raise ValueError(f"INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}")
+
 print(f"📋 Ingestion Configuration:")
-print(f"  - Embedding Model: {EMBEDDING_MODEL}")
+print(f"  - Embeddings: {EMBEDDING_PROVIDER} {EMBEDDING_MODEL if EMBEDDING_PROVIDER == 'openai' else EMBEDDING_MODEL_PATH}")
 print(f"  - Chunk Size: {CHUNK_SIZE} tokens")
 print(f"  - Chunk Overlap: {CHUNK_OVERLAP} tokens")
-print(f"  - API Key: {api_key[:8]}...{api_key[-4:]}\n")
-
-def count_tokens(text: str) -> int:
-    """Count tokens in text"""
-    enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
-
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF"""
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    doc.close()
-    return text
-
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
-    """Split text into chunks with overlap"""
-    enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
-    chunks = []
-
-    start = 0
-    while start < len(tokens):
-        end = start + chunk_size
-        chunk_tokens = tokens[start:end]
-        decoded_chunk = enc.decode(chunk_tokens)
-        chunks.append(decoded_chunk)
-        start += chunk_size - overlap
-
-    return chunks
-
-def get_embeddings(texts: list) -> list:
-    """Get embeddings from OpenAI"""
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=texts
-    )
-    return [item.embedding for item in response.data]
-
-def build_index(pdf_dir: str = "pdfs", output_dir: str = "data") -> None:
-    """Build FAISS index from PDFs and text files"""
-
-    print("📄 Extracting text from documents...")
-    all_chunks = []
-    metadata = []
-
-    # Process all PDFs and text files
-    for filename in os.listdir(pdf_dir):
-        if filename.endswith('.pdf'):
-            pdf_path = os.path.join(pdf_dir, filename)
-            print(f"  Processing {filename}...")
-
-            text = extract_text_from_pdf(pdf_path)
-            chunks = chunk_text(text)
-        elif filename.endswith('.txt'):
-            txt_path = os.path.join(pdf_dir, filename)
-            print(f"  Processing {filename}...")
-
-            with open(txt_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            chunks = chunk_text(text)
-        else:
-            continue
+print(f"  - Embedding Batches: <= {EMBED_BATCH_SIZE} chunks / {EMBED_BATCH_TOKENS} tokens, {EMBED_CONCURRENCY} in parallel")
+print(f"  - Extraction Workers: {INGEST_WORKERS or 'in-process'}")
+print(f"  - Index Type: {INDEX_TYPE}")
+print(f"  - API Key: {api_key[:8]}...{api_key[-4:]}\n" if api_key else "  - API Key: not set\n")
+
+def plan_batches(texts: List[str], max_tokens: int = EMBED_BATCH_TOKENS,
+                 max_items: int = EMBED_BATCH_SIZE) -> Iterator[Tuple[int, int]]:
+    """
+    Yield consecutive (start, end) ranges that fit one embeddings request.
+    Tokens are counted a slice at a time, so the first batches can be sent
+    while the rest of the corpus is still being counted.
+    """
+    start, batch_tokens = 0, 0
+    for offset in range(0, len(texts), max_items):
+        token_counts = [len(tokens) for tokens in encoder.encode_ordinary_batch(texts[offset:offset + max_items])]
+        for i, tokens in enumerate(token_counts, offset):
+            if i > start and (batch_tokens + tokens > max_tokens or i - start >= max_items):
+                yield start, i
+                start, batch_tokens = i, 0
+            batch_tokens += tokens
+    if start < len(texts):
+        yield start, len(texts)
+
+
+def create_client() -> AsyncOpenAI:
+    """
+    Client for one embedding run. Each run has its own event loop, so the
+    connection pool can't be shared between runs. Retries are handled by
+    embed_batch (backoff tuned for bulk ingest).
+    """
+    return AsyncOpenAI(api_key=api_key, max_retries=0)
+
+
+def create_provider() -> EmbeddingProvider:
+    """Embedding provider for one run (the OpenAI one gets this run's client)"""
+    return create_embedding_provider(EMBEDDING_PROVIDER, EMBEDDING_MODEL, EMBEDDING_MODEL_PATH,
+                                     async_client=create_client() if EMBEDDING_PROVIDER == "openai" else None,
+                                     threads=EMBEDDING_THREADS)
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Server-suggested wait (Retry-After) or exponential backoff with jitter"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return min(60.0, EMBED_BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+async def embed_batch(provider: EmbeddingProvider, texts: List[str], semaphore: asyncio.Semaphore) -> np.ndarray:
+    """Embed one batch, backing off on rate limits and transient errors"""
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        async with semaphore:
+            try:
+                return await provider.aembed(texts)
+            except RETRYABLE_ERRORS as e:
+                if attempt == EMBED_MAX_RETRIES:
+                    raise
+                delay = retry_delay(e, attempt)
+                print(f"  ⏳ {type(e).__name__}, retrying batch in {delay:.1f}s")
+        # Sleep outside the semaphore so other batches can use the slot
+        await asyncio.sleep(delay)
+
+
+def checkpoint_path(checkpoint_dir: str, texts: List[str], signature: str) -> str:
+    """Checkpoint file of a batch - keyed by embedding signature and content, so edits never reuse stale vectors"""
+    digest = hashlib.sha256(signature.encode())
+    for text in texts:
+        digest.update(b"\0" + text.encode())
+    return os.path.join(checkpoint_dir, f"{digest.hexdigest()[:32]}.npy")
+
+
+async def aembed_batches(batches: AsyncIterator[List[str]],
+                         checkpoint_dir: Optional[str] = EMBED_CHECKPOINT_DIR) -> np.ndarray:
+    """
+    Embed batches as they are produced, in order; finished batches are saved so
+    an interrupted run resumes. At most EMBED_QUEUE batches wait for a request
+    slot: past that the producer is paused until one is sent.
+    """
+    provider = create_provider()
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+    queue = asyncio.Semaphore(EMBED_CONCURRENCY + EMBED_QUEUE)
+    results: List[Optional[np.ndarray]] = []
+    failures: List[BaseException] = []
+    progress = {"done": 0, "chunks": 0, "resumed": 0}
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    async def run(i: int, texts: List[str]) -> None:
+        try:
+            path = checkpoint_path(checkpoint_dir, texts, provider.signature) if checkpoint_dir else None
+            if path and os.path.exists(path):
+                results[i] = np.load(path)
+                progress["resumed"] += 1
+            else:
+                results[i] = await embed_batch(provider, texts, semaphore)
+                if path:
+                    with open(path + ".tmp", "wb") as f:
+                        np.save(f, results[i])
+                    os.replace(path + ".tmp", path)
+        except Exception as e:
+            failures.append(e)
+            raise
+        finally:
+            queue.release()
+
+        progress["done"] += 1
+        progress["chunks"] += len(texts)
+        print(f"  ✓ Batch {progress['done']} ({progress['chunks']} chunks embedded)")
+
+    start_time = time.perf_counter()
+    tasks = []
+    try:
+        async for texts in batches:
+            await queue.acquire()
+            if failures:
+                raise failures[0]  # stop producing: the batch failed after its retries
+            results.append(None)
+            tasks.append(asyncio.create_task(run(len(tasks), texts)))
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await provider.aclose()
+    if tasks:
+        print(f"✓ Embedded {progress['chunks']} chunks in {len(tasks)} batches "
+              f"({progress['resumed']} resumed from checkpoint) in {time.perf_counter() - start_time:.1f}s")
+    return np.concatenate(results) if results else np.zeros((0, 0), dtype=np.float32)
+
+
+async def aget_embeddings(texts: List[str], checkpoint_dir: Optional[str] = EMBED_CHECKPOINT_DIR) -> np.ndarray:
+    """Embed all texts in batches; finished batches are saved so an interrupted run resumes"""
+    async def batches():
+        planner = plan_batches(texts)
+        # Token counting runs in a thread (tiktoken releases the GIL) while batches are in flight
+        while (batch := await asyncio.to_thread(next, planner, None)) is not None:
+            yield texts[batch[0]:batch[1]]
+
+    return await aembed_batches(batches(), checkpoint_dir)
+
+
+def get_embeddings(texts: list, checkpoint_dir: Optional[str] = EMBED_CHECKPOINT_DIR) -> np.ndarray:
+    """Get embeddings from the embedding provider (batched, parallel, resumable)"""
+    return asyncio.run(aget_embeddings(texts, checkpoint_dir))
+
+def file_sha256(path: str) -> str:
+    """Content hash of a source document"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+async def aextract_documents(paths: List[str]) -> AsyncIterator[Tuple[str, List[Dict]]]:
+    """
+    (path, chunks) of each document in order (see chunker.py). INGEST_WORKERS
+    processes extract and chunk in parallel, up to 2 documents per worker ahead
+    of the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(INGEST_WORKERS) if INGEST_WORKERS > 0 else None  # None: a thread
+    remaining = iter(paths)
+    pending = deque()
 
-        for i, chunk in enumerate(chunks):
-            all_chunks.append(chunk)
-            metadata.append({
-                "source": filename,
-                "chunk_id": i,
-                "text": chunk
-            })
+    def submit(path: str) -> None:
+        pending.append((path, loop.run_in_executor(pool, chunk_document, path, CHUNK_SIZE, CHUNK_OVERLAP)))
 
-    print(f"✓ Extracted {len(all_chunks)} chunks")
+    try:
+        for path in itertools.islice(remaining, 2 * max(1, INGEST_WORKERS)):
+            submit(path)
+        while pending:
+            path, future = pending.popleft()
+            chunks = await future
+            next_path = next(remaining, None)
+            if next_path is not None:
+                submit(next_path)
+            yield path, chunks
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if pool:
+            pool.shutdown(cancel_futures=True)
 
-    # Get embeddings
-    print("🔢 Generating embeddings...")
-    embeddings = get_embeddings(all_chunks)
-    embeddings_array = np.array(embeddings, dtype=np.float32)
 
-    # Create FAISS index
-    print("🗂️  Building FAISS index...")
-    dimension = len(embeddings[0])
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings_array)
+def index_settings() -> Dict:
+    """Settings that make previously computed chunks/vectors incompatible when changed"""
+    signature = embedding_signature(EMBEDDING_PROVIDER, EMBEDDING_MODEL, EMBEDDING_MODEL_PATH)
+    return {"embedding_model": signature, "chunker": CHUNKER_VERSION,
+            "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
 
-    # Save index and metadata
+
+def index_build_settings() -> Dict:
+    """Settings that only require rebuilding the index (stored vectors can be reused)"""
+    return {"type": INDEX_TYPE, "nlist": IVF_NLIST, "pq_m": PQ_M, "hnsw_m": HNSW_M}
+
+
+def load_previous_build(output_dir: str) -> Optional[Tuple[faiss.Index, Dict[int, Dict], Dict]]:
+    """Index, metadata and manifest of the last build, if it can be updated incrementally"""
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        print("  No manifest from a previous build - full rebuild")
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("settings") != index_settings():
+        print("  Embedding provider/model or chunking changed - full rebuild")
+        return None
+
+    index = faiss.read_index(os.path.join(output_dir, "index.faiss"))
+    store_path = os.path.join(output_dir, "chunks.bin")
+    legacy_path = os.path.join(output_dir, "metadata.pkl")
+    if not os.path.exists(store_path) and os.path.exists(legacy_path):
+        print("  Converting metadata.pkl to chunks.bin")
+        convert_pickle(legacy_path, store_path)
+    metadata = dict(ChunkStore(store_path))
+    return index, metadata, manifest
+
+
+def save_build(output_dir: str, index: faiss.Index, metadata: Dict[int, Dict], manifest: Dict) -> None:
+    """Write index, metadata, BM25 index and manifest; each file is replaced atomically"""
     os.makedirs(output_dir, exist_ok=True)
-    faiss.write_index(index, os.path.join(output_dir, "index.faiss"))
 
-    with open(os.path.join(output_dir, "metadata.pkl"), "wb") as f:
-        pickle.dump(metadata, f)
+    def replace(name: str, write) -> None:
+        path = os.path.join(output_dir, name)
+        write(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def write_manifest(path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=1)
+
+    replace("index.faiss", lambda path: faiss.write_index(index, path))
+    replace("chunks.bin", lambda path: write_chunk_store(path, metadata))
+    replace("lexical.bin", lambda path: write_lexical_index(path, metadata))
+    replace("manifest.json", write_manifest)
+
+    # Superseded by chunks.bin
+    legacy_path = os.path.join(output_dir, "metadata.pkl")
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+def build_index(pdf_dir: str = "pdfs", output_dir: str = "data", full: bool = False) -> None:
+    """
+    Build or update the FAISS index from PDFs and text files.
+    Incremental by default: only new or changed chunks are embedded and the
+    vectors of removed chunks/files are deleted from the ID-mapped index.
+    """
+    start_time = time.perf_counter()
+
+    print("📄 Scanning documents...")
+    previous = None if full else load_previous_build(output_dir)
+    if previous:
+        index, metadata, manifest = previous
+    else:
+        index, metadata = None, {}
+        manifest = {"settings": index_settings(), "next_id": 0, "files": {}}
+
+    old_files = manifest["files"]
+    files = {}
+    new_texts, new_ids, removed_ids = [], [], []
+    report = {"added": [], "changed": [], "removed": [], "unchanged": 0, "reused_chunks": 0}
+
+    # Find new and edited PDFs and text files
+    changed: Dict[str, Tuple[str, str, Optional[Dict]]] = {}  # path -> (filename, sha256, old entry)
+    for filename in sorted(os.listdir(pdf_dir)):
+        if not filename.endswith(('.pdf', '.txt')):
+            continue
+        path = os.path.join(pdf_dir, filename)
+        digest = file_sha256(path)
+
+        old = old_files.get(filename)
+        if old and old["sha256"] == digest:
+            files[filename] = old
+            report["unchanged"] += 1
+            continue
+        report["changed" if old else "added"].append(filename)
+        changed[path] = (filename, digest, old)
+
+    async def new_batches():
+        """Embedding batches of the chunks that need a vector, as documents come out of extraction"""
+        batch, batch_tokens = [], 0
+        async with contextlib.aclosing(aextract_documents(list(changed))) as documents:
+            async for path, chunks in documents:
+                filename, digest, old = changed[path]
+                print(f"  Processing {filename}...")
+
+                # Unchanged chunks of an edited file keep their vector (and ID)
+                reusable: Dict[str, List[int]] = {}
+                for entry in (old["chunks"] if old else []):
+                    reusable.setdefault(entry["sha256"], []).append(entry["id"])
+
+                entries = []
+                for i, chunk in enumerate(chunks):
+                    chunk_hash = chunk_sha256(chunk["text"])
+                    if reusable.get(chunk_hash):
+                        vector_id = reusable[chunk_hash].pop()
+                        report["reused_chunks"] += 1
+                    else:
+                        vector_id = manifest["next_id"]
+                        manifest["next_id"] += 1
+                        new_texts.append(chunk["text"])
+                        new_ids.append(vector_id)
+                        # Same limits as plan_batches, on the token counts from the workers
+                        if batch and (batch_tokens + chunk["tokens"] > EMBED_BATCH_TOKENS
+                                      or len(batch) >= EMBED_BATCH_SIZE):
+                            yield batch
+                            batch, batch_tokens = [], 0
+                        batch.append(chunk["text"])
+                        batch_tokens += chunk["tokens"]
+
+                    metadata[vector_id] = {
+                        "source": filename,
+                        "chunk_id": i,
+                        "text": chunk["text"],
+                        "page": chunk["page"],
+                        "section": chunk["section"]
+                    }
+                    entries.append({"id": vector_id, "sha256": chunk_hash})
+
+                removed_ids.extend(vector_id for ids in reusable.values() for vector_id in ids)
+                files[filename] = {"sha256": digest, "chunks": entries}
+        if batch:
+            yield batch
+
+    # Extract, chunk and embed (new and changed chunks only) as one pipeline
+    if changed:
+        print(f"🔢 Chunking {len(changed)} documents ({INGEST_WORKERS or 'no'} worker processes) "
+              f"and embedding new chunks as they arrive...")
+        embeddings_array = asyncio.run(aembed_batches(new_batches(), EMBED_CHECKPOINT_DIR))
+
+    for filename in sorted(old_files.keys() - files.keys()):
+        report["removed"].append(filename)
+        removed_ids.extend(entry["id"] for entry in old_files[filename]["chunks"])
+
+    previous_index_settings = {key: value for key, value in manifest.get("index", {}).items() if key != "built_as"}
+    reindex = previous is not None and previous_index_settings != index_build_settings()
+    if reindex:
+        print(f"  Index settings changed - rebuilding the {INDEX_TYPE} index")
+
+    # Builds from before the BM25 index still need one written
+    lexical_missing = not os.path.exists(os.path.join(output_dir, "lexical.bin"))
+    if previous and not (new_ids or removed_ids or reindex or lexical_missing
+                         or report["added"] or report["changed"] or report["removed"]):
+        print(f"✓ Index up to date ({report['unchanged']} documents unchanged, {index.ntotal} vectors)")
+        return
+
+    if not new_texts and index is None:
+        raise ValueError(f"No .pdf or .txt documents found in {pdf_dir}/")
+
+    # Create or update the FAISS index (IDs = metadata keys)
+    for vector_id in removed_ids:
+        metadata.pop(vector_id, None)
+    dimension = embeddings_array.shape[1] if new_texts else index.d
+    new_vectors = embeddings_array if new_texts else np.zeros((0, dimension), dtype=np.float32)
+
+    # A corpus too small for INDEX_TYPE got a simpler index: retry once it grows
+    fell_back = manifest.get("index", {}).get("built_as", INDEX_TYPE) != INDEX_TYPE
+    if index is None or reindex or (fell_back and new_ids) or (removed_ids and not supports_removal(index)):
+        # (Re)build from scratch: HNSW can't delete, IVF/PQ train on the whole corpus
+        new_id_set = set(new_ids)
+        kept_ids = [vector_id for vector_id in metadata if vector_id not in new_id_set]
+        if kept_ids and is_lossless(index):
+            kept_vectors = reconstruct_vectors(index, kept_ids)
+        elif kept_ids:
+            print(f"🔢 Re-embedding {len(kept_ids)} chunks (the old index only kept PQ codes)...")
+            kept_vectors = get_embeddings([metadata[vector_id]["text"] for vector_id in kept_ids], EMBED_CHECKPOINT_DIR)
+        else:
+            kept_vectors = np.zeros((0, dimension), dtype=np.float32)
+
+        all_ids = kept_ids + new_ids
+        print(f"🗂️  Building {INDEX_TYPE} FAISS index for {len(all_ids)} vectors...")
+        index, built_as = create_index(INDEX_TYPE, dimension, len(all_ids), IVF_NLIST, PQ_M,
+                                       HNSW_M, HNSW_EF_CONSTRUCTION)
+        train_and_add(index, np.concatenate([kept_vectors, new_vectors]), all_ids)
+        manifest["index"] = {**index_build_settings(), "built_as": built_as}
+    else:
+        print("🗂️  Updating FAISS index...")
+        if removed_ids:
+            index.remove_ids(np.array(removed_ids, dtype=np.int64))
+        if new_ids:
+            index.add_with_ids(new_vectors, np.array(new_ids, dtype=np.int64))
+
+    manifest["files"] = files
+    # The server checks these against its own provider before serving the index
+    manifest["embedding"] = {"provider": EMBEDDING_PROVIDER, "signature": manifest["settings"]["embedding_model"],
+                             "dimension": index.d}
+    save_build(output_dir, index, metadata, manifest)
+
+    # Index is safely on disk: the embedding checkpoint is no longer needed
+    shutil.rmtree(EMBED_CHECKPOINT_DIR, ignore_errors=True)
 
-    print(f"✓ Index saved to {output_dir}/")
-    print(f"  - Dimension: {dimension}")
+    print(f"✓ Index saved to {output_dir}/ in {time.perf_counter() - start_time:.1f}s")
+    print(f"  - Documents: {len(report['added'])} added, {len(report['changed'])} changed, "
+          f"{len(report['removed'])} removed, {report['unchanged']} unchanged")
+    for label in ("added", "changed", "removed"):
+        for filename in report[label]:
+            print(f"    {label}: {filename}")
+    print(f"  - Chunks: {len(new_ids)} embedded, {report['reused_chunks']} reused, {len(removed_ids)} deleted")
+    print(f"  - Index: {index_kind(index)}, dimension {index.d}")
     print(f"  - Total vectors: {index.ntotal}")
 
 if __name__ == "__main__":
-    build_index()
+    build_index(full="--full" in sys.argv[1:])
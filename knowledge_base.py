@@ -0,0 +1,199 @@
+"""
+Immutable snapshot of the knowledge base (FAISS index + chunk metadata + BM25 index)
+- Loaded off the event loop and swapped in with a single reference assignment,
+  so searches already running keep using the snapshot they started with
+- Version derived from the index file, used to key caches that depend on it
+- Refuses an index whose vectors another embedding provider/model produced
+  (query and chunk vectors must come from the same one to be comparable)
+- Hybrid search fuses the vector ranking with the BM25 ranking (RRF), so exact
+  tokens ("APN", "5G", plan names) still find their chunk when embeddings blur them
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from chunk_store import ChunkStore
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from observability import log
+from vector_index import configure_search, index_kind
+
+FileSignature = Tuple[Tuple[int, int], ...]
+
+# Maps flat/IVF/HNSW vector storage (IO_FLAG_MMAP alone only covers IVF lists)
+MMAP_IFC = hasattr(faiss, "IO_FLAG_MMAP_IFC")
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC if MMAP_IFC else faiss.IO_FLAG_MMAP
+
+
+def file_signature(*paths: str) -> Optional[FileSignature]:
+    """(size, mtime) of each file - changes whenever ingest replaces one; None if any is missing"""
+    try:
+        return tuple((stat.st_size, stat.st_mtime_ns) for stat in map(os.stat, paths))
+    except FileNotFoundError:
+        return None
+
+
+def index_embedding(index_path: str) -> Optional[str]:
+    """Embedding signature recorded in the manifest ingest wrote next to the index (None: no manifest)"""
+    try:
+        with open(os.path.join(os.path.dirname(index_path), "manifest.json")) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    # Builds from before manifest["embedding"] were all OpenAI: settings has the model name
+    return manifest.get("embedding", {}).get("signature") or manifest.get("settings", {}).get("embedding_model")
+
+
+class KnowledgeBase:
+    """One loaded version of the index and its metadata (never mutated after load)"""
+
+    def __init__(self, index: faiss.Index, metadata: Mapping[int, Dict], version: str,
+                 index_path: str = "", metadata_path: str = "",
+                 signature: Optional[FileSignature] = None, lexical: Optional[LexicalIndex] = None,
+                 embedding: str = ""):
+        self.index = index
+        self.metadata = metadata
+        self.version = version
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.signature = signature
+        self.lexical = lexical
+        self.embedding = embedding
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, index_path: str = "data/index.faiss", metadata_path: str = "data/chunks.bin",
+             nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+             mmap: bool = False, lexical_path: Optional[str] = None,
+             embedding: Optional[str] = None, dimension: Optional[int] = None) -> "KnowledgeBase":
+        """
+        Read index + metadata; refuses a pair that doesn't belong together (e.g. mid-ingest).
+        With mmap the vectors stay in the file's page cache, shared by every worker
+        process, instead of being copied into each one.
+        The BM25 index (default: lexical.bin next to the metadata) is optional;
+        without it searches are vector-only.
+        `embedding`/`dimension`: signature and vector size of the provider that will
+        embed queries; an index built with another one is refused.
+        """
+        if lexical_path is None:
+            lexical_path = os.path.join(os.path.dirname(metadata_path), "lexical.bin")
+        if not os.path.exists(lexical_path):
+            lexical_path = ""
+        signature = file_signature(*filter(None, (index_path, metadata_path, lexical_path)))
+        if mmap and not MMAP_IFC:
+            log.warning(f"⚠️  faiss {faiss.__version__} has no IO_FLAG_MMAP_IFC: only IVF lists are mapped, "
+                        f"flat/HNSW vectors are copied into every worker (upgrade faiss-cpu)")
+        index = faiss.read_index(index_path, MMAP_FLAGS if mmap else 0)
+        built_with = index_embedding(index_path)
+        if embedding and built_with and built_with != embedding:
+            raise ValueError(f"{index_path} was built with {built_with} embeddings, queries use {embedding} "
+                             f"(re-run ingest_pdfs.py with the same EMBEDDING_PROVIDER)")
+        if dimension and index.d != dimension:
+            raise ValueError(f"{index_path} has {index.d}-dimensional vectors, "
+                             f"the {embedding or 'query'} embeddings have {dimension}")
+        configure_search(index, nprobe, ef_search)
+
+        # Vector ID -> chunk, memory-mapped: chunk text is only read for search hits
+        metadata = ChunkStore(metadata_path)
+
+        if index.ntotal != len(metadata):
+            raise ValueError(f"{index_path} has {index.ntotal} vectors but "
+                             f"{metadata_path} has {len(metadata)} chunks")
+
+        lexical = LexicalIndex(lexical_path) if lexical_path else None
+        if lexical is not None and not np.array_equal(lexical.ids, metadata.ids):
+            raise ValueError(f"{lexical_path} does not index the chunks in {metadata_path}")
+
+        index_stat = os.stat(index_path)
+        version = hashlib.md5(
+            f"{index_stat.st_size}:{index_stat.st_mtime_ns}:{index.ntotal}".encode()
+        ).hexdigest()[:12]
+        return cls(index, metadata, version, index_path, metadata_path, signature, lexical, built_with or "")
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def paths(self) -> Tuple[str, ...]:
+        """Files this snapshot was loaded from (the watcher reloads when they change)"""
+        lexical_path = (self.lexical.path,) if self.lexical is not None else ()
+        return (self.index_path, self.metadata_path) + lexical_path
+
+    def _vector_hits(self, query_embedding: List[float], k: int) -> List[Tuple[int, float]]:
+        return self._vector_hits_many([query_embedding], k)[0]
+
+    def _vector_hits_many(self, query_embeddings: List[List[float]], k: int) -> List[List[Tuple[int, float]]]:
+        """One index.search for all queries (FAISS switches to BLAS from 20 rows)"""
+        query_vector_array = np.array(query_embeddings, dtype='float32')
+        distances, indices = self.index.search(query_vector_array, k)
+        return [[(int(idx), float(dist)) for idx, dist in zip(row_ids, row_distances) if idx != -1]
+                for row_ids, row_distances in zip(indices, distances)]
+
+    def chunks(self, hits: List[Tuple[int, Optional[float]]]) -> List[Dict]:
+        """Chunk dicts for (vector ID, distance) hits, in order"""
+        results = []
+        for idx, dist in hits:
+            chunk_data = self.metadata.get(idx)
+            if chunk_data is not None:
+                results.append({
+                    "text": chunk_data["text"],
+                    "source": chunk_data["source"],
+                    "chunk_id": chunk_data["chunk_id"],
+                    "page": chunk_data.get("page", 0),
+                    "section": chunk_data.get("section", ""),
+                    "distance": dist
+                })
+        return results
+
+    def search(self, query_embedding: List[float], k: int) -> List[Dict]:
+        """Top-k chunks for an embedding, closest first"""
+        return self.chunks(self._vector_hits(query_embedding, k))
+
+    def lexical_search(self, query: str, k: int) -> Tuple[List[Tuple[int, float]], float]:
+        """BM25 (vector ID, score) hits and coverage of the best one (see LexicalIndex.search)"""
+        if self.lexical is None:
+            return [], 0.0
+        return self.lexical.search(query, k)
+
+    def hybrid_search(self, query_embedding: List[float], k: int,
+                      lexical_hits: List[Tuple[int, float]], candidates: int = 20) -> List[Dict]:
+        """
+        Top-k chunks by reciprocal rank fusion of the vector top-`candidates` and
+        the BM25 hits. Chunks only BM25 found have distance None.
+        """
+        return self.hybrid_search_many([query_embedding], k, [lexical_hits], candidates)[0]
+
+    def hybrid_search_many(self, query_embeddings: List[List[float]], k: int,
+                           lexical_hits: List[List[Tuple[int, float]]], candidates: int = 20) -> List[List[Dict]]:
+        """hybrid_search for a batch of queries with a single vector search"""
+        vector_hits = self._vector_hits_many(query_embeddings, max(k, candidates))
+        return [self._fuse(hits, k, lexical) for hits, lexical in zip(vector_hits, lexical_hits)]
+
+    def _fuse(self, vector_hits: List[Tuple[int, float]], k: int,
+              lexical_hits: List[Tuple[int, float]]) -> List[Dict]:
+        if not lexical_hits:
+            return self.chunks(vector_hits[:k])
+
+        distances = dict(vector_hits)
+        fused = reciprocal_rank_fusion([idx for idx, _ in vector_hits], [idx for idx, _ in lexical_hits])
+        return self.chunks([(idx, distances.get(idx)) for idx, _ in fused[:k]])
+
+    def info(self) -> Dict:
+        """What is being served right now"""
+        return {
+            "version": self.version,
+            "index_type": index_kind(self.index),
+            "vectors": self.ntotal,
+            "chunks": len(self.metadata),
+            "dimension": self.index.d,
+            "embedding": self.embedding,
+            "lexical_terms": self.lexical.terms if self.lexical is not None else 0,
+            "index_path": self.index_path,
+            "loaded_at": self.loaded_at,
+        }
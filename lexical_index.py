@@ -0,0 +1,204 @@
+"""
+BM25 inverted index over the chunks, built by ingest next to the FAISS index
+- Catches what embeddings miss in short telecom queries: exact tokens like
+  "APN", "5G", "M-Pesa", plan names and prices
+- One memory-mapped file like chunks.bin: chunk IDs and lengths, the sorted
+  vocabulary (binary-searched in place) and per-term postings; nothing is
+  parsed at startup and workers share the pages
+- reciprocal_rank_fusion merges its ranking with the vector ranking; queries
+  BM25 settles on its own (is_decisive) can skip the embedding request
+"""
+
+import bisect
+import json
+import math
+import mmap
+import re
+import struct
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"VRBM25_1"
+ALIGN = 8
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # rank constant from the RRF paper; damps the weight of top ranks
+MIN_IDF = 0.1  # terms in more than ~90% of chunks barely score: skip their long postings
+
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por para com sem e ou que se
+ao aos à às é ser são foi está estão tem têm há meu minha seu sua eu você voce me te lhe
+qual quais quanto quanta como onde quando porque mais muito pode posso quero gostaria
+the an of to in on for with and or is are was be it this that what which how much
+does do can could would my your i you me we there
+""".split())
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[-.,/']\w+)*")
+
+
+def fold(text: str) -> str:
+    """Lowercase without accents ("Serviço" -> "servico")"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Search terms of a text. Compound tokens are kept whole and split, so
+    "M-Pesa" matches "mpesa", "m-pesa" and "pesa", and "9,99" stays one price.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(fold(text)):
+        parts = re.split(r"[-.,/']", token)
+        if len(parts) > 1:
+            terms.append("".join(parts))
+            terms.extend(part for part in parts if part not in STOPWORDS and (len(part) > 1 or part.isdigit()))
+        elif token not in STOPWORDS:
+            terms.append(token)
+    return terms
+
+
+def write_lexical_index(path: str, metadata: Mapping[int, Dict]) -> None:
+    """Build the BM25 index over {vector ID: chunk} and write it to `path`"""
+    ids = np.array(sorted(metadata), dtype="<i8")
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    lengths = np.zeros(len(ids), dtype="<i4")
+    for row, vector_id in enumerate(ids):
+        terms = tokenize(metadata[int(vector_id)]["text"])
+        lengths[row] = len(terms)
+        for term, count in Counter(terms).items():
+            postings.setdefault(term, []).append((row, count))
+
+    vocabulary = sorted(postings)
+    encoded = [term.encode("utf-8") for term in vocabulary]
+    term_offsets = np.zeros(len(vocabulary) + 1, dtype="<i8")
+    np.cumsum([len(term) for term in encoded], out=term_offsets[1:])
+    term_starts = np.zeros(len(vocabulary) + 1, dtype="<i8")
+    np.cumsum([len(postings[term]) for term in vocabulary], out=term_starts[1:])
+    rows = np.array([row for term in vocabulary for row, _ in postings[term]], dtype="<i4")
+    counts = np.array([count for term in vocabulary for _, count in postings[term]], dtype="<i4")
+
+    header = json.dumps({"count": len(ids), "terms": len(vocabulary), "postings": len(rows)}).encode()
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGN)
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for array in (ids, lengths, term_offsets, term_starts, rows, counts):
+            data = array.tobytes()
+            f.write(data + b"\0" * (-len(data) % ALIGN))
+        f.write(b"".join(encoded))
+
+
+class LexicalIndex:
+    """Read-only BM25 index over a mapped file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a lexical index")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header_length, = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._map[start:start + header_length])
+        start += header_length
+
+        count, terms, postings = header["count"], header["terms"], header["postings"]
+        columns = []
+        for dtype, length in (("<i8", count), ("<i4", count), ("<i8", terms + 1), ("<i8", terms + 1),
+                              ("<i4", postings), ("<i4", postings)):
+            columns.append(np.frombuffer(self._map, dtype, length, start))
+            start += -(-columns[-1].nbytes // ALIGN) * ALIGN
+        self.ids, self._lengths, self._term_offsets, self._term_starts, self._rows, self._counts = columns
+        self._terms_start = start
+        self._average_length = float(self._lengths.mean()) if count and self._lengths.any() else 1.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def terms(self) -> int:
+        """Vocabulary size"""
+        return len(self._term_offsets) - 1
+
+    def _term(self, position: int) -> str:
+        start = self._terms_start + int(self._term_offsets[position])
+        return self._map[start:self._terms_start + int(self._term_offsets[position + 1])].decode("utf-8")
+
+    def _postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(rows, term frequencies) of the chunks containing `term`"""
+        position = bisect.bisect_left(_Vocabulary(self), term)
+        if position == self.terms or self._term(position) != term:
+            return None
+        start, end = int(self._term_starts[position]), int(self._term_starts[position + 1])
+        return self._rows[start:end], self._counts[start:end]
+
+    def _idf(self, document_frequency: int) -> float:
+        return math.log(1 + (len(self.ids) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query: str, k: int) -> Tuple[List[Tuple[int, float]], float]:
+        """
+        Top-k (vector ID, BM25 score), best first, and the coverage of the best
+        hit: its score over that of an average-length chunk containing every
+        query term once (capped at 1.0; unknown query terms count against it).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not len(self.ids):
+            return [], 0.0
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        full_match = 0.0
+        for term in terms:
+            postings = self._postings(term)
+            if postings is None:
+                full_match += self._idf(0)
+                continue
+            rows, tf = postings
+            idf_weight = self._idf(len(rows))
+            full_match += idf_weight  # tf=1 at average length scores exactly idf
+            if idf_weight < MIN_IDF:
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[rows] / self._average_length)
+            scores[rows] += idf_weight * tf * (BM25_K1 + 1) / (tf + norm)
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return [], 0.0
+        matched_scores = scores[matched]
+        if len(matched) > k:
+            best = np.argpartition(-matched_scores, k)[:k]
+            matched, matched_scores = matched[best], matched_scores[best]
+        top = matched[np.argsort(-matched_scores, kind="stable")]
+        hits = [(int(self.ids[row]), float(scores[row])) for row in top]
+        return hits, min(1.0, hits[0][1] / full_match)
+
+
+class _Vocabulary:
+    """Sorted terms of a LexicalIndex as a sequence, for bisect"""
+
+    def __init__(self, index: LexicalIndex):
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.terms
+
+    def __getitem__(self, position: int) -> str:
+        return self._index._term(position)
+
+
+def reciprocal_rank_fusion(*rankings: Iterable[int], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Merge rankings of IDs: each contributes 1/(k + rank); best fused score first"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, vector_id in enumerate(ranking, 1):
+            fused[vector_id] = fused.get(vector_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def is_decisive(hits: List[Tuple[int, float]], coverage: float, min_coverage: float, margin: float) -> bool:
+    """Whether BM25 alone settles a query: enough coverage and a top hit `margin` times the next"""
+    return (bool(hits) and 0 < min_coverage <= coverage
+            and (len(hits) == 1 or hits[0][1] >= margin * hits[1][1]))
@@ -0,0 +1,209 @@
+"""
+Observability for the voice pipeline: leveled logging, per-turn spans, /metrics
+- log: the "voicerag" logger, plain messages on stdout like the old prints;
+  LOG_LEVEL=warning keeps only problems, off silences it
+- span("embed"): times a stage into a latency histogram and into the trace of
+  the current turn. The trace is a context variable, so the search and TTS
+  tasks a turn spawns report into it too
+- record_prompt_usage(): prompt tokens of an LLM call and how many the provider
+  served from its prompt cache, per turn and in total
+- metrics.render(): Prometheus text format (stage histograms, turn counters,
+  active sessions, prompt cache tokens, cache hit ratios)
+"""
+
+import bisect
+import contextvars
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Mapping, Optional, Sequence
+
+# Seconds; voice stages range from a ~1 ms cache lookup to multi-second LLM answers
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stages in turn order; "*_first_*" stages measure from the request to its first token/byte
+STAGES = ("transcribe", "cache_lookup", "embed", "search", "context_build", "llm_first_token",
+          "llm_complete", "tts_first_byte", "tts_complete", "turn")
+
+LOG_LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING,
+              "error": logging.ERROR, "off": logging.CRITICAL + 1}
+
+log = logging.getLogger("voicerag")
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to the current sys.stdout, like print (contextlib.redirect_stdout still works)"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def configure_logging(level: str) -> None:
+    """Set the log level: debug | info | warning | error | off"""
+    if level.lower() not in LOG_LEVELS:
+        raise ValueError(f"LOG_LEVEL must be one of {', '.join(LOG_LEVELS)}")
+    if not log.handlers:
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(LOG_LEVELS[level.lower()])
+
+
+class Histogram:
+    """Latency histogram with cumulative buckets (Prometheus semantics: value <= le)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> Iterator[tuple]:
+        """(le label, observations <= le) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield ("+Inf" if bound == float("inf") else repr(bound)), total
+
+
+class Metrics:
+    """Process-wide stage histograms, turn counters and the active session gauge"""
+
+    def __init__(self):
+        self.stages: Dict[str, Histogram] = {}
+        self.turns: Dict[str, int] = {}
+        self.active_sessions = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram()
+            self.stages[stage].observe(seconds)
+
+    def count_turn(self, outcome: str) -> None:
+        with self._lock:
+            self.turns[outcome] = self.turns.get(outcome, 0) + 1
+
+    def count_prompt(self, tokens: int, cached: int) -> None:
+        with self._lock:
+            self.prompt_tokens += tokens
+            self.cached_prompt_tokens += cached
+
+    def render(self, cache_stats: Mapping[str, Mapping[str, float]] = {}) -> str:
+        """Prometheus text exposition format"""
+        lines = ["# HELP voicerag_stage_seconds Latency of each stage of a voice turn",
+                 "# TYPE voicerag_stage_seconds histogram"]
+        with self._lock:
+            ordered = sorted(self.stages, key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s))
+            for stage in ordered:
+                histogram = self.stages[stage]
+                for le, count in histogram.cumulative():
+                    lines.append(f'voicerag_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {count}')
+                lines.append(f'voicerag_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'voicerag_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines += ["# HELP voicerag_turns_total Voice turns by outcome", "# TYPE voicerag_turns_total counter"]
+            lines += [f'voicerag_turns_total{{outcome="{outcome}"}} {count}'
+                      for outcome, count in sorted(self.turns.items())]
+            lines += ["# HELP voicerag_active_sessions Open WebSocket sessions",
+                      "# TYPE voicerag_active_sessions gauge", f"voicerag_active_sessions {self.active_sessions}"]
+            lines += ["# HELP voicerag_llm_prompt_tokens_total Prompt tokens sent to the LLM",
+                      "# TYPE voicerag_llm_prompt_tokens_total counter",
+                      f"voicerag_llm_prompt_tokens_total {self.prompt_tokens}",
+                      "# HELP voicerag_llm_cached_prompt_tokens_total Prompt tokens served from the provider's prompt cache",
+                      "# TYPE voicerag_llm_cached_prompt_tokens_total counter",
+                      f"voicerag_llm_cached_prompt_tokens_total {self.cached_prompt_tokens}"]
+
+        for name, kind, key, help_text in (
+                ("voicerag_cache_hits_total", "counter", "hits", "Cache lookups that hit"),
+                ("voicerag_cache_misses_total", "counter", "misses", "Cache lookups that missed"),
+                ("voicerag_cache_hit_ratio", "gauge", "hit_ratio", "Hits over lookups since start"),
+                ("voicerag_cache_entries", "gauge", "entries", "Entries held in this process")):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{cache="{cache}"}} {stats.get(key, 0):g}' for cache, stats in cache_stats.items()]
+        return "\n".join(lines) + "\n"
+
+
+class TurnTrace:
+    """Stage durations of one voice turn: repeated stages add up, "*_first_*" ones keep the first"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def add(self, stage: str, seconds: float) -> None:
+        if "_first_" in stage:
+            self.stages.setdefault(stage, seconds)
+        else:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def summary(self) -> str:
+        """"transcribe 412 ms | search 3 ms | ... | prompt 1843 tokens (83% cached)" in turn order"""
+        ordered = sorted(self.stages, key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s))
+        parts = [f"{stage} {self.stages[stage] * 1000:.0f} ms" for stage in ordered]
+        if self.prompt_tokens:
+            parts.append(f"prompt {self.prompt_tokens} tokens ({self.cached_tokens / self.prompt_tokens:.0%} cached)")
+        return " | ".join(parts)
+
+
+metrics = Metrics()
+_current_turn: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("voicerag_turn", default=None)
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add a stage duration to its histogram and to the current turn's trace"""
+    metrics.observe(stage, seconds)
+    trace = _current_turn.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def record_prompt_usage(usage: Optional[Mapping]) -> None:
+    """Count an LLM call's prompt tokens from LangChain usage_metadata (chunks without usage are skipped)"""
+    if not usage or not usage.get("input_tokens"):
+        return
+    tokens = usage["input_tokens"]
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    metrics.count_prompt(tokens, cached)
+    trace = _current_turn.get()
+    if trace is not None:
+        trace.prompt_tokens += tokens
+        trace.cached_tokens += cached
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the block as `stage` (not recorded when it raises)"""
+    start = time.perf_counter()
+    yield
+    record(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def turn() -> Iterator[TurnTrace]:
+    """Trace of one voice turn; its total lands in the "turn" histogram"""
+    trace = TurnTrace()
+    token = _current_turn.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_turn.reset(token)
+    metrics.observe("turn", time.perf_counter() - trace.started)
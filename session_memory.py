@@ -0,0 +1,128 @@
+"""
+Conversation memory of a voice session
+- SessionMemory.messages: the history turns append to ({"role", "content"} dicts)
+- fit_history(): newest messages within a token budget, for the prompt (hot path, no LLM)
+- compact(): once the verbatim turns outgrow the budget, the oldest are folded into a
+  rolling summary (a leading {"role": "summary"} message). Runs in the background
+  after an answer has been sent, never while the caller waits
+- SessionStore: sessions whose socket dropped, kept for a while so the caller can resume
+"""
+
+import asyncio
+import secrets
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from caches import BoundedCache
+from chunker import count_tokens
+from observability import log
+
+SUMMARY_ROLE = "summary"
+
+# (previous summary, messages to fold in) -> new summary
+Summarizer = Callable[[str, List[Dict]], Awaitable[str]]
+
+
+def message_tokens(message: Dict) -> int:
+    return count_tokens(message["content"]) + 4  # role and separators, as the chat format counts them
+
+
+def fit_history(messages: List[Dict], max_tokens: int) -> List[Dict]:
+    """The summary (if any) plus the newest messages that fit in max_tokens"""
+    if messages and messages[0]["role"] == SUMMARY_ROLE:
+        head, messages = messages[:1], messages[1:]
+    else:
+        head = []
+    budget = max_tokens - sum(message_tokens(m) for m in head)
+
+    start = len(messages)
+    while start > 0 and message_tokens(messages[start - 1]) <= budget:
+        budget -= message_tokens(messages[start - 1])
+        start -= 1
+    # Never open with the answer to a question that was cut off
+    while start < len(messages) and messages[start]["role"] != "user":
+        start += 1
+    return head + messages[start:]
+
+
+class SessionMemory:
+    """History of one caller: recent turns verbatim within max_tokens, older ones summarized"""
+
+    def __init__(self, max_tokens: int, summarize: Summarizer):
+        self.messages: List[Dict] = []
+        self.max_tokens = max_tokens
+        self._summarize = summarize
+        self._compaction: Optional[asyncio.Task] = None
+
+    @property
+    def summary(self) -> str:
+        return self.messages[0]["content"] if self.messages and self.messages[0]["role"] == SUMMARY_ROLE else ""
+
+    def tokens(self) -> int:
+        return sum(message_tokens(m) for m in self.messages)
+
+    def compact_soon(self) -> None:
+        """Start a background compaction if the history outgrew the budget (one at a time)"""
+        if self.tokens() > self.max_tokens and (self._compaction is None or self._compaction.done()):
+            self._compaction = asyncio.create_task(self.compact())
+            self._compaction.add_done_callback(self._compacted)
+
+    def _compacted(self, task: asyncio.Task) -> None:
+        """A failed summary leaves the history as it was (the next turn retries)"""
+        if self._compaction is task:
+            self._compaction = None
+        if not task.cancelled() and task.exception() is not None:
+            log.warning(f"⚠️  History summary failed: {task.exception()!r}")
+
+    async def compact(self) -> None:
+        """Fold the oldest turns into the summary, keeping about half the budget verbatim"""
+        start = 1 if self.summary else 0
+        keep, cut = 0, len(self.messages)
+        while cut > start + 1 and keep + message_tokens(self.messages[cut - 1]) <= self.max_tokens // 2:
+            keep += message_tokens(self.messages[cut - 1])
+            cut -= 1
+        while cut < len(self.messages) and self.messages[cut]["role"] != "user":
+            cut += 1  # fold whole exchanges: the kept part starts with a question
+        # The latest exchange always stays verbatim, however long it is
+        latest = max((i for i in range(start, len(self.messages)) if self.messages[i]["role"] == "user"),
+                     default=start)
+        cut = min(cut, latest)
+        folded = self.messages[start:cut]
+        if not folded:
+            return
+
+        summary = await self._summarize(self.summary, folded)
+
+        # Turns kept appending (or a barge-in trimmed the last answer) meanwhile; only the
+        # messages we folded are replaced, and only if they are still the oldest ones
+        current = self.messages[start:cut]
+        if len(current) != len(folded) or any(a is not b for a, b in zip(current, folded)):
+            return
+        self.messages[0:cut] = [{"role": SUMMARY_ROLE, "content": summary}]
+
+
+class SessionStore:
+    """
+    Sessions whose socket went away, by id: a reconnect with the id resumes the
+    conversation. Bounded (least recently parked dropped first) with idle expiry
+    """
+
+    def __init__(self, max_sessions: int, idle_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._parked = BoundedCache(max_sessions, ttl=idle_seconds, sizeof=lambda memory: 0, clock=clock)
+
+    def __len__(self) -> int:
+        return len(self._parked)
+
+    def open(self, session_id: Optional[str], create: Callable[[], SessionMemory]) -> Tuple[str, SessionMemory, bool]:
+        """(id, memory, resumed): the parked session with that id, or a new one"""
+        if session_id:
+            memory = self._parked.get(session_id)
+            if memory is not None:
+                self._parked.pop(session_id)  # owned by this socket until it parks it again
+                return session_id, memory, True
+        return secrets.token_urlsafe(16), create(), False
+
+    def park(self, session_id: str, memory: SessionMemory) -> None:
+        """The socket closed: keep the session for idle_seconds"""
+        if memory.messages:
+            self._parked.set(session_id, memory)
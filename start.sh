@@ -10,12 +10,10 @@ if [ ! -f .env ]; then
     exit 1
 fi
 
-# Check if FAISS index exists
-if [ ! -f data/index.faiss ]; then
-    echo "📚 Building knowledge base index..."
-    python ingest_pdfs.py
-    echo ""
-fi
+# Build or update the FAISS index (incremental: only new/changed documents are embedded)
+echo "📚 Updating knowledge base index..."
+python ingest_pdfs.py || [ -f data/index.faiss ] || exit 1
+echo ""
 
 # Start the server
 echo "🌐 Starting web server..."
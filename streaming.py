@@ -0,0 +1,98 @@
+"""
+Sentence-level streaming helpers for the voice pipeline
+- Split the LLM token stream into sentences as they arrive
+- Synthesize sentences concurrently while emitting audio in order
+- Closing the audio stream early cancels the LLM stream and pending TTS
+"""
+
+import re
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+# Sentence end: punctuation followed by whitespace (so "1.600" or "5.0" never split),
+# or a line break (bullet lists from the LLM)
+SENTENCE_END = re.compile(r'[.!?…]+["\'”)\]]*\s+|\n+')
+
+
+class SentenceSplitter:
+    """Accumulate streamed text and emit complete sentences"""
+
+    def __init__(self, min_chars: int = 20):
+        # Very short sentences ("Oh!", "Sim.") are merged with the next one
+        # so every TTS request carries enough text to sound natural
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return the sentences completed so far"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start:match.end()].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the stream has ended"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
+
+
+async def split_sentences(tokens: AsyncIterator[str], min_chars: int = 20) -> AsyncIterator[str]:
+    """Turn an async token stream into an async sentence stream"""
+    splitter = SentenceSplitter(min_chars)
+    async for token in tokens:
+        for sentence in splitter.feed(token):
+            yield sentence
+    for sentence in splitter.flush():
+        yield sentence
+
+
+async def synthesize_in_order(sentences: AsyncIterator[str],
+                              synthesize: Callable[[str], Awaitable[bytes]],
+                              max_concurrency: int = 3) -> AsyncIterator[Tuple[int, str, bytes]]:
+    """
+    Start TTS for every sentence as soon as it arrives and yield
+    (seq, sentence, audio) strictly in sentence order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    queue: "asyncio.Queue[Optional[Tuple[str, asyncio.Task]]]" = asyncio.Queue()
+    pending: List[asyncio.Task] = []
+
+    async def run(sentence: str) -> bytes:
+        async with semaphore:
+            return await synthesize(sentence)
+
+    async def produce() -> None:
+        try:
+            async for sentence in sentences:
+                task = asyncio.create_task(run(sentence))
+                pending.append(task)
+                queue.put_nowait((sentence, task))
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        seq = 0
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            sentence, task = item
+            yield seq, sentence, await task
+            seq += 1
+        # Surface errors raised while reading the token stream
+        await producer
+    finally:
+        # Closed early (barge-in): stop the token stream and every TTS request,
+        # and wait until they're gone so their upstream connections are closed
+        producer.cancel()
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(producer, *pending, return_exceptions=True)
@@ -0,0 +1,184 @@
+"""
+Speech-to-text for the voice pipeline
+- Pluggable STT backends (Whisper, or a static stand-in for tests/offline runs)
+- Energy-based voice activity detection for streamed 16-bit PCM
+- Utterance buffer that detects end of speech while the caller is still talking
+"""
+
+import io
+import os
+import wave
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Container signatures -> (file extension, MIME type) for the Whisper upload
+AUDIO_SIGNATURES = [
+    (b"\x1a\x45\xdf\xa3", ("webm", "audio/webm")),
+    (b"OggS", ("ogg", "audio/ogg")),
+    (b"RIFF", ("wav", "audio/wav")),
+    (b"fLaC", ("flac", "audio/flac")),
+    (b"ID3", ("mp3", "audio/mpeg")),
+]
+AUDIO_MIME_EXTENSIONS = {
+    "audio/webm": "webm", "audio/ogg": "ogg", "audio/wav": "wav", "audio/x-wav": "wav",
+    "audio/mp4": "mp4", "audio/mpeg": "mp3", "audio/flac": "flac",
+}
+
+# PCM rates a streaming client may announce (browsers resample the microphone to one of these)
+SAMPLE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+
+def detect_audio_format(audio_bytes: bytes, declared_mime: Optional[str] = None) -> Tuple[str, str]:
+    """Real container of a recording: sniff the header first, fall back to what the client declared"""
+    for signature, audio_format in AUDIO_SIGNATURES:
+        if audio_bytes.startswith(signature):
+            return audio_format
+    if audio_bytes[4:8] == b"ftyp":
+        return "mp4", "audio/mp4"
+
+    mime = (declared_mime or "").split(";")[0].strip().lower()
+    if mime in AUDIO_MIME_EXTENSIONS:
+        return AUDIO_MIME_EXTENSIONS[mime], mime
+    return "webm", "audio/webm"  # what MediaRecorder produces in Chrome/Firefox
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap 16-bit mono PCM in an in-memory WAV container"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class WhisperSTT:
+    """OpenAI Whisper, uploaded straight from memory"""
+
+    def __init__(self, client, model: str = "whisper-1"):
+        self.client = client
+        self.model = model
+
+    async def transcribe(self, audio_bytes: bytes, mime_type: Optional[str] = None) -> str:
+        extension, content_type = detect_audio_format(audio_bytes, mime_type)
+        transcript = await self.client.audio.transcriptions.create(
+            model=self.model,
+            file=(f"speech.{extension}", audio_bytes, content_type)
+        )
+        return transcript.text
+
+
+class StaticSTT:
+    """Local stand-in that always 'hears' the same text (tests, load tests, offline demos)"""
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.calls = 0
+
+    async def transcribe(self, audio_bytes: bytes, mime_type: Optional[str] = None) -> str:
+        self.calls += 1
+        return self.text
+
+
+def create_stt_backend(name: str, client=None, model: str = "whisper-1"):
+    """STT backend selected by STT_BACKEND ("whisper" or "static")"""
+    if name == "static":
+        return StaticSTT(os.getenv("STT_STATIC_TEXT", ""))
+    if name == "whisper":
+        return WhisperSTT(client, model)
+    raise ValueError(f"Unknown STT backend: {name}")
+
+
+class EnergyVAD:
+    """
+    Energy endpointer for 16-bit mono PCM. A frame is speech when its RMS is
+    above both an absolute floor and a multiple of the running noise level.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, min_rms: float = 300.0,
+                 noise_ratio: float = 3.0, min_speech_ms: int = 150, end_silence_ms: int = 700):
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.min_rms = min_rms
+        self.noise_ratio = noise_ratio
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.noise_rms = min_rms / noise_ratio
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.in_speech = False
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(frame.astype(np.float32) ** 2)))
+        speech = rms > max(self.min_rms, self.noise_rms * self.noise_ratio)
+        if not speech:
+            # Track the background level so a noisy line doesn't count as speech
+            self.noise_rms = 0.95 * self.noise_rms + 0.05 * rms
+        return speech
+
+    def process(self, frame: np.ndarray) -> bool:
+        """Feed one frame; returns True once speech has started and then ended"""
+        if self.is_speech(frame):
+            self.speech_frames += 1
+            self.silence_frames = 0
+            if self.speech_frames >= self.min_speech_frames:
+                self.in_speech = True
+        else:
+            self.silence_frames += 1
+            if not self.in_speech:
+                self.speech_frames = 0  # a click or a cough, not the start of speech
+
+        return self.in_speech and self.silence_frames >= self.end_silence_frames
+
+
+def parse_sample_rate(value) -> int:
+    """Sample rate announced by a streaming client; ValueError unless it's one of SAMPLE_RATES"""
+    try:
+        rate = int(value)
+    except (TypeError, ValueError):
+        rate = None
+    if rate not in SAMPLE_RATES or isinstance(value, bool):
+        raise ValueError(f"Unsupported sample_rate {value!r} (expected one of {', '.join(map(str, SAMPLE_RATES))})")
+    return rate
+
+
+class StreamingUtterance:
+    """Buffers streamed PCM frames for one question and detects the end of speech"""
+
+    def __init__(self, sample_rate: int = 16000, max_seconds: float = 15.0, **vad_options):
+        self.sample_rate = sample_rate
+        self.max_bytes = int(max_seconds * sample_rate) * 2
+        self.vad = EnergyVAD(sample_rate, **vad_options)
+        self._pcm = bytearray()
+        self._pending = b""
+        self.ended = False
+
+    @property
+    def heard_speech(self) -> bool:
+        return self.vad.in_speech
+
+    def feed(self, pcm: bytes) -> bool:
+        """Add PCM bytes; returns True when the utterance is complete"""
+        if self.ended:
+            return True
+        self._pcm.extend(pcm)
+
+        data = self._pending + pcm
+        frame_bytes = self.vad.frame_samples * 2
+        usable = len(data) - len(data) % frame_bytes
+        samples = np.frombuffer(data[:usable], dtype="<i2")
+        self._pending = data[usable:]
+
+        for start in range(0, len(samples), self.vad.frame_samples):
+            if self.vad.process(samples[start:start + self.vad.frame_samples]):
+                self.ended = True
+                break
+
+        if len(self._pcm) >= self.max_bytes:
+            self.ended = True
+        return self.ended
+
+    def wav_bytes(self) -> bytes:
+        """The utterance as an in-memory WAV file"""
+        return pcm_to_wav(bytes(self._pcm), self.sample_rate)
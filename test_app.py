@@ -0,0 +1,232 @@
+"""
+Test the HTTP and WebSocket endpoints end to end against the fake OpenAI API
+"""
+import asyncio
+import contextlib
+import importlib
+import os
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+
+from caches import AnswerCache
+from fake_openai import create_app, start_fake_openai
+
+QUESTION = "Quanto custa o plano Premium 5G?"
+REMOTE = ("203.0.113.7", 50000)
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    """The app module, wired to a fake OpenAI API (env restored once it's imported)"""
+    base_url = start_fake_openai(fake=create_app(latency=0.0, token_delay=0.02))
+    env = {
+        "OPENAI_BASE_URL": base_url, "OPENAI_API_BASE": base_url, "OPENAI_API_KEY": "sk-test-00000000",
+        "ELEVEN_API_KEY": "", "STT_BACKEND": "static", "STT_STATIC_TEXT": QUESTION, "KB_WATCH_SECONDS": "0",
+        "PROMPT_AUDIO_DIR": str(tmp_path_factory.mktemp("prompt_audio")), "ANSWER_CACHE": "false",
+        "CACHE_BACKEND": "memory", "WORKERS": "1", "ADMIN_TOKEN": "", "LOG_LEVEL": "warning",
+    }
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in env.items():
+            patch.setenv(name, value)
+        return importlib.import_module("app")
+
+
+@pytest.fixture(scope="module")
+def client(server):
+    with TestClient(server.app) as client:
+        yield client
+
+
+def test_admin_endpoints_need_a_token_or_a_local_client(server, client, monkeypatch):
+    remote = TestClient(server.app, client=REMOTE)
+    assert client.get("/admin/kb").status_code == 200
+    assert remote.get("/admin/kb").status_code == 403
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/kb").status_code == 401
+    assert remote.post("/admin/reload", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert remote.get("/admin/kb", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+    assert remote.get("/admin/kb", headers={"Authorization": "Bearer s3cret"}).json()["vectors"] > 0
+
+
+def test_admin_reload_swaps_in_the_rebuilt_index(server, client, tmp_path):
+    for name in os.listdir("data"):
+        if os.path.isfile(os.path.join("data", name)):
+            shutil.copy2(os.path.join("data", name), tmp_path)
+    service = server.rag_service
+    original = service.kb
+    index_path = str(tmp_path / os.path.basename(server.INDEX_PATH))
+    service.load_knowledge_base(index_path, str(tmp_path / os.path.basename(server.METADATA_PATH)))
+    try:
+        old_version = service.kb_version
+        service.response_cache.set("cached question", [{"text": "old index"}])
+
+        # An ingest run rewrote the index: reloading serves it and drops results of the old one
+        stat = os.stat(index_path)
+        os.utime(index_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        response = client.post("/admin/reload")
+        assert response.status_code == 200
+        assert response.json()["version"] == service.kb_version != old_version
+        assert service.response_cache.get("cached question") is None
+
+        # A broken index is refused and the loaded one keeps serving
+        new_version = service.kb_version
+        with open(index_path, "wb") as f:
+            f.write(b"not a faiss index")
+        response = client.post("/admin/reload")
+        assert response.status_code == 500 and new_version in response.json()["detail"]
+        assert service.kb_version == new_version
+    finally:
+        service.swap_knowledge_base(original)
+
+
+def test_profanity_matches_whole_words_only(server):
+    check = server.rag_service.check_profanity
+    assert check("Tenho disputas na fatura, como resolvo?") == (False, None)
+    assert check("How do I reset my password? Hello?") == (False, None)
+    assert check("Vocês são uns idiotas")[0]
+    assert check("This fucking app is broken")[0]
+
+
+def receive(ws) -> dict:
+    """Next server message; with protocol 2 its audio arrives as the following binary frame"""
+    message = ws.receive_json()
+    if "audio_bytes" in message:
+        message["audio"] = ws.receive_bytes()
+    return message
+
+
+def until(ws, *types) -> dict:
+    while (message := receive(ws))["type"] not in types:
+        pass
+    return message
+
+
+def ask(ws, stream: bool) -> None:
+    ws.send_json({"type": "audio", "audio_bytes": 4, "stream": stream})
+    ws.send_bytes(b"RIFF")
+
+
+@contextlib.contextmanager
+def call(client):
+    with client.websocket_connect("/ws?protocol=2") as ws:
+        assert until(ws, "message")["audio"]  # greeting
+        yield ws
+
+
+def metric(text: str, name: str) -> float:
+    return next((float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(name + " ")), 0.0)
+
+
+def test_metrics_report_turns_in_prometheus_format(server, client):
+    answered = 'voicerag_turns_total{outcome="answered"}'
+    before = metric(client.get("/metrics").text, answered)
+    with call(client) as ws:
+        ask(ws, stream=False)
+        assert until(ws, "response")["text"].startswith("Oh, great question!")
+        ws.send_json({"type": "end"})
+        until(ws, "goodbye")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE voicerag_turns_total counter" in response.text
+    assert metric(response.text, answered) == before + 1
+    assert metric(response.text, 'voicerag_stage_seconds_count{stage="llm_complete"}') >= 1
+    assert metric(response.text, "voicerag_active_sessions") == 0
+    assert TestClient(server.app, client=REMOTE).get("/metrics").status_code == 403
+
+
+@pytest.fixture
+def history(server, monkeypatch):
+    """The conversation history of the next session's turns"""
+    histories = []
+    answer_turn = server.answer_turn
+
+    async def spy(websocket, conversation_history, *args, **kwargs):
+        histories.append(conversation_history)
+        return await answer_turn(websocket, conversation_history, *args, **kwargs)
+
+    monkeypatch.setattr(server, "answer_turn", spy)
+    return histories
+
+
+def test_interrupt_stops_the_streamed_answer_and_keeps_what_was_heard(server, client, history, monkeypatch):
+    closed = []
+    astream_response = server.rag_service.astream_response
+
+    async def tracked(*args, **kwargs):
+        try:
+            async for token in astream_response(*args, **kwargs):
+                yield token
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(server.rag_service, "astream_response", tracked)
+    with call(client) as ws:
+        ask(ws, stream=True)
+        first = until(ws, "audio_chunk")
+        ws.send_json({"type": "interrupt", "heard": 1})
+        late = []
+        while (message := receive(ws))["type"] != "interrupted":
+            late.append(message["type"])
+
+        # The ack only comes once the LLM stream is closed; nothing of the answer follows it
+        assert closed and "response_done" not in late
+        assert message["heard"] == 1
+        assert history[0] == [{"role": "user", "content": QUESTION},
+                              {"role": "assistant", "content": first["text"]}]
+
+
+def test_interrupt_after_the_answer_trims_history_to_what_was_heard(client, history):
+    with call(client) as ws:
+        ask(ws, stream=True)
+        sentences = []
+        while (message := receive(ws))["type"] != "response_done":
+            if message["type"] == "audio_chunk":
+                sentences.append(message["text"])
+        assert len(sentences) > 1 and message["chunks"] == len(sentences)
+
+        # Malformed counts are ignored instead of ending the session
+        ws.send_json({"type": "interrupt", "heard": "x"})
+        assert until(ws, "interrupted")["heard"] == len(sentences)
+        assert history[0][-1] == {"role": "assistant", "content": " ".join(sentences)}
+
+        # Playback was cut after the first sentence
+        ws.send_json({"type": "interrupt", "heard": 1})
+        assert until(ws, "interrupted")["heard"] == 1
+        assert history[0][-1] == {"role": "assistant", "content": sentences[0]}
+
+
+class StalledSocket:
+    """A client connection whose audio never finishes sending"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message: dict) -> None:
+        self.sent.append(message["type"])
+        if "audio" in message:
+            await asyncio.Event().wait()
+
+
+def test_barge_in_during_a_cached_answer_leaves_no_half_turn(server, client, monkeypatch):
+    service = server.rag_service
+    cache = AnswerCache(max_entries=10)
+    cache.set_version("test")
+    cache.put(QUESTION, service.detect_language(QUESTION), None, "Cached answer.", b"mp3")
+    monkeypatch.setattr(service, "answer_cache", cache)
+
+    async def interrupted_turn():
+        socket, conversation_history, delivered = StalledSocket(), [], []
+        turn = asyncio.create_task(server.answer_turn(socket, conversation_history, b"RIFF", None, False,
+                                                      delivered=delivered))
+        while "response" not in socket.sent:
+            await asyncio.sleep(0.01)
+        assert await server.barge_in(turn, conversation_history, delivered, 0)
+        return conversation_history, delivered
+
+    # The question stays, the answer that never reached the caller doesn't
+    conversation_history, delivered = client.portal.call(interrupted_turn)
+    assert conversation_history == [{"role": "user", "content": QUESTION}] and delivered == []
@@ -0,0 +1,71 @@
+"""
+Test cross-session micro-batching of requests
+"""
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    async def double(items):
+        calls.append(list(items))
+        await asyncio.sleep(0)
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(double, window=0.01, max_batch=3)
+        # Five sessions at once: a full batch goes immediately, the rest after the window
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        assert results == [0, 2, 4, 6, 8]
+        assert calls == [[0, 1, 2], [3, 4]]
+
+        # A lone request waits at most the window
+        start = asyncio.get_running_loop().time()
+        assert await batcher.submit(10) == 20
+        assert asyncio.get_running_loop().time() - start < 0.5
+        assert batcher.stats() == {"batches": 3, "items": 6, "mean_batch": 2.0}
+
+        # max_batch=1: every request is sent on its own, without waiting
+        unbatched = MicroBatcher(double, window=10.0, max_batch=1)
+        assert await asyncio.wait_for(asyncio.gather(unbatched.submit(1), unbatched.submit(2)), 1) == [2, 4]
+        assert calls[-2:] == [[1], [2]]
+
+    asyncio.run(main())
+
+
+def test_failures_reach_every_caller_and_cancelled_callers_are_dropped():
+    seen = []
+
+    async def embed(items):
+        seen.append(list(items))
+        if "boom" in items:
+            raise RuntimeError("API down")
+        return [item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher(embed, window=0.01, max_batch=10)
+        first, second = batcher.submit("boom"), batcher.submit("plano")
+        outcomes = await asyncio.gather(first, second, return_exceptions=True)
+        assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+        # A caller that barged in before the batch left isn't computed; the others still are
+        interrupted = asyncio.create_task(batcher.submit("cancelado"))
+        kept = asyncio.create_task(batcher.submit("lojas"))
+        await asyncio.sleep(0)
+        interrupted.cancel()
+        assert await kept == "LOJAS"
+        with pytest.raises(asyncio.CancelledError):
+            await interrupted
+        assert seen[-1] == ["lojas"]
+
+        # A handler that loses results fails the whole batch instead of leaving callers waiting forever
+        short = MicroBatcher(lambda items: embed(items[:1]), window=0.01, max_batch=10)
+        outcomes = await asyncio.wait_for(asyncio.gather(short.submit("a"), short.submit("b"),
+                                                         return_exceptions=True), 1)
+        assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+    asyncio.run(main())
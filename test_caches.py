@@ -0,0 +1,213 @@
+"""
+Test the caching components
+"""
+import asyncio
+
+import numpy as np
+
+import pytest
+
+from caches import (JSON_CODEC, VECTOR_CODEC, AnswerCache, BoundedCache, PromptAudioCache, SemanticCache,
+                    SharedCache, SQLiteCacheBackend, create_cache_backend)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_semantic_cache_returns_closest_above_threshold():
+    cache = SemanticCache(capacity=4, threshold=0.9)
+    cache.add("plans", unit(1, 0, 0), ["plans"])
+    cache.add("coverage", unit(0, 1, 0), ["coverage"])
+
+    similarity, value = cache.lookup([0.95, 0.05, 0.0])
+    assert value == ["plans"]
+    assert similarity > 0.9
+    assert cache.lookup(unit(0, 0, 1)) is None
+
+
+def test_semantic_cache_evicts_least_recently_used():
+    cache = SemanticCache(capacity=2, threshold=0.99)
+    cache.add("a", unit(1, 0, 0), "a")
+    cache.add("b", unit(0, 1, 0), "b")
+    assert cache.lookup(unit(1, 0, 0))[1] == "a"  # "a" is now the most recent
+    cache.add("c", unit(0, 0, 1), "c")
+
+    assert len(cache) == 2
+    assert cache.lookup(unit(0, 1, 0)) is None
+    assert cache.lookup(unit(1, 0, 0))[1] == "a"
+    assert cache.lookup(unit(0, 0, 1))[1] == "c"
+
+
+def test_semantic_cache_skips_expired_best_match():
+    clock = FakeClock()
+    cache = SemanticCache(capacity=4, threshold=0.9, ttl=60, clock=clock)
+    cache.add("old", unit(1, 0, 0), "old")
+    clock.now = 30
+    cache.add("new", unit(1, 0.2, 0), "new")
+
+    # "old" is the closest match but has expired: the next-best live row still answers
+    clock.now = 61
+    similarity, value = cache.lookup(unit(1, 0, 0))
+    assert value == "new" and similarity > 0.9
+    clock.now = 91
+    assert cache.lookup(unit(1, 0, 0)) is None
+
+
+def test_bounded_cache_lru_entry_cap():
+    cache = BoundedCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bounded_cache_byte_cap():
+    cache = BoundedCache(max_entries=100, max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    cache.set("c", b"123")
+
+    assert "a" not in cache
+    assert cache.bytes == 8
+    cache.set("huge", b"x" * 11)
+    assert "huge" not in cache
+
+
+def test_bounded_cache_ttl_and_counters():
+    clock = FakeClock()
+    cache = BoundedCache(max_entries=10, ttl=60, clock=clock)
+    cache.set("q", "results")
+    assert cache.get("q") == "results"
+
+    clock.now = 61
+    assert cache.get("q") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_answer_cache_normalizes_and_persists(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    cache = AnswerCache(max_entries=10, threshold=0.95, path=path)
+    cache.set_version("kb1")
+    cache.put("What are the student plans?", "en", unit(1, 0, 0), "Basic 4G.", b"mp3")
+
+    assert cache.get("what are the STUDENT plans", "en")["audio"] == b"mp3"
+    assert cache.get("What are the student plans?", "pt") is None
+    assert cache.get_similar(unit(0.99, 0.01, 0), "en")["text"] == "Basic 4G."
+
+    # Survives a restart with the same version, dropped when the KB changes
+    restarted = AnswerCache(max_entries=10, threshold=0.95, path=path)
+    restarted.set_version("kb1")
+    assert restarted.get("What are the student plans?", "en")["text"] == "Basic 4G."
+    restarted.set_version("kb2")
+    assert restarted.get("What are the student plans?", "en") is None
+
+    # Other versions' rows are kept for processes still on them; the async API reads and writes the same rows
+    async def workers_on_kb2():
+        writer, reader = AnswerCache(max_entries=10, path=path), AnswerCache(max_entries=10, path=path)
+        writer.set_version("kb2")
+        reader.set_version("kb2")
+        await writer.aput("What are the student plans?", "en", None, "Premium 5G.", b"new")
+        return await reader.aget("what are the student plans", "en")
+
+    assert asyncio.run(workers_on_kb2())["text"] == "Premium 5G."
+    restarted.set_version("kb1")
+    assert restarted.get("What are the student plans?", "en")["text"] == "Basic 4G."
+
+
+def test_prompt_audio_rendered_once_per_voice(tmp_path):
+    calls = []
+    voice = {"id": "rachel"}
+
+    async def synthesize(text, language):
+        calls.append(text)
+        return f"{voice['id']}:{text}".encode()
+
+    async def run():
+        cache = PromptAudioCache(str(tmp_path), synthesize, lambda language: voice["id"])
+        await cache.warm([("Olá!", "pt"), ("Adeus!", "pt")])
+        assert await cache.get("Olá!", "pt") == "rachel:Olá!".encode()
+
+        # A new process reuses the files on disk
+        restarted = PromptAudioCache(str(tmp_path), synthesize, lambda language: voice["id"])
+        assert await restarted.get("Adeus!", "pt") == b"rachel:Adeus!"
+        assert len(calls) == 2
+
+        # Changing the voice re-renders and prunes the old files
+        voice["id"] = "antoni"
+        await restarted.warm([("Olá!", "pt"), ("Adeus!", "pt")])
+        assert await restarted.get("Olá!", "pt") == "antoni:Olá!".encode()
+        assert len(calls) == 4
+        assert len(list(tmp_path.iterdir())) == 2
+
+    asyncio.run(run())
+
+
+def test_shared_cache_is_seen_by_other_workers(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    version = {"kb": "v1"}
+
+    def worker():
+        # Each worker process opens its own connection and keeps its own local LRU
+        backend = create_cache_backend("sqlite", path, max_entries=100)
+        return (SharedCache(BoundedCache(10), backend, "search", JSON_CODEC, version=lambda: version["kb"]),
+                SharedCache(BoundedCache(10), backend, "embedding", VECTOR_CODEC, version="model"))
+
+    (search_a, embedding_a), (search_b, embedding_b) = worker(), worker()
+    results = [{"text": "Plano Jovem", "source": "tarifas.pdf", "chunk_id": 1, "distance": 0.1}]
+    search_a.set("q1", results)
+    embedding_a.set("q1", [0.5, 0.25])
+
+    assert search_b.get("q1") == results and embedding_b.get("q1") == [0.5, 0.25]
+    assert search_b.stats()["shared_hits"] == 1 and search_b.stats()["hits"] == 1
+
+    # Worker A reloads the index: B (still on v1) can no longer feed it old results
+    version["kb"] = "v2"
+    search_a.clear()
+    assert search_a.get("q1") is None and embedding_a.get("q1") == [0.5, 0.25]
+    assert search_b.backend.count("search") == 0
+
+    # The async path does the same with the SQLite calls in a worker thread
+    async def async_worker():
+        await embedding_a.aset("q2", [1.0, 0.5])
+        return await embedding_b.aget("q2"), await embedding_b.aget("q3", "miss")
+
+    assert asyncio.run(async_worker()) == ([1.0, 0.5], "miss")
+    assert embedding_b.stats()["shared_hits"] == 2
+
+
+def test_sqlite_backend_keeps_newest_entries(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "shared.sqlite3"), max_entries=50, max_value_bytes=10)
+    for i in range(200):
+        backend.set("search", "v1", f"q{i}", b"x")
+    backend.set("search", "v1", "big", b"x" * 11)
+    backend.trim("search")
+    assert backend.count("search") == 50
+    assert backend.get("search", "v1", "q199") == b"x" and backend.get("search", "v1", "q0") is None
+    assert backend.get("search", "v1", "big") is None
+    with pytest.raises(ValueError):
+        create_cache_backend("redis", "", 10)
+
+
+def test_answer_cache_reads_answers_from_other_workers(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    first, second = (AnswerCache(max_entries=10, path=path) for _ in range(2))
+    first.set_version("kb1")
+    second.set_version("kb1")
+    first.put("Quais são os planos?", "pt", unit(1, 0, 0), "Plano Jovem.", b"mp3")
+    assert second.get("quais sao os planos", "pt") is None  # different normalized question
+    assert second.get("Quais são os planos", "pt")["audio"] == b"mp3"
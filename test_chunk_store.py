@@ -0,0 +1,60 @@
+"""
+Test the memory-mapped chunk store
+"""
+import pickle
+
+import pytest
+
+import chunk_store
+from chunk_store import ChunkStore, convert_pickle, write_chunk_store
+
+
+def test_round_trip_by_vector_id(tmp_path):
+    metadata = {
+        42: {"source": "tarifários.pdf", "chunk_id": 3, "text": "Plano Jovem: 10 GB por 9,99 €",
+             "page": 2, "section": "PLANOS JOVEM"},
+        7: {"source": "faq.txt", "chunk_id": 0, "text": "", "page": 0, "section": ""},
+        1000: {"source": "tarifários.pdf", "chunk_id": 4, "text": "Roaming incluído na UE. " * 50,
+               "page": 3, "section": "ROAMING"},
+    }
+    path = str(tmp_path / "chunks.bin")
+    write_chunk_store(path, metadata)
+    store = ChunkStore(path)
+
+    assert len(store) == 3 and list(store) == [7, 42, 1000]
+    assert store[42] == metadata[42] and store.get(1000) == metadata[1000]
+    assert store.sources == ["faq.txt", "tarifários.pdf"]  # each source stored once
+    assert 7 in store and 8 not in store and store.get(-1) is None
+    with pytest.raises(KeyError):
+        store[43]
+    assert dict(store) == metadata
+
+
+def test_empty_store_and_positional_list(tmp_path):
+    write_chunk_store(str(tmp_path / "empty.bin"), {})
+    assert len(ChunkStore(str(tmp_path / "empty.bin"))) == 0
+
+    write_chunk_store(str(tmp_path / "list.bin"), [{"source": "a.txt", "chunk_id": 0, "text": "x"}])
+    # Chunks without page/section (older ingests) read as page 0, section ""
+    assert ChunkStore(str(tmp_path / "list.bin"))[0] == {"source": "a.txt", "chunk_id": 0, "text": "x",
+                                                           "page": 0, "section": ""}
+
+
+def test_old_pickle_is_rejected_until_converted(tmp_path):
+    legacy, store_path = str(tmp_path / "metadata.pkl"), str(tmp_path / "chunks.bin")
+    with open(legacy, "wb") as f:
+        pickle.dump([{"source": "a.txt", "chunk_id": 0, "text": "olá"}], f)
+    with pytest.raises(ValueError):
+        ChunkStore(legacy)
+
+    assert convert_pickle(legacy, store_path) == 1
+    assert ChunkStore(store_path)[0]["text"] == "olá"
+
+
+def test_store_written_before_pages_and_sections(tmp_path, monkeypatch):
+    path = str(tmp_path / "chunks.bin")
+    with monkeypatch.context() as patch:
+        patch.setattr(chunk_store, "COLUMNS", tuple(c for c in chunk_store.COLUMNS
+                                                    if c[0] not in ("pages", "section_ids")))
+        write_chunk_store(path, {5: {"source": "a.txt", "chunk_id": 1, "text": "olá", "page": 9, "section": "X"}})
+    assert ChunkStore(path)[5] == {"source": "a.txt", "chunk_id": 1, "text": "olá", "page": 0, "section": ""}
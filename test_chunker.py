@@ -0,0 +1,54 @@
+"""
+Test the structure-aware chunker
+"""
+from chunker import chunk_document, count_tokens, iter_blocks
+
+GUIDE = """GUIA DE APOIO AO CLIENTE
+
+PÁGINA 1 – PLANOS
+O plano Básico custa 500 MZN por mês.
+Inclui 10 GB de dados.
+
+O plano Premium custa 1 500 MZN.
+
+PÁGINA 2 – ROAMING
+Ative o roaming antes de viajar. Marque *123# e escolha a opção 4.
+"""
+
+
+def test_blocks_follow_headings_and_blank_lines():
+    lines = [(1, line) for line in GUIDE.splitlines()]
+    assert [kind for kind, _, _ in iter_blocks(lines)] == ["heading", "heading", "paragraph", "paragraph",
+                                                           "heading", "paragraph"]
+    # Lines of one paragraph are joined
+    assert list(iter_blocks(lines))[2][2] == "O plano Básico custa 500 MZN por mês. Inclui 10 GB de dados."
+
+
+def test_chunks_carry_page_and_section_and_never_span_sections(tmp_path):
+    path = tmp_path / "guia.txt"
+    path.write_text(GUIDE, encoding="utf-8")
+    chunks = chunk_document(str(path), chunk_size=400, overlap=50)
+
+    assert [(chunk["page"], chunk["section"]) for chunk in chunks] == [
+        (1, "PÁGINA 1 – PLANOS"), (2, "PÁGINA 2 – ROAMING")]
+    # Each chunk starts with its heading; both paragraphs of page 1 fit in one chunk
+    assert chunks[0]["text"] == ("PÁGINA 1 – PLANOS\nO plano Básico custa 500 MZN por mês. Inclui 10 GB de dados.\n"
+                                 "O plano Premium custa 1 500 MZN.")
+    assert "roaming" not in chunks[0]["text"].lower()
+
+
+def test_long_paragraph_is_split_on_sentences_with_overlap(tmp_path):
+    sentences = [f"O pacote número {i} custa {i * 100} meticais por semana." for i in range(30)]
+    path = tmp_path / "pacotes.txt"
+    path.write_text("PACOTES SEMANAIS\n" + " ".join(sentences) + "\n", encoding="utf-8")
+    chunks = chunk_document(str(path), chunk_size=60, overlap=20)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["text"].startswith("PACOTES SEMANAIS\n") and count_tokens(chunk["text"]) <= 60
+        # Whole sentences only
+        assert all(line.endswith(".") for line in chunk["text"].splitlines()[1:])
+    # Consecutive chunks share their boundary sentence; every sentence is kept
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous["text"].splitlines()[-1] == chunk["text"].splitlines()[1]
+    assert all(any(sentence in chunk["text"] for chunk in chunks) for sentence in sentences)
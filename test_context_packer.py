@@ -0,0 +1,35 @@
+"""
+Test the token-budgeted context packer
+"""
+from context_packer import count_tokens, deduplicate, pack_context, strip_overlap
+
+
+def chunk(chunk_id, text, source="guia.txt"):
+    return {"source": source, "chunk_id": chunk_id, "text": text}
+
+
+def test_overlap_between_consecutive_chunks_is_dropped():
+    first = "O plano Básico custa 500 MZN. Inclui 10 GB de dados e 500 minutos."
+    second = "Inclui 10 GB de dados e 500 minutos. O plano Premium custa 1 500 MZN."
+    assert strip_overlap(first, second) == " O plano Premium custa 1 500 MZN."
+
+    # Only chunks adjacent in the same document are compared
+    texts = deduplicate([chunk(4, second), chunk(3, first), chunk(4, second, source="outro.txt")])
+    assert texts == [" O plano Premium custa 1 500 MZN.", first, second]
+
+
+def test_context_within_budget_is_kept_whole():
+    chunks = [chunk(0, "APN: apn.mozaitel.mz."), chunk(7, "Saldo: *124#."), chunk(9, "Saldo: *124#.")]
+    assert pack_context("Qual é o APN?", chunks, 100) == "[Doc 1]\nAPN: apn.mozaitel.mz.\n\n[Doc 2]\nSaldo: *124#."
+
+
+def test_over_budget_keeps_the_relevant_sentences():
+    filler = " ".join(f"A loja número {i} abre às nove horas." for i in range(40))
+    chunks = [chunk(0, filler), chunk(10, filler.replace("loja", "agência") + " Após esgotar os dados, a velocidade é 512 kbps.")]
+    context = pack_context("O que acontece quando esgoto os dados?", chunks, 80)
+    assert count_tokens(context) <= 80
+    assert "512 kbps" in context and context.startswith("[Doc 1]\nA loja")
+
+    # Special-token text in a chunk or a transcript is just text
+    assert count_tokens("fim <|endoftext|>") > 0
+    assert "<|endoftext|>" in pack_context("<|endoftext|>", [chunk(0, "Texto <|endoftext|> colado de um PDF.")], 80)
@@ -0,0 +1,55 @@
+"""
+Test the embedding providers and the offline (hash) retrieval path
+"""
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test-00000000")
+import ingest_pdfs  # noqa: E402
+from embeddings import HashEmbedder, create_embedding_provider  # noqa: E402
+from knowledge_base import KnowledgeBase  # noqa: E402
+
+
+def test_hash_embedder_is_deterministic_and_normalized():
+    embedder = HashEmbedder()
+    vectors = embedder.embed(["Plano Premium 5G", "plano premium 5g", "Lojas em Maputo", ""])
+    assert vectors.shape == (4, embedder.dimension) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1.0) and not vectors[3].any()
+    assert np.array_equal(vectors[0], vectors[1])  # same tokens after case/accent folding
+    assert vectors[0] @ vectors[2] < 0.5
+    assert asyncio.run(embedder.aembed_query("Plano Premium 5G")) == vectors[0].tolist()
+
+    with pytest.raises(ValueError):
+        create_embedding_provider("onnx")  # needs EMBEDDING_MODEL_PATH
+    with pytest.raises(ValueError):
+        create_embedding_provider("sentence-transformers")
+
+
+def test_offline_build_and_search_rejects_other_providers(tmp_path, monkeypatch):
+    docs, data = tmp_path / "pdfs", tmp_path / "data"
+    docs.mkdir()
+    monkeypatch.setattr(ingest_pdfs, "EMBEDDING_PROVIDER", "hash")
+    monkeypatch.setattr(ingest_pdfs, "EMBED_CHECKPOINT_DIR", str(tmp_path / "checkpoint"))
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_SIZE", 30)
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(ingest_pdfs, "create_client", lambda: pytest.fail("no API calls offline"))
+    (docs / "planos.txt").write_text("O plano Premium 5G custa 1600 meticais por mês com dados ilimitados.")
+    (docs / "lojas.txt").write_text("As lojas abrem às 8 horas na Avenida Julius Nyerere em Maputo.")
+    ingest_pdfs.build_index(str(docs), str(data))
+
+    embedder = HashEmbedder()
+    index_path, metadata_path = str(data / "index.faiss"), str(data / "chunks.bin")
+    kb = KnowledgeBase.load(index_path, metadata_path, embedding=embedder.signature, dimension=embedder.dimension)
+    assert kb.info()["embedding"] == "hash:256" and kb.info()["dimension"] == 256
+    assert kb.search(embedder.embed_query("quanto custa o plano premium"), k=1)[0]["source"] == "planos.txt"
+    assert kb.search(embedder.embed_query("horário das lojas em Maputo"), k=1)[0]["source"] == "lojas.txt"
+
+    # Queries embedded by another provider would be compared with the wrong vectors
+    with pytest.raises(ValueError, match="built with hash:256"):
+        KnowledgeBase.load(index_path, metadata_path, embedding="text-embedding-3-small", dimension=1536)
+    os.remove(data / "manifest.json")  # without the manifest, the dimension still catches it
+    with pytest.raises(ValueError, match="256-dimensional"):
+        KnowledgeBase.load(index_path, metadata_path, embedding="text-embedding-3-small", dimension=1536)
@@ -0,0 +1,162 @@
+"""
+Test the batched, resumable embedding stage of ingest_pdfs.py
+"""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test-00000000")
+import ingest_pdfs  # noqa: E402
+from knowledge_base import KnowledgeBase  # noqa: E402
+from vector_index import index_kind  # noqa: E402
+
+
+class FakeEmbeddings:
+    """Stands in for client.embeddings; fails once after `fail_after` calls"""
+
+    def __init__(self, fail_after=None):
+        self.calls = 0
+        self.fail_after = fail_after
+
+    async def create(self, model, input):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise RuntimeError("connection lost")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in input])
+
+
+class FakeClient:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    async def close(self):
+        pass
+
+
+def test_batches_respect_token_and_item_limits():
+    texts = ["palavra " * 50] * 10 + ["curto"] * 5  # 52 tokens each, then 2 tokens each
+    batches = list(ingest_pdfs.plan_batches(texts, max_tokens=120, max_items=4))
+
+    # Two long texts per request by tokens; short ones up to the item limit
+    assert batches == [(0, 2), (2, 4), (4, 6), (6, 8), (8, 12), (12, 15)]
+
+
+def test_interrupted_ingest_resumes_from_checkpoint(tmp_path, monkeypatch):
+    texts = [f"chunk {i} " + "x" * i for i in range(40)]
+    monkeypatch.setattr(ingest_pdfs, "EMBED_BATCH_SIZE", 5)
+    monkeypatch.setattr(ingest_pdfs, "EMBED_CONCURRENCY", 1)
+    monkeypatch.setattr(ingest_pdfs, "EMBED_MAX_RETRIES", 0)
+    monkeypatch.setattr(ingest_pdfs.plan_batches, "__defaults__", (ingest_pdfs.EMBED_BATCH_TOKENS, 5))
+
+    failing = FakeEmbeddings(fail_after=3)
+    monkeypatch.setattr(ingest_pdfs, "create_client", lambda: FakeClient(failing))
+    with pytest.raises(RuntimeError):
+        ingest_pdfs.get_embeddings(texts, str(tmp_path))
+    assert len(list(tmp_path.glob("*.npy"))) == 3
+
+    resumed = FakeEmbeddings()
+    monkeypatch.setattr(ingest_pdfs, "create_client", lambda: FakeClient(resumed))
+    vectors = ingest_pdfs.get_embeddings(texts, str(tmp_path))
+
+    assert resumed.calls == 5  # 8 batches, 3 already on disk
+    assert np.array_equal(vectors[:, 0], [len(text) for text in texts])
+
+
+def test_incremental_build_embeds_only_the_delta(tmp_path, monkeypatch):
+    docs, data = tmp_path / "pdfs", tmp_path / "data"
+    docs.mkdir()
+    monkeypatch.setattr(ingest_pdfs, "EMBED_CHECKPOINT_DIR", str(tmp_path / "checkpoint"))
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_SIZE", 20)  # 20-token chunks, no overlap
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_OVERLAP", 0)
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(ingest_pdfs, "create_client", lambda: FakeClient(embeddings))
+
+    def paragraph(topic, n):
+        return " ".join(f"O {topic} número {i} custa {i * 100} meticais." for i in range(n))
+
+    (docs / "planos.txt").write_text(paragraph("plano", 12))
+    (docs / "lojas.txt").write_text(paragraph("loja", 6))
+    (docs / "antigo.txt").write_text(paragraph("pacote", 6))
+    ingest_pdfs.build_index(str(docs), str(data))
+    first_calls = embeddings.calls
+
+    # Append to one file, delete one, add one
+    (docs / "planos.txt").write_text(paragraph("plano", 12) + " Novo plano familiar disponível.")
+    (docs / "antigo.txt").unlink()
+    (docs / "rede.txt").write_text(paragraph("antena", 3))
+    before = ingest_pdfs.load_previous_build(str(data))[1]
+    ingest_pdfs.build_index(str(docs), str(data))
+
+    index, metadata, manifest = ingest_pdfs.load_previous_build(str(data))
+    assert set(manifest["files"]) == {"planos.txt", "lojas.txt", "rede.txt"}
+    assert index.ntotal == len(metadata)
+    assert {chunk["source"] for chunk in metadata.values()} == {"planos.txt", "lojas.txt", "rede.txt"}
+    # Unchanged chunks kept their IDs; only the new tail and the new file were embedded
+    kept = [i for i, chunk in before.items() if chunk["source"] == "lojas.txt"]
+    assert all(metadata[i] == before[i] for i in kept)
+    embedded = sum(1 for i in metadata if i not in before)
+    assert embedded < len(metadata) / 2
+    for vector_id in metadata:
+        index.reconstruct(vector_id)  # every metadata entry has its vector
+    # The BM25 index was rewritten with the same chunks
+    kb = KnowledgeBase.load(str(data / "index.faiss"), str(data / "chunks.bin"))
+    hits, _ = kb.lexical_search("plano familiar", k=1)
+    assert "familiar" in metadata[hits[0][0]]["text"]
+
+    # Nothing changed: no requests at all
+    calls = embeddings.calls
+    ingest_pdfs.build_index(str(docs), str(data))
+    assert embeddings.calls == calls > first_calls
+
+
+def test_switching_index_type_reuses_stored_vectors(tmp_path, monkeypatch):
+    docs, data = tmp_path / "pdfs", tmp_path / "data"
+    docs.mkdir()
+    monkeypatch.setattr(ingest_pdfs, "EMBED_CHECKPOINT_DIR", str(tmp_path / "checkpoint"))
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_SIZE", 20)
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_OVERLAP", 0)
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(ingest_pdfs, "create_client", lambda: FakeClient(embeddings))
+    for name in ("a", "b"):
+        (docs / f"{name}.txt").write_text(" ".join(f"Documento {name} frase {i}." for i in range(30)))
+    ingest_pdfs.build_index(str(docs), str(data))
+    calls = embeddings.calls
+
+    monkeypatch.setattr(ingest_pdfs, "INDEX_TYPE", "hnsw")
+    ingest_pdfs.build_index(str(docs), str(data))
+    index, metadata, manifest = ingest_pdfs.load_previous_build(str(data))
+    assert index_kind(index) == "hnsw" and manifest["index"]["built_as"] == "hnsw"
+    assert index.ntotal == len(metadata) and embeddings.calls == calls
+
+    # HNSW can't delete vectors: removing a file rebuilds it from the stored ones
+    (docs / "b.txt").unlink()
+    ingest_pdfs.build_index(str(docs), str(data))
+    index, metadata, _ = ingest_pdfs.load_previous_build(str(data))
+    assert index_kind(index) == "hnsw" and embeddings.calls == calls
+    assert index.ntotal == len(metadata) and {c["source"] for c in metadata.values()} == {"a.txt"}
+
+
+def test_worker_processes_build_the_same_index(tmp_path, monkeypatch):
+    docs = tmp_path / "pdfs"
+    docs.mkdir()
+    monkeypatch.setattr(ingest_pdfs, "EMBED_CHECKPOINT_DIR", str(tmp_path / "checkpoint"))
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_SIZE", 20)
+    monkeypatch.setattr(ingest_pdfs, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(ingest_pdfs, "EMBED_BATCH_SIZE", 4)
+    monkeypatch.setattr(ingest_pdfs, "create_client", lambda: FakeClient(FakeEmbeddings()))
+    for n in range(6):
+        (docs / f"doc{n}.txt").write_text(" ".join(f"Documento {n} frase {i}." for i in range(10 + 5 * n)))
+
+    builds = []
+    for workers in (0, 3):
+        monkeypatch.setattr(ingest_pdfs, "INGEST_WORKERS", workers)
+        ingest_pdfs.build_index(str(docs), str(tmp_path / f"data{workers}"))
+        index, metadata, manifest = ingest_pdfs.load_previous_build(str(tmp_path / f"data{workers}"))
+        builds.append((metadata, manifest, index.reconstruct_n(0, index.ntotal)))
+
+    # Same chunks, IDs and vectors, in document order, whichever process chunked them
+    (serial_metadata, serial_manifest, serial_vectors), (metadata, manifest, vectors) = builds
+    assert metadata == serial_metadata and manifest == serial_manifest
+    assert np.array_equal(vectors, serial_vectors)
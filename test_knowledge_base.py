@@ -0,0 +1,93 @@
+"""
+Test loading and validating knowledge base snapshots
+"""
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from chunk_store import write_chunk_store
+from knowledge_base import KnowledgeBase, file_signature
+from lexical_index import write_lexical_index
+
+
+def write_kb(directory, vectors, metadata, id_map=True):
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    if id_map:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(vectors, np.array(list(metadata), dtype=np.int64))
+        metadata = dict(metadata)
+    else:
+        index.add(vectors)
+        metadata = list(metadata.values())
+    faiss.write_index(index, str(directory / "index.faiss"))
+    write_chunk_store(str(directory / "chunks.bin"), metadata)
+    return str(directory / "index.faiss"), str(directory / "chunks.bin")
+
+
+def chunk(source, i):
+    return {"source": source, "chunk_id": i, "text": f"{source} #{i}"}
+
+
+def test_search_maps_vector_ids_to_chunks(tmp_path):
+    vectors = np.eye(3, dtype=np.float32)
+    paths = write_kb(tmp_path, vectors, {7: chunk("a.txt", 0), 42: chunk("b.txt", 0), 99: chunk("b.txt", 1)})
+    kb = KnowledgeBase.load(*paths)
+
+    results = kb.search([0, 1, 0], k=2)
+    assert results[0]["source"] == "b.txt" and results[0]["distance"] == 0.0
+    assert kb.info()["vectors"] == 3
+
+
+def test_mmapped_index_searches_like_a_loaded_one(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(100, 8)).astype(np.float32)
+    paths = write_kb(tmp_path, vectors, {i: chunk("a.txt", i) for i in range(100)})
+    loaded, mapped = KnowledgeBase.load(*paths), KnowledgeBase.load(*paths, mmap=True)
+    assert mapped.search(vectors[42].tolist(), k=3) == loaded.search(vectors[42].tolist(), k=3)
+    assert mapped.version == loaded.version
+
+
+def test_legacy_list_metadata_is_positional(tmp_path):
+    paths = write_kb(tmp_path, np.eye(2, dtype=np.float32), {0: chunk("a.txt", 0), 1: chunk("a.txt", 1)}, id_map=False)
+    assert KnowledgeBase.load(*paths).search([1, 0], k=1)[0]["chunk_id"] == 0
+
+
+def test_mismatched_index_and_metadata_are_rejected(tmp_path):
+    index_path, metadata_path = write_kb(tmp_path, np.eye(2, dtype=np.float32), {0: chunk("a.txt", 0), 1: chunk("a.txt", 1)})
+    before = file_signature(index_path, metadata_path)
+    write_chunk_store(metadata_path, {0: chunk("a.txt", 0)})  # ingest replaced one file but not yet the other
+
+    assert file_signature(index_path, metadata_path) != before
+    with pytest.raises(ValueError):
+        KnowledgeBase.load(index_path, metadata_path)
+
+    os.remove(metadata_path)
+    assert file_signature(index_path, metadata_path) is None
+
+
+def test_hybrid_search_adds_exact_token_matches(tmp_path):
+    metadata = {i: {"source": "guia.txt", "chunk_id": i, "text": f"Secção {i} sobre tarifas"} for i in range(30)}
+    metadata[17]["text"] = "Configurar a APN internet.mz"
+    vectors = np.random.default_rng(0).normal(size=(30, 8)).astype(np.float32)
+    paths = write_kb(tmp_path, vectors, metadata)
+    write_lexical_index(str(tmp_path / "lexical.bin"), metadata)
+    kb = KnowledgeBase.load(*paths)
+    assert kb.paths[-1].endswith("lexical.bin")
+
+    # The embedding lands elsewhere; BM25 still brings the APN chunk into the top-k
+    lexical_hits, _ = kb.lexical_search("APN", k=20)
+    results = kb.hybrid_search(vectors[3].tolist(), 3, lexical_hits, candidates=5)
+    assert [r["chunk_id"] for r in results][:2] in ([3, 17], [17, 3])
+    assert next(r for r in results if r["chunk_id"] == 17)["distance"] is None
+
+    # A batch of queries (one index.search) gets exactly what each query gets alone
+    queries = [vectors[3].tolist(), vectors[8].tolist(), vectors[17].tolist()]
+    batch = kb.hybrid_search_many(queries, 3, [lexical_hits, [], lexical_hits], candidates=5)
+    assert batch == [kb.hybrid_search(query, 3, hits, candidates=5)
+                     for query, hits in zip(queries, [lexical_hits, [], lexical_hits])]
+
+    # A BM25 index from another build is refused
+    write_lexical_index(str(tmp_path / "lexical.bin"), {0: metadata[0]})
+    with pytest.raises(ValueError):
+        KnowledgeBase.load(*paths)
@@ -0,0 +1,46 @@
+"""
+Test the BM25 index and rank fusion behind hybrid search
+"""
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize, write_lexical_index
+
+CHUNKS = {
+    3: {"text": "Configuração da APN: use internet.mz para 4G e 5G."},
+    8: {"text": "Pague a fatura com M-Pesa ou e-Mola no telemóvel."},
+    11: {"text": "O Plano Jovem custa 9,99 MT por semana com 2 GB de dados."},
+    20: {"text": "A cobertura da rede 4G chega a todas as capitais provinciais."},
+    21: {"text": ""},
+}
+
+
+def build(tmp_path, chunks=CHUNKS):
+    write_lexical_index(str(tmp_path / "lexical.bin"), chunks)
+    return LexicalIndex(str(tmp_path / "lexical.bin"))
+
+
+def test_tokenizer_folds_accents_and_keeps_compound_tokens():
+    assert tokenize("Configuração da APN") == ["configuracao", "apn"]
+    assert tokenize("M-Pesa custa 9,99 MT") == ["mpesa", "pesa", "custa", "999", "9", "99", "mt"]
+    assert "5g" in tokenize("Rede 5G") and "mpesa" in tokenize("mpesa")
+
+
+def test_exact_tokens_rank_their_chunk_first(tmp_path):
+    index = build(tmp_path)
+    assert len(index) == 5 and index.ids.tolist() == [3, 8, 11, 20, 21]
+
+    hits, coverage = index.search("Como configurar a APN para 5G?", k=3)
+    assert hits[0][0] == 3
+    hits, _ = index.search("pagar com mpesa", k=3)
+    assert hits[0][0] == 8
+    assert index.search("roaming internacional", k=3) == ([], 0.0)
+
+
+def test_coverage_drops_with_unmatched_query_terms(tmp_path):
+    index = build(tmp_path)
+    _, full = index.search("plano jovem", k=1)
+    _, partial = index.search("plano jovem empresarial anual", k=1)
+    assert full > 0.7 and partial < full / 2
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([1, 2, 3], [3, 4, 1])
+    assert [vector_id for vector_id, _ in fused] == [1, 3, 2, 4]
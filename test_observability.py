@@ -0,0 +1,85 @@
+"""
+Test turn spans, latency histograms and the leveled logger
+"""
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+import observability
+from observability import Histogram, Metrics, configure_logging, log, span, turn
+
+
+def test_histogram_buckets_are_cumulative_and_rendered():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(seconds)
+    assert list(histogram.cumulative()) == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]  # le is inclusive
+
+    metrics = Metrics()
+    metrics.observe("search", 0.002)
+    metrics.count_turn("answered")
+    text = metrics.render({"response": {"hits": 3, "misses": 1, "hit_ratio": 0.75, "entries": 2}})
+    assert 'voicerag_stage_seconds_bucket{stage="search",le="+Inf"} 1' in text
+    assert 'voicerag_stage_seconds_count{stage="search"} 1' in text
+    assert 'voicerag_turns_total{outcome="answered"} 1' in text
+    assert 'voicerag_cache_hit_ratio{cache="response"} 0.75' in text
+    assert "voicerag_active_sessions 0" in text
+
+
+def test_turn_trace_collects_spans_of_spawned_tasks(monkeypatch):
+    monkeypatch.setattr(observability, "metrics", Metrics())
+
+    async def synthesize(delay):
+        with span("tts_complete"):
+            await asyncio.sleep(delay)
+        observability.record("tts_first_byte", delay)
+
+    async def voice_turn():
+        with turn() as trace:
+            with span("search"):
+                await asyncio.sleep(0.01)
+            # TTS tasks created inside the turn report into its trace
+            await asyncio.gather(*(asyncio.create_task(synthesize(d)) for d in (0.02, 0.01)))
+            with pytest.raises(RuntimeError), span("embed"):
+                raise RuntimeError("API down")
+        return trace
+
+    trace = asyncio.run(voice_turn())
+    assert set(trace.stages) == {"search", "tts_complete", "tts_first_byte"}  # failed stages aren't timed
+    assert trace.stages["tts_complete"] >= 0.03  # repeated stages add up...
+    assert trace.stages["tts_first_byte"] == 0.01  # ...first-byte/token stages keep the first one
+    assert trace.summary().startswith("search ")
+    assert observability.metrics.stages["tts_complete"].count == 2
+    assert observability.metrics.stages["turn"].count == 1
+
+    # Prompt cache usage from the LLM's last chunk lands in the turn and in the totals
+    async def answer():
+        with turn() as trace:
+            observability.record_prompt_usage(None)  # token chunks carry no usage
+            observability.record_prompt_usage({"input_tokens": 1600, "input_token_details": {"cache_read": 1152}})
+        return trace
+
+    trace = asyncio.run(answer())
+    assert trace.summary().endswith("prompt 1600 tokens (72% cached)")
+    assert "voicerag_llm_cached_prompt_tokens_total 1152" in observability.metrics.render()
+
+    # Outside a turn, stages still reach the histograms
+    with span("search"):
+        pass
+    assert observability.metrics.stages["search"].count == 2
+
+
+def test_log_level_off_silences_the_logger():
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        configure_logging("debug")
+        log.debug("🔍 Query: plano")
+        configure_logging("off")
+        log.error("WebSocket error")
+    configure_logging("info")
+    assert output.getvalue() == "🔍 Query: plano\n"
+
+    with pytest.raises(ValueError):
+        configure_logging("verbose")
@@ -0,0 +1,33 @@
+"""
+Test the precompiled prompt variants keep a stable, cacheable prefix
+"""
+from langchain.schema import AIMessage, HumanMessage
+
+from prompts import LANGUAGES, SENTIMENTS, build_prompts
+
+
+def render(prompt, history, context, question):
+    return [(m.type, m.content) for m in prompt.format_messages(history=history, context=context,
+                                                                  question=question)]
+
+
+def test_every_variant_is_built_once_and_starts_with_static_instructions():
+    prompts = build_prompts()
+    assert set(prompts) == {(language, sentiment) for language in LANGUAGES for sentiment in SENTIMENTS}
+
+    neutral = render(prompts[("pt", "neutral")], [], "Premium 5G: 1500 MZN", "Quanto custa?")
+    frustrated = render(prompts[("pt", "negative")], [], "Fatura: multa de 50 MZN", "Tenho um problema")
+    assert neutral[0] == frustrated[0]  # same first message whatever the context or sentiment
+    assert "{" not in neutral[0][1] and "1500" not in neutral[0][1]
+    assert "EMPATIA" in frustrated[-2][1] and "EMPATIA" not in neutral[-2][1]
+
+
+def test_next_turn_prompt_extends_this_turn_up_to_the_history():
+    prompt = build_prompts()[("en", "neutral")]
+    first = render(prompt, [], "Basic 4G: 500 MZN", "How much is Basic 4G?")
+    history = [HumanMessage(content="How much is Basic 4G?"), AIMessage(content="It's 500 meticais a month!")]
+    second = render(prompt, history, "Roaming: 20 MZN/min", "And roaming?")
+
+    assert second[:1] == first[:1]
+    assert second[1:3] == [("human", "How much is Basic 4G?"), ("ai", "It's 500 meticais a month!")]
+    assert second[3][1].endswith("Roaming: 20 MZN/min") and second[4] == ("human", "And roaming?")
@@ -0,0 +1,99 @@
+"""
+Test token-budgeted history, background rolling summaries and session resume
+"""
+import asyncio
+
+from session_memory import SUMMARY_ROLE, SessionMemory, SessionStore, fit_history, message_tokens
+
+
+def exchange(n: int):
+    return [{"role": "user", "content": f"Pergunta {n} sobre o plano Premium 5G e os dados incluídos?"},
+            {"role": "assistant", "content": f"Resposta {n}: o Premium 5G custa 1.600 MZN por mês com 50 GB."}]
+
+
+def test_fit_history_keeps_summary_and_newest_whole_turns():
+    messages = [{"role": SUMMARY_ROLE, "content": "Cliente quer mudar de plano."}]
+    for n in range(10):
+        messages += exchange(n)
+    budget = message_tokens(messages[0]) + sum(message_tokens(m) for m in messages[-5:])
+
+    fitted = fit_history(messages, budget)
+    assert fitted[0]["role"] == SUMMARY_ROLE
+    assert fitted[1:] == messages[-4:]  # the orphan answer that fit is dropped with its question
+    assert fit_history(exchange(0), 10_000) == exchange(0)
+
+
+def test_compaction_runs_in_background_and_keeps_turns_added_meanwhile():
+    folded_batches = []
+
+    async def summarize(summary, messages):
+        folded_batches.append(messages)
+        await asyncio.sleep(0.01)  # the next turn lands while the summary is being written
+        return f"{summary}+{len(messages)}"
+
+    async def run():
+        memory = SessionMemory(max_tokens=150, summarize=summarize)
+        for n in range(4):
+            memory.messages.extend(exchange(n))
+        memory.compact_soon()
+        memory.compact_soon()  # one compaction at a time
+        memory.messages.extend(exchange(4))
+        await memory._compaction
+        return memory
+
+    memory = asyncio.run(run())
+    assert len(folded_batches) == 1
+    assert memory.summary == f"+{len(folded_batches[0])}"
+    assert memory.messages[1]["role"] == "user"
+    assert memory.messages[-2:] == exchange(4)
+    assert memory.tokens() < 150 + sum(message_tokens(m) for m in exchange(4))
+
+
+def test_compaction_keeps_the_latest_exchange_and_logs_failures(caplog):
+    async def summarize(summary, messages):
+        if any("<|endoftext|>" in m["content"] for m in messages):
+            raise RuntimeError("summary API down")
+        return "resumo"
+
+    async def run(messages):
+        memory = SessionMemory(max_tokens=60, summarize=summarize)
+        memory.messages.extend(messages)
+        memory.compact_soon()
+        task = memory._compaction
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)  # done callbacks
+        return memory
+
+    # The last exchange alone is over half the budget: it's still kept verbatim
+    long_answer = [{"role": "user", "content": "E o roaming?"},
+                   {"role": "assistant", "content": "O roaming " + "custa 10 MZN por MB. " * 20}]
+    memory = asyncio.run(run(exchange(0) + long_answer))
+    assert memory.messages == [{"role": SUMMARY_ROLE, "content": "resumo"}] + long_answer
+
+    # Caller speech with special-token text is counted like any text; a failed summary is logged
+    odd = [{"role": "user", "content": "<|endoftext|> " * 30}, {"role": "assistant", "content": "Como?"}]
+    memory = asyncio.run(run(odd + exchange(1)))
+    assert memory.messages == odd + exchange(1) and memory._compaction is None
+    assert "History summary failed" in caplog.text
+
+
+def test_store_resumes_parked_sessions_until_idle_expiry():
+    now = [0.0]
+    store = SessionStore(max_sessions=2, idle_seconds=60, clock=lambda: now[0])
+
+    async def summarize(summary, messages):
+        return summary
+
+    session_id, memory, resumed = store.open(None, lambda: SessionMemory(100, summarize))
+    assert not resumed
+    memory.messages.extend(exchange(0))
+    store.park(session_id, memory)
+
+    again, same, resumed = store.open(session_id, lambda: SessionMemory(100, summarize))
+    assert (again, resumed) == (session_id, True) and same is memory
+    assert len(store) == 0  # owned by the new socket, a second reconnect can't grab it
+
+    store.park(session_id, memory)
+    now[0] = 61
+    other, fresh, resumed = store.open(session_id, lambda: SessionMemory(100, summarize))
+    assert not resumed and other != session_id and fresh.messages == []
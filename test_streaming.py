@@ -0,0 +1,92 @@
+"""
+Test sentence splitting and ordered per-sentence TTS
+"""
+import asyncio
+import contextlib
+import random
+
+from streaming import SentenceSplitter, split_sentences, synthesize_in_order
+
+
+async def fake_tokens(text: str):
+    """Emit text in small irregular pieces like an LLM stream (same pieces on every run)"""
+    steps = random.Random(0)
+    pos = 0
+    while pos < len(text):
+        step = steps.randint(1, 4)
+        yield text[pos:pos + step]
+        pos += step
+        await asyncio.sleep(0)
+
+
+def test_splitter_keeps_numbers_and_merges_short_sentences():
+    splitter = SentenceSplitter(min_chars=20)
+    text = "Oh! O Premium 5G custa 1.600 meticais por mês. Inclui 50 GB de dados"
+    sentences = splitter.feed(text) + splitter.flush()
+
+    assert sentences == [
+        "Oh! O Premium 5G custa 1.600 meticais por mês.",
+        "Inclui 50 GB de dados",
+    ]
+
+
+def test_synthesize_in_order_emits_sequence_despite_uneven_tts():
+    text = "First sentence is here. Second one is a bit longer! Third and final question?"
+
+    async def synthesize(sentence: str) -> bytes:
+        # Earlier sentences finish later to force out-of-order completion
+        await asyncio.sleep(0.03 / (len(sentence) % 5 + 1))
+        return sentence.encode()
+
+    async def run():
+        sentences = split_sentences(fake_tokens(text), min_chars=10)
+        return [item async for item in synthesize_in_order(sentences, synthesize, 3)]
+
+    results = asyncio.run(run())
+
+    assert [seq for seq, _, _ in results] == [0, 1, 2]
+    assert [audio.decode() for _, _, audio in results] == [
+        "First sentence is here.",
+        "Second one is a bit longer!",
+        "Third and final question?",
+    ]
+
+
+def test_cancelled_turn_closes_token_stream_and_pending_tts():
+    closed = []
+    delivered = []
+
+    async def endless_tokens():
+        try:
+            while True:
+                yield "Mais uma frase longa. "
+                await asyncio.sleep(0.001)
+        finally:
+            closed.append("llm")
+
+    async def synthesize(sentence: str) -> bytes:
+        try:
+            await asyncio.sleep(0.01)
+            return sentence.encode()
+        except asyncio.CancelledError:
+            closed.append("tts")
+            raise
+
+    async def send_answer():
+        audio = synthesize_in_order(split_sentences(endless_tokens()), synthesize, 2)
+        async with contextlib.aclosing(audio):
+            async for _, sentence, _ in audio:
+                delivered.append(sentence)
+                await asyncio.sleep(1)  # the caller barges in while this one plays
+
+    async def run():
+        task = asyncio.create_task(send_answer())
+        while not delivered:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # Nothing left running once the cancelled turn has returned
+        assert "llm" in closed and "tts" in closed
+
+    asyncio.run(run())
+    assert delivered == ["Mais uma frase longa."]
@@ -0,0 +1,71 @@
+"""
+Test the streaming endpointer and the STT backends
+"""
+import asyncio
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from stt import StaticSTT, StreamingUtterance, create_stt_backend, detect_audio_format, parse_sample_rate
+
+RATE = 16000
+
+
+def pcm(seconds: float, amplitude: float, seed: int = 0) -> bytes:
+    """16-bit mono PCM: a 220 Hz tone (speech stand-in) plus a little noise"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    noise = np.random.default_rng(seed).normal(0, 40, t.shape)
+    signal = amplitude * np.sin(2 * np.pi * 220 * t) + noise
+    return np.clip(signal, -32768, 32767).astype("<i2").tobytes()
+
+
+def stream(utterance: StreamingUtterance, audio: bytes, frame_bytes: int = 3200):
+    """Feed 100 ms frames; returns the offset (bytes) at which end of speech was detected"""
+    for offset in range(0, len(audio), frame_bytes):
+        if utterance.feed(audio[offset:offset + frame_bytes]):
+            return offset + frame_bytes
+    return None
+
+
+def test_endpoint_detected_after_trailing_silence():
+    utterance = StreamingUtterance(RATE, end_silence_ms=600)
+    audio = pcm(0.5, 0) + pcm(1.5, 4000, seed=1) + pcm(3.0, 0, seed=2)
+
+    ended_at = stream(utterance, audio)
+    assert utterance.heard_speech
+    # Ends ~0.6 s after speech stops, long before the client would have stopped sending
+    assert ended_at is not None
+    assert 2.5 <= ended_at / (2 * RATE) <= 2.8
+
+    with wave.open(io.BytesIO(utterance.wav_bytes())) as wav:
+        assert wav.getframerate() == RATE and wav.getsampwidth() == 2
+    assert detect_audio_format(utterance.wav_bytes()) == ("wav", "audio/wav")
+
+
+def test_background_noise_and_clicks_are_not_speech():
+    utterance = StreamingUtterance(RATE)
+    click = pcm(0.03, 6000, seed=3)
+    assert stream(utterance, pcm(1.0, 0) + click + pcm(2.0, 0, seed=4)) is None
+    assert not utterance.heard_speech
+
+
+def test_utterance_is_capped():
+    utterance = StreamingUtterance(RATE, max_seconds=1.0)
+    assert stream(utterance, pcm(3.0, 4000)) == 2 * RATE
+
+
+def test_announced_sample_rate_is_validated():
+    assert parse_sample_rate(16000) == parse_sample_rate("16000") == 16000
+    for bad in (0, -16000, 123, "fast", None, True):
+        with pytest.raises(ValueError):
+            parse_sample_rate(bad)
+
+
+def test_static_backend_is_a_local_stand_in(monkeypatch):
+    monkeypatch.setenv("STT_STATIC_TEXT", "Quais são os planos?")
+    backend = create_stt_backend("static")
+    assert isinstance(backend, StaticSTT)
+    assert asyncio.run(backend.transcribe(b"RIFF....", "audio/wav")) == "Quais são os planos?"
+    assert backend.calls == 1
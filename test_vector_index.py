@@ -0,0 +1,65 @@
+"""
+Test the FAISS index factory: fallbacks, ID mapping, removal and search knobs
+"""
+import faiss
+import numpy as np
+import pytest
+
+from vector_index import (configure_search, create_index, index_kind, is_lossless,
+                          reconstruct_vectors, supports_removal, train_and_add)
+
+DIM = 32
+
+
+def unit_vectors(n: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_small_corpus_falls_back_to_simpler_index():
+    assert create_index("ivfpq", DIM, 5000)[1] == "ivf"
+    assert create_index("ivf", DIM, 200)[1] == "flat"
+    assert create_index("hnsw", DIM, 10)[1] == "hnsw"
+    with pytest.raises(ValueError):
+        create_index("lsh", DIM, 1000)
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf", "hnsw", "ivfpq"])
+def test_every_kind_searches_by_vector_id(kind):
+    vectors = unit_vectors(12_000)
+    ids = np.arange(1000, 1000 + len(vectors))
+    index, built_as = create_index(kind, DIM, len(vectors), nlist=64, ef_construction=40)
+    assert built_as == kind
+    train_and_add(index, vectors, ids)
+    configure_search(index, nprobe=16, ef_search=64)
+
+    assert index_kind(index) == kind
+    _, found = index.search(vectors[:20], 1)
+    # PQ distances are approximate: most, not all, queries find themselves
+    assert (found[:, 0] == ids[:20]).mean() >= (0.5 if kind == "ivfpq" else 0.9)
+
+
+def test_removal_and_reconstruct_keep_ids():
+    vectors = unit_vectors(2000)
+    index, _ = create_index("ivf", DIM, len(vectors))
+    train_and_add(index, vectors, np.arange(len(vectors)))
+    assert supports_removal(index) and is_lossless(index)
+
+    index.remove_ids(np.arange(0, 1000, dtype=np.int64))
+    assert index.ntotal == 1000
+    np.testing.assert_allclose(reconstruct_vectors(index, [1500, 1999]), vectors[[1500, 1999]])
+
+    hnsw, _ = create_index("hnsw", DIM, 10)
+    assert not supports_removal(hnsw)
+
+
+def test_search_knobs_are_applied_and_clamped():
+    vectors = unit_vectors(2000)
+    index, _ = create_index("ivf", DIM, len(vectors), nlist=32)
+    train_and_add(index, vectors, np.arange(len(vectors)))
+    configure_search(index, nprobe=1000)
+    assert faiss.extract_index_ivf(index).nprobe == 32
+
+    hnsw, _ = create_index("hnsw", DIM, 10)
+    configure_search(hnsw, ef_search=128)
+    assert faiss.downcast_index(hnsw.index).hnsw.efSearch == 128
@@ -0,0 +1,119 @@
+"""
+FAISS index factory for the knowledge base
+- flat:  exact search (IndexFlatL2), best below ~50k chunks
+- ivf:   inverted lists over k-means cells (IVF-Flat), trained on ingest
+- hnsw:  graph search (HNSW-Flat), no training, fast and accurate but can't delete
+- ivfpq: IVF with product-quantized vectors, ~64x smaller, approximate distances
+
+Every index maps vector IDs (the metadata keys) itself: IVF stores IDs in its
+inverted lists, flat and HNSW are wrapped in IndexIDMap2. OpenAI vectors are
+unit-normalized, so L2 ranking is the same as cosine ranking.
+"""
+
+import math
+from typing import Iterable, Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+MIN_POINTS_PER_CELL = 39  # FAISS k-means warns below this
+PQ_CENTROIDS = 256        # 8-bit codes
+
+
+def ivf_nlist(n_vectors: int, nlist: int = 0) -> int:
+    """Number of IVF cells: 4*sqrt(n) unless configured, capped so every cell can be trained"""
+    nlist = nlist or int(4 * math.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CELL))
+
+
+def pq_subquantizers(dimension: int, pq_m: int = 0) -> int:
+    """PQ sub-vectors: dimension/16 unless configured, rounded down to a divisor of the dimension"""
+    m = max(1, min(pq_m or dimension // 16, dimension))
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def create_index(kind: str, dimension: int, n_vectors: int, nlist: int = 0, pq_m: int = 0,
+                 hnsw_m: int = 32, ef_construction: int = 200) -> Tuple[faiss.Index, str]:
+    """
+    Empty index of the requested kind for `n_vectors` vectors. Too small a
+    corpus to train IVF/PQ falls back to a simpler kind; the kind actually
+    built is returned with the index.
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {kind!r} (expected one of {', '.join(INDEX_TYPES)})")
+
+    if kind == "ivfpq" and n_vectors < PQ_CENTROIDS * MIN_POINTS_PER_CELL:
+        print(f"  ⚠️  {n_vectors} vectors are too few to train PQ - using ivf")
+        kind = "ivf"
+    if kind in ("ivf", "ivfpq") and ivf_nlist(n_vectors, nlist) < 16:
+        print(f"  ⚠️  {n_vectors} vectors are too few for IVF - using flat")
+        kind = "flat"
+
+    if kind == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension)), kind
+    if kind == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, hnsw_m)
+        hnsw.hnsw.efConstruction = ef_construction
+        return faiss.IndexIDMap2(hnsw), kind
+
+    cells = ivf_nlist(n_vectors, nlist)
+    if kind == "ivf":
+        return faiss.index_factory(dimension, f"IVF{cells},Flat"), kind
+    return faiss.index_factory(dimension, f"IVF{cells},PQ{pq_subquantizers(dimension, pq_m)}"), kind
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Which of INDEX_TYPES a (loaded) index is"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return "ivfpq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf"
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    return "hnsw" if isinstance(inner, faiss.IndexHNSW) else "flat"
+
+
+def train_and_add(index: faiss.Index, vectors: np.ndarray, ids: np.ndarray,
+                  max_training_points: int = 256 * 1024, seed: int = 0) -> None:
+    """Train (IVF/PQ, on a sample if the corpus is large) then add the vectors under their IDs"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > max_training_points:
+            rows = np.random.default_rng(seed).choice(len(vectors), max_training_points, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    return index_kind(index) != "hnsw"
+
+
+def is_lossless(index: faiss.Index) -> bool:
+    """Whether the original vectors can be read back (PQ only keeps approximations)"""
+    return index_kind(index) != "ivfpq"
+
+
+def reconstruct_vectors(index: faiss.Index, ids: Iterable[int]) -> np.ndarray:
+    """Stored vectors for the given IDs (to rebuild an index without re-embedding)"""
+    ids = list(ids)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # IVF needs an ID -> list position map to look vectors up by ID
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    vectors = np.empty((len(ids), index.d), dtype=np.float32)
+    for row, vector_id in enumerate(ids):
+        vectors[row] = index.reconstruct(int(vector_id))
+    return vectors
+
+
+def configure_search(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Apply query-time accuracy/speed knobs: nprobe (IVF cells visited), efSearch (HNSW beam)"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if index_kind(index) == "hnsw" and ef_search:
+        faiss.downcast_index(index.index).hnsw.efSearch = ef_search
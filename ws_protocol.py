@@ -0,0 +1,83 @@
+"""
+Wire protocol helpers for the /ws socket
+- v1 (legacy): audio travels as base64 inside JSON messages
+- v2 (binary): small JSON control messages; audio follows as a raw binary frame
+
+In v2 a message that carries audio has an "audio_bytes" length field and the
+very next frame is the audio itself. Clients opt in with /ws?protocol=2.
+
+v2 clients can also stream the microphone: "audio_stream_start", then bare
+binary frames of 16-bit mono PCM, then (optionally) "audio_stream_end". The
+server answers "speech_end" as soon as its endpointer hears the caller stop.
+
+A turn cancelled by a barge-in never leaves a v2 header without its audio frame.
+"""
+
+import asyncio
+import base64
+import json
+from typing import Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+
+
+def negotiate_protocol(websocket: WebSocket) -> int:
+    """Protocol requested by the client (defaults to the legacy JSON one)"""
+    try:
+        requested = int(websocket.query_params.get("protocol", PROTOCOL_JSON))
+    except ValueError:
+        return PROTOCOL_JSON
+    return PROTOCOL_BINARY if requested >= PROTOCOL_BINARY else PROTOCOL_JSON
+
+
+async def send_message(websocket: WebSocket, message: Dict, audio: Optional[bytes] = None,
+                       protocol: int = PROTOCOL_JSON) -> None:
+    """Send a control message, with its audio attached the way the client understands"""
+    if audio is None:
+        await websocket.send_json(message)
+    elif protocol == PROTOCOL_BINARY:
+        send = asyncio.ensure_future(_send_with_audio_frame(websocket, message, audio))
+        try:
+            await asyncio.shield(send)
+        except asyncio.CancelledError:
+            # Cancelled mid-pair: finish it so the next header isn't paired with this audio
+            await send
+            raise
+    else:
+        await websocket.send_json({**message, "audio": base64.b64encode(audio).decode()})
+
+
+async def _send_with_audio_frame(websocket: WebSocket, message: Dict, audio: bytes) -> None:
+    await websocket.send_json({**message, "audio_bytes": len(audio)})
+    await websocket.send_bytes(audio)
+
+
+async def _receive_frame(websocket: WebSocket) -> Dict:
+    frame = await websocket.receive()
+    if frame["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(frame.get("code", 1000))
+    return frame
+
+
+async def receive_message(websocket: WebSocket) -> Dict:
+    """
+    Next client message as a dict. Audio messages always come back with the
+    raw bytes in "audio_bytes", whichever protocol the client used.
+    """
+    frame = await _receive_frame(websocket)
+
+    # A bare binary frame is live microphone PCM (between audio_stream_start/end)
+    if frame.get("bytes") is not None:
+        return {"type": "audio_frame", "audio_bytes": frame["bytes"]}
+
+    data = json.loads(frame["text"])
+    if data.get("type") == "audio":
+        if "audio" in data:
+            data["audio_bytes"] = base64.b64decode(data.pop("audio"))
+        else:
+            audio_frame = await _receive_frame(websocket)
+            data["audio_bytes"] = audio_frame.get("bytes") or b""
+    return data